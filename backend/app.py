@@ -15,10 +15,18 @@ from modules import (
     RiskScoringEngine,
     DecisionEngine,
     BlockchainAuditLog,
-    SessionManager
+    GroupCommitAppender,
+    SessionManager,
+    EventRetention,
+    build_audit_store,
+    build_record_caches
 )
 
-from db import init_db, load_users, load_resources, upsert_resource
+from db import (
+    configure_storage,
+    init_db,
+    get_connection_state,
+)
 
 from pathlib import Path
 import json
@@ -38,6 +46,9 @@ def create_app(config_name='development'):
     if isinstance(cors_origins, str):
         cors_origins = [cors_origins]
     CORS(app, origins=cors_origins, supports_credentials=True)
+
+    # Select the storage backend before any module reads persisted state
+    configure_storage(app.config)
     
     # Load risk/ABAC/decision profile configuration
     config_path = Path(app.root_path) / "risk_config.json"
@@ -58,22 +69,35 @@ def create_app(config_name='development'):
     app.abac_module = ABACModule(profile_config)
     app.risk_engine = RiskScoringEngine(profile_config)
     app.decision_engine = DecisionEngine(profile_config)
-    app.audit_log = BlockchainAuditLog()
+    app.audit_log = BlockchainAuditLog(
+        store=build_audit_store(app.config),
+        verify_workers=app.config.get('AUDIT_VERIFY_WORKERS', 0),
+        hash_version=app.config.get('AUDIT_HASH_VERSION', 2),
+        hot_window=app.config.get('AUDIT_HOT_WINDOW', 0),
+        merkle_version=app.config.get('AUDIT_MERKLE_VERSION', 2),
+    )
+    # Request threads record decisions through the group-commit writer
+    app.audit_appender = GroupCommitAppender(
+        app.audit_log,
+        max_batch=app.config.get('AUDIT_BATCH_MAX_BLOCKS', 256),
+        flush_interval_ms=app.config.get('AUDIT_BATCH_INTERVAL_MS', 2),
+        max_queue=app.config.get('AUDIT_QUEUE_MAX', 10000),
+    )
+    app.audit_appender.start()
     app.session_manager = SessionManager()
 
     # Expose active profile name for introspection/metrics
     app.active_risk_profile = selected_profile_name or "balanced"
     
-    # Initialize SQLite database and load persisted state
+    # Initialize the configured database and load persisted state
     init_db()
 
     # Session storage (in-memory for academic demo)
     app.active_sessions = {}  # user_id -> session_token
 
-    # Users and resources are mirrored in-memory for fast access,
-    # but persisted to SQLite for reproducible experiments.
-    app.users_db = {}  # user_id -> user_object (public data only)
-    app.resources_db = {}  # resource_id -> resource_object
+    # Users and resources live in the storage backend and are read through
+    # versioned TTL/LRU caches; assigning to either writes through.
+    app.users_db, app.resources_db = build_record_caches(app.config)
     
     # Register blueprints
     from routes.auth_routes import auth_bp, init_users, get_users_public_data
@@ -97,32 +121,29 @@ def create_app(config_name='development'):
         # Generate proper password hashes for demo users
         init_users(app.auth_module)
         
-        # Populate users_db with public user data and persist to DB
-        app.users_db = get_users_public_data()
-        for user_id, user in app.users_db.items():
-            # Ensure user_id is part of record for persistence
-            record = {
-                "user_id": user_id,
+        # Persist public user data for the demo users
+        for user_id, user in get_users_public_data().items():
+            app.users_db[user_id] = {
+                **user,
                 "role": user.get("role", "guest"),
                 "department": user.get("department", "Unknown"),
                 "device_trust_score": user.get("device_trust_score", 50),
                 "location": user.get("location", "Office"),
             }
-            from db import upsert_user  # local import to avoid circulars at module import time
-            upsert_user(record)
 
-        # Populate resources_db from static MOCK_RESOURCES and persist to DB
+        # Persist the static MOCK_RESOURCES catalogue
         for res_id, res_data in MOCK_RESOURCES.items():
             app.resources_db[res_id] = res_data
-            upsert_resource(res_id, res_data)
 
-        # If there are additional resources/users already in DB (from previous runs),
-        # merge them into the in-memory stores so experiments are reproducible.
-        persisted_users = load_users()
-        app.users_db.update(persisted_users)
+        # Users/resources from previous runs stay in storage and are read
+        # through the caches on demand, so experiments are reproducible.
 
-        persisted_resources = load_resources()
-        app.resources_db.update(persisted_resources)
+    # Compact old ml_events/session_events into hourly rollups in the background
+    app.event_retention = EventRetention(
+        retention_hours=app.config.get('EVENT_RETENTION_HOURS', 720),
+        interval_seconds=app.config.get('RETENTION_INTERVAL_SECONDS', 3600),
+    )
+    app.event_retention.start()
     
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
@@ -138,7 +159,8 @@ def create_app(config_name='development'):
                 'decision_engine': 'active',
                 'blockchain_audit': 'active',
                 'session_manager': 'active'
-            }
+            },
+            'storage': get_connection_state()
         }, 200
     
     return app
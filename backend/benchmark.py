@@ -0,0 +1,382 @@
+"""
+Performance benchmarks for the audit chain.
+
+Usage:
+    python benchmark.py                     # run every benchmark
+    python benchmark.py verify 10000 100000 # one benchmark, custom sizes
+    python benchmark.py concurrency 1 8 32  # sizes are thread counts here
+
+Everything runs against the in-memory storage backend (or an in-process
+list store); nothing is written to MongoDB or SQLite.
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Add the backend directory to the path so we can import modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db import configure_storage
+
+configure_storage({"STORAGE_BACKEND": "memory"})
+
+from modules.audit_appender import GroupCommitAppender
+from modules.audit_columns import ColumnarChain
+from modules.zkp_schnorr import BinaryMerkleTree, MerkleTree, build_merkle_tree
+from modules.blockchain_audit import (
+    HASH_VERSION_BINARY,
+    HASH_VERSION_JSON,
+    AuditBlock,
+    BlockchainAuditLog,
+    block_hash,
+)
+
+
+def build_chain(n_blocks: int) -> BlockchainAuditLog:
+    """Build an audit log with n_blocks access blocks (plus genesis) in memory."""
+    audit_log = BlockchainAuditLog()
+    rng = random.Random(42)
+    users = ["admin", "alice", "bob", "charlie", "hacker"]
+    resources = ["resource_financial_data", "resource_hr_records", "resource_company_files"]
+    decisions = ["ALLOW", "CONDITIONAL", "DENY"]
+    start = datetime(2026, 1, 1)
+    previous = audit_log.chain[-1]
+    for block_id in range(1, n_blocks + 1):
+        block = AuditBlock(
+            block_id=block_id,
+            user_id=rng.choice(users),
+            resource_id=rng.choice(resources),
+            decision=rng.choice(decisions),
+            risk_score=round(rng.uniform(0, 100), 2),
+            previous_hash=previous.hash,
+            timestamp=(start + timedelta(seconds=block_id)).isoformat(),
+            hash_version=audit_log.hash_version,
+        )
+        audit_log.chain.append(block)
+        previous = block
+    audit_log.block_counter = n_blocks + 1
+    audit_log._rebuild_indexes()
+    audit_log._reset_sequencer()
+    return audit_log
+
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def bench_verify(sizes):
+    """Full-chain verification: serial vs process pool."""
+    workers = os.cpu_count() or 1
+    print(f"Full verification, serial vs {workers} worker processes")
+    print(f"{'blocks':>10} {'serial s':>10} {'parallel s':>11} {'speedup':>8}")
+    for n in sizes:
+        audit_log = build_chain(n)
+        serial, serial_s = _timed(audit_log.verify_chain, full=True, workers=1)
+        # Warm the pool once so process start-up is not counted
+        audit_log.PARALLEL_VERIFY_MIN_BLOCKS = 0
+        audit_log.verify_chain(full=True, workers=workers)
+        parallel, parallel_s = _timed(audit_log.verify_chain, full=True, workers=workers)
+        assert serial["valid"] and parallel["valid"]
+
+        # The first tampered index must match the serial verifier
+        tampered = audit_log.chain[n // 2]
+        tampered.risk_score += 1
+        audit_log.chain[n // 2] = tampered
+        expected = audit_log.verify_chain(full=True, workers=1)["first_invalid_block"]
+        found = audit_log.verify_chain(full=True, workers=workers)["first_invalid_block"]
+        assert expected == found == n // 2, (expected, found)
+
+        audit_log.close_verifier()
+        print(f"{n:>10} {serial_s:>10.3f} {parallel_s:>11.3f} {serial_s / parallel_s:>7.2f}x")
+
+
+def bench_memory(sizes):
+    """Resident bytes per block: AuditBlock objects vs the columnar chain."""
+    import tracemalloc
+
+    print("Memory per block, list of AuditBlock objects vs columnar chain")
+    print(f"{'blocks':>10} {'objects B':>10} {'columnar B':>11} {'ratio':>7}")
+    for n in sizes:
+        source = build_chain(n)
+        # Serialised rows, so every load allocates its own strings as a
+        # database read would
+        rows = [json.dumps(source.chain.fields_at(i)) for i in range(len(source.chain))]
+        del source
+
+        tracemalloc.start()
+        objects = [AuditBlock.restore(*json.loads(row)) for row in rows]
+        object_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objects
+
+        tracemalloc.start()
+        columns = ColumnarChain(AuditBlock.restore)
+        for row in rows:
+            columns.append_fields(*json.loads(row))
+        columnar_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        assert all(list(columns.fields_at(i)) == json.loads(row) for i, row in enumerate(rows))
+        print(f"{n:>10} {object_bytes / n:>10.0f} {columnar_bytes / n:>11.0f} "
+              f"{object_bytes / columnar_bytes:>6.1f}x")
+
+
+def bench_hash(sizes):
+    """Block hashes per second: JSON (v1) vs binary (v2) canonical encoding."""
+    print("Canonical block encoding, hashes per second")
+    print(f"{'blocks':>10} {'v1 json/s':>12} {'v2 binary/s':>12} {'speedup':>8}")
+    for n in sizes:
+        audit_log = build_chain(n)
+        rows = [audit_log.chain.fields_at(i)[:7] for i in range(1, len(audit_log.chain))]
+        rates = {}
+        for version in (HASH_VERSION_JSON, HASH_VERSION_BINARY):
+            _, elapsed = _timed(lambda: [block_hash(*row, version=version) for row in rows])
+            rates[version] = len(rows) / elapsed
+        print(f"{n:>10} {rates[HASH_VERSION_JSON]:>12,.0f} {rates[HASH_VERSION_BINARY]:>12,.0f} "
+              f"{rates[HASH_VERSION_BINARY] / rates[HASH_VERSION_JSON]:>7.2f}x")
+
+
+def bench_merkle(sizes):
+    """
+    Merkle root and inclusion proof: rebuilding the tree per request
+    (the old route behaviour) vs the audit log's incremental tree.
+    """
+    print("Merkle root + proof latency, rebuilt per request vs incremental")
+    print(f"{'blocks':>10} {'rebuild ms':>11} {'root us':>8} {'proof us':>9} {'append us':>10}")
+    for n in sizes:
+        audit_log = build_chain(n)
+        with audit_log.merkle_tree() as tree:
+            index = n // 3
+
+            def rebuild():
+                rebuilt = build_merkle_tree([block.to_dict() for block in audit_log.chain[1:]],
+                                            tree.VERSION)
+                return rebuilt.root, rebuilt.get_proof(index)
+            (root, proof), rebuild_s = _timed(rebuild)
+            assert root == tree.root and proof == tree.get_proof(index)
+
+            repeats = 1000
+            _, root_s = _timed(lambda: [tree.root for _ in range(repeats)])
+            _, proof_s = _timed(lambda: [tree.get_proof(index) for _ in range(repeats)])
+            assert tree.verify_proof(tree.leaves[index], tree.get_proof(index))
+            # Tree update alone (last, since the leaves are not real blocks)
+            leaf = tree._hash_leaf({"bench": index})
+            _, append_s = _timed(lambda: [tree.append_leaf(leaf) for _ in range(repeats)])
+            print(f"{n:>10} {rebuild_s * 1000:>11.1f} {root_s / repeats * 1e6:>8.2f} "
+                  f"{proof_s / repeats * 1e6:>9.2f} {append_s / repeats * 1e6:>10.2f}")
+
+
+def bench_merkle_build(sizes):
+    """Merkle tree build time and resident size: v1 hex lists vs v2 digest buffer."""
+    import tracemalloc
+
+    print("Merkle tree build from block dicts, v1 (hex lists) vs v2 (digest buffer)")
+    print(f"{'blocks':>10} {'v1 s':>8} {'v2 s':>8} {'speedup':>8} {'v1 MB':>8} {'v2 MB':>8}")
+    for n in sizes:
+        audit_log = build_chain(n)
+        block_data = [block.to_dict() for block in audit_log.chain[1:]]
+        del audit_log
+        results = {}
+        for tree_class in (MerkleTree, BinaryMerkleTree):
+            tree, elapsed = _timed(tree_class, block_data)
+            del tree
+            tracemalloc.start()
+            tree = tree_class(block_data)
+            resident = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            results[tree_class.VERSION] = (elapsed, resident)
+        (v1_s, v1_bytes), (v2_s, v2_bytes) = results[1], results[2]
+        print(f"{n:>10} {v1_s:>8.2f} {v2_s:>8.2f} {v1_s / v2_s:>7.2f}x "
+              f"{v1_bytes / 2**20:>8.1f} {v2_bytes / 2**20:>8.1f}")
+
+
+def bench_multiproof(sizes, sample=1000):
+    """Verifying a random sample of leaves: one multiproof vs independent paths."""
+    print(f"Verify {sample} sampled leaves, independent proofs vs one multiproof (v2 tree)")
+    print(f"{'leaves':>10} {'path nodes':>11} {'multi nodes':>12} {'path hashes':>12} "
+          f"{'multi hashes':>13} {'path ms':>8} {'multi ms':>9}")
+    rng = random.Random(7)
+    for n in sizes:
+        tree = BinaryMerkleTree.from_leaf_digests(rng.randbytes(32 * n))
+        indices = rng.sample(range(n), min(sample, n))
+        root, leaves = tree.root, tree.leaves
+
+        def independent():
+            proofs = [tree.get_proof(i) for i in indices]
+            assert all(tree.verify_proof(leaves[i], p) for i, p in zip(indices, proofs))
+            return proofs
+        proofs, path_s = _timed(independent)
+        path_nodes = sum(len(p) for p in proofs)
+
+        def multi():
+            proof = tree.get_multiproof(indices)
+            valid, hashes = BinaryMerkleTree.verify_multiproof(
+                root, [leaves[i] for i in proof["indices"]], proof)
+            assert valid
+            return proof, hashes
+        (proof, multi_hashes), multi_s = _timed(multi)
+        print(f"{n:>10} {path_nodes:>11} {len(proof['hashes']):>12} {path_nodes:>12} "
+              f"{multi_hashes:>13} {path_s * 1000:>8.1f} {multi_s * 1000:>9.1f}")
+
+
+def bench_consistency(sizes):
+    """Consistency proof between half and all of the tree vs re-hashing every leaf."""
+    print("Consistency proof from n/2 to n leaves (v2 tree) vs rebuilding from all leaves")
+    print(f"{'leaves':>10} {'proof len':>10} {'prove ms':>9} {'verify ms':>10} {'rebuild ms':>11}")
+    rng = random.Random(11)
+    for n in sizes:
+        digests = rng.randbytes(32 * n)
+        tree = BinaryMerkleTree.from_leaf_digests(digests)
+        first = n // 2 + 1
+        first_root = tree.root_at(first)
+        proof, prove_s = _timed(tree.get_consistency_proof, first)
+        valid, verify_s = _timed(BinaryMerkleTree.verify_consistency,
+                                 first, n, first_root, tree.root, proof)
+        assert valid
+        rebuilt, rebuild_s = _timed(BinaryMerkleTree.from_leaf_digests, digests)
+        assert rebuilt.root == tree.root
+        print(f"{n:>10} {len(proof):>10} {prove_s * 1000:>9.3f} {verify_s * 1000:>10.3f} "
+              f"{rebuild_s * 1000:>11.1f}")
+
+
+def bench_tamper(sizes):
+    """Tree-diff tamper localisation vs re-hashing and comparing every leaf."""
+    print("Locating 4 tampered leaves (v2 tree): top-down tree diff vs linear leaf scan")
+    print(f"{'leaves':>10} {'compares':>9} {'diff ms':>9} {'linear compares':>16} {'linear ms':>10}")
+    rng = random.Random(13)
+    for n in sizes:
+        tree = BinaryMerkleTree.from_leaf_digests(rng.randbytes(32 * n))
+        candidate = list(tree.leaves)
+        tampered = sorted(rng.sample(range(n), 4))
+        for index in tampered:
+            candidate[index] = rng.randbytes(32).hex()
+        result, diff_s = _timed(tree.locate_tampering, leaf_hashes=candidate)
+        assert result["tampered"] == tampered
+        linear, linear_s = _timed(
+            lambda: [i for i, leaf in enumerate(tree.leaves) if leaf != candidate[i]]
+        )
+        assert linear == tampered
+        print(f"{n:>10} {result['comparisons']:>9} {diff_s * 1000:>9.1f} {n:>16} "
+              f"{linear_s * 1000:>10.1f}")
+
+
+class ListAuditStore:
+    """
+    Audit store kept in a list; rejects blocks that arrive out of id order.
+    Also used by test_audit_sequencer.py, which makes the append_many
+    calls numbered in fail_on_call (counted from 1) raise IOError.
+    """
+
+    def __init__(self, fail_on_call=None):
+        self.blocks = []
+        self.calls = 0
+        self.fail_on_call = fail_on_call or set()
+        self._lock = threading.Lock()
+
+    def append(self, block_dict):
+        self.append_many([block_dict])
+
+    def append_many(self, block_dicts):
+        with self._lock:
+            self.calls += 1
+            if self.calls in self.fail_on_call:
+                raise IOError(f"simulated write failure on call {self.calls}")
+            for block_dict in block_dicts:
+                expected = len(self.blocks)
+                if block_dict['block_id'] != expected:
+                    raise AssertionError(f"stored block {block_dict['block_id']}, expected {expected}")
+                self.blocks.append(dict(block_dict))
+
+    def iter_blocks(self, start_id=None, end_id=None, fields=None, batch_size=1000):
+        return iter(self.blocks[start_id or 0:end_id])
+
+    def get_last_block(self, fields=None):
+        return self.blocks[-1] if self.blocks else None
+
+    def flush(self):
+        pass
+
+
+def check_no_forks(audit_log: BlockchainAuditLog, store: ListAuditStore, expected: int = None):
+    """
+    Every id appears once, each block links to its predecessor, storage
+    matches; with `expected`, that many blocks follow genesis.
+    """
+    chain = audit_log.chain
+    assert len(chain) == len(store.blocks), (len(chain), len(store.blocks))
+    if expected is not None:
+        assert len(chain) == expected + 1, (len(chain), expected)
+    assert [chain.block_id_at(i) for i in range(len(chain))] == list(range(len(chain)))
+    for i in range(1, len(chain)):
+        assert chain.previous_hash_at(i) == chain.hash_at(i - 1), f"fork at block {i}"
+        assert store.blocks[i]['hash'] == chain.hash_at(i)
+    assert audit_log.block_counter == len(chain)
+    assert audit_log.verify_chain(full=True, workers=1)['valid']
+
+
+def bench_concurrency(thread_counts, total_blocks=20_000):
+    """
+    Concurrent appends: every thread records decisions at once, directly
+    and through the group-commit appender; the chain is then checked for
+    forks and duplicate ids.
+    """
+    print(f"Concurrent appends, {total_blocks} blocks per run, blocks per second")
+    print(f"{'threads':>8} {'direct/s':>12} {'group/s':>12} {'avg batch':>10}")
+    for n_threads in thread_counts:
+        per_thread = total_blocks // n_threads
+        rates = []
+        for grouped in (False, True):
+            store = ListAuditStore()
+            audit_log = BlockchainAuditLog(store=store)
+            appender = GroupCommitAppender(audit_log, flush_interval_ms=0.5)
+            if grouped:
+                appender.start()
+            barrier = threading.Barrier(n_threads + 1)
+
+            def worker(thread_no):
+                barrier.wait()
+                for i in range(per_thread):
+                    appender.add_access_decision(f"user{thread_no}", "resource", "ALLOW", i % 100)
+
+            threads = [threading.Thread(target=worker, args=(t,)) for t in range(n_threads)]
+            for thread in threads:
+                thread.start()
+            barrier.wait()
+            started = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            appender.stop()
+            check_no_forks(audit_log, store, per_thread * n_threads)
+            rates.append(per_thread * n_threads / elapsed)
+        print(f"{n_threads:>8} {rates[0]:>12,.0f} {rates[1]:>12,.0f} "
+              f"{appender.get_stats()['average_batch_size']:>10}")
+
+
+BENCHMARKS = {
+    "verify": (bench_verify, [10_000, 50_000, 200_000]),
+    "memory": (bench_memory, [10_000, 100_000]),
+    "hash": (bench_hash, [10_000, 100_000]),
+    "concurrency": (bench_concurrency, [1, 2, 4, 8, 16, 32]),
+    "merkle": (bench_merkle, [10_000, 100_000, 1_000_000]),
+    "merkle_build": (bench_merkle_build, [100_000, 1_000_000]),
+    "multiproof": (bench_multiproof, [10_000, 100_000, 1_000_000]),
+    "consistency": (bench_consistency, [10_000, 100_000, 1_000_000]),
+    "tamper": (bench_tamper, [10_000, 100_000, 1_000_000]),
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:2] or list(BENCHMARKS)
+    custom_sizes = [int(arg) for arg in sys.argv[2:]]
+    for name in names:
+        fn, default_sizes = BENCHMARKS[name]
+        fn(custom_sizes or default_sizes)
+        print()
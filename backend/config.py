@@ -9,6 +9,70 @@ class Config:
     DEBUG = os.getenv('DEBUG', 'False') == 'True'
     CORS_ORIGINS = ['http://localhost:3000', 'http://localhost:8080']
 
+    # Storage backend: 'mongo' (falls back to memory), 'sqlite' or 'memory'
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
+    SQLITE_PATH = os.getenv(
+        'SQLITE_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zero_trust.db')
+    )
+
+    # MongoDB connection pool and timeouts (milliseconds). Bounded waits keep
+    # p99 write latency on the request path from growing without limit.
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '100'))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '0'))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '1000'))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '2000'))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '5000'))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '3000'))
+
+    # Per-collection write concern (pymongo WriteConcern keyword arguments).
+    # Audit blocks are journaled majority writes; telemetry is fire-and-forget.
+    MONGO_WRITE_POLICIES = {
+        'audit_blocks': {'w': 'majority', 'j': True, 'wtimeout': 5000},
+        'users': {'w': 1},
+        'resources': {'w': 1},
+        'sessions': {'w': 1},
+        'ml_events': {'w': 0},
+        'session_events': {'w': 0},
+    }
+
+    # Audit chain persistence: 'db' (storage backend above) or 'segments'
+    # (append-only segment files with batched fsync)
+    AUDIT_STORE = os.getenv('AUDIT_STORE', 'db')
+    AUDIT_SEGMENT_DIR = os.getenv(
+        'AUDIT_SEGMENT_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'audit_segments')
+    )
+    AUDIT_SEGMENT_BYTES = int(os.getenv('AUDIT_SEGMENT_BYTES', str(64 * 1024 * 1024)))
+    AUDIT_FSYNC_EVERY = int(os.getenv('AUDIT_FSYNC_EVERY', '64'))
+    AUDIT_FSYNC_INTERVAL_MS = int(os.getenv('AUDIT_FSYNC_INTERVAL_MS', '50'))
+    # Canonical encoding hashed for new blocks: 1 = JSON, 2 = binary.
+    # Existing blocks always verify with the version they were written with.
+    AUDIT_HASH_VERSION = int(os.getenv('AUDIT_HASH_VERSION', '2'))
+    # Processes for full chain verification (0 = one per CPU core)
+    AUDIT_VERIFY_WORKERS = int(os.getenv('AUDIT_VERIFY_WORKERS', '0'))
+    # Merkle tree kept over the chain: 1 = hex, self-paired odd nodes
+    # (original); 2 = RFC 6962 style over raw digests
+    AUDIT_MERKLE_VERSION = int(os.getenv('AUDIT_MERKLE_VERSION', '2'))
+    # Blocks kept resident behind the chain tip; older blocks are paged in
+    # from the audit store on demand (0 = load the whole chain at startup)
+    AUDIT_HOT_WINDOW = int(os.getenv('AUDIT_HOT_WINDOW', '0'))
+    # Group commit: audit appends are queued and written in batches of up to
+    # AUDIT_BATCH_MAX_BLOCKS, each waiting at most AUDIT_BATCH_INTERVAL_MS
+    AUDIT_BATCH_MAX_BLOCKS = int(os.getenv('AUDIT_BATCH_MAX_BLOCKS', '256'))
+    AUDIT_BATCH_INTERVAL_MS = float(os.getenv('AUDIT_BATCH_INTERVAL_MS', '2'))
+    AUDIT_QUEUE_MAX = int(os.getenv('AUDIT_QUEUE_MAX', '10000'))
+
+    # Read-through cache for users/resources: entries are revalidated against
+    # the stored record version after CACHE_TTL_SECONDS, LRU beyond the cap
+    CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', '30'))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '10000'))
+
+    # Raw ml_events/session_events older than this are compacted into hourly
+    # rollups (event_rollups) and deleted. 0 disables the retention worker.
+    EVENT_RETENTION_HOURS = float(os.getenv('EVENT_RETENTION_HOURS', '720'))
+    RETENTION_INTERVAL_SECONDS = float(os.getenv('RETENTION_INTERVAL_SECONDS', '3600'))
+
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
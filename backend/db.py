@@ -1,146 +1,185 @@
 """
-MongoDB persistence layer for academic demo.
+Persistence layer for academic demo.
 
 Provides helper functions to initialize the database and perform
 CRUD operations for users, resources, and audit blocks.
 
-Falls back to in-memory storage when MongoDB is not available.
+Storage is pluggable. The backend is chosen with STORAGE_BACKEND:
+
+- "mongo"  (default) MongoDB, falling back to in-memory storage when it is
+           not available. The connection is opened lazily on first use and
+           probed in the background, so importing this module never blocks
+           on the network.
+- "sqlite" durable single-node storage in a local SQLite file (WAL mode).
+- "memory" volatile in-memory storage only (load tests, CI).
+
+Every public function below delegates to the active backend.
 """
 
+import json
 import os
-from typing import Dict, List
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from config import Config
+
 
 # ---------------------------------------------------------------------------
-# In-memory fallback store
+# Settings
 # ---------------------------------------------------------------------------
-_USE_MEMORY = False
-_memory_store: Dict[str, List[dict]] = {
-    "users": [],
-    "resources": [],
-    "audit_blocks": [],
-    "ml_events": [],
-    "sessions": [],
-    "session_events": [],
+
+_settings = {
+    "backend": Config.STORAGE_BACKEND,
+    "sqlite_path": Config.SQLITE_PATH,
+    "mongo_client_options": {
+        "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": Config.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": Config.MONGO_SOCKET_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    },
+    "write_policies": dict(Config.MONGO_WRITE_POLICIES),
 }
 
+# Flask config key -> MongoClient option
+_MONGO_CLIENT_KEYS = {
+    "MONGO_MAX_POOL_SIZE": "maxPoolSize",
+    "MONGO_MIN_POOL_SIZE": "minPoolSize",
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": "waitQueueTimeoutMS",
+    "MONGO_CONNECT_TIMEOUT_MS": "connectTimeoutMS",
+    "MONGO_SOCKET_TIMEOUT_MS": "socketTimeoutMS",
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": "serverSelectionTimeoutMS",
+}
 
-def _init_mongo():
-    """Try to connect to MongoDB. Return (client, db) or (None, None)."""
-    try:
-        from pymongo import MongoClient
-        uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-        client = MongoClient(uri, serverSelectionTimeoutMS=3000)
-        # Force a quick check to see if server is reachable
-        client.admin.command("ping")
-        db_name = os.getenv("MONGO_DB_NAME", "zero_trust")
-        return client, client[db_name]
-    except Exception:
-        return None, None
 
+def configure_storage(app_config=None):
+    """
+    Apply storage settings from a Flask config mapping.
 
-_mongo_client, _mongo_db = _init_mongo()
+    Must run before the first storage call to take effect for the
+    process; create_app() calls it before any module touches storage.
+    Write policies also apply to an already-open MongoDB connection.
+    """
+    global _sqlite_backend
+    app_config = app_config or {}
+    backend = str(app_config.get("STORAGE_BACKEND", _settings["backend"])).lower()
+    if backend not in ("mongo", "sqlite", "memory"):
+        raise ValueError(f"Unknown STORAGE_BACKEND '{backend}'")
+    sqlite_path = app_config.get("SQLITE_PATH", _settings["sqlite_path"])
 
-if _mongo_db is None:
-    _USE_MEMORY = True
-    print("[db] MongoDB not available — using in-memory storage (demo mode)")
-else:
-    print("[db] Connected to MongoDB successfully")
+    if _sqlite_backend is not None and sqlite_path != _settings["sqlite_path"]:
+        _sqlite_backend = None
+    _settings.update(backend=backend, sqlite_path=sqlite_path)
+
+    for config_key, option in _MONGO_CLIENT_KEYS.items():
+        if config_key in app_config:
+            _settings["mongo_client_options"][option] = app_config[config_key]
+    if "MONGO_WRITE_POLICIES" in app_config:
+        _settings["write_policies"] = dict(app_config["MONGO_WRITE_POLICIES"])
+        if _mongo_backend is not None:
+            _mongo_backend.collections.clear()
 
 
 # ---------------------------------------------------------------------------
-# Internal helpers
+# Index registry
 # ---------------------------------------------------------------------------
+# One entry per query path. "keys" follows pymongo's [(field, direction)]
+# form (1 = ascending, -1 = descending); any other entry is passed through
+# to create_index. TTL indexes expire documents at their "expires_at"
+# date, which writers only set when a TTL is configured below. The SQLite
+# backend builds its secondary indexes from the same registry.
 
-def _get_db():
-    return _mongo_db
+INDEX_REGISTRY: Dict[str, List[dict]] = {
+    "users": [
+        {"keys": [("user_id", 1)], "unique": True},                # upsert_user
+    ],
+    "resources": [
+        {"keys": [("resource_id", 1)], "unique": True},            # upsert_resource
+    ],
+    "audit_blocks": [
+        {"keys": [("block_id", 1)], "unique": True},               # chain load / no duplicate ids
+        {"keys": [("user_id", 1), ("block_id", 1)]},               # user history
+        {"keys": [("resource_id", 1), ("block_id", 1)]},           # resource log
+        {"keys": [("decision", 1), ("block_id", 1)]},              # denied attempts
+        {"keys": [("risk_score", -1)]},                            # high-risk queries
+        {"keys": [("timestamp", 1)]},                              # time-range reads
+    ],
+    "ml_events": [
+        {"keys": [("timestamp", 1)]},                              # time-range reads
+        {"keys": [("decision", 1)]},                               # decision distribution
+        {"keys": [("expires_at", 1)], "expireAfterSeconds": 0},    # TTL
+    ],
+    "sessions": [
+        {"keys": [("session_id", 1)], "unique": True},             # upsert_session
+        {"keys": [("status", 1)]},                                 # load_active_sessions
+        {"keys": [("expires_at", 1)], "expireAfterSeconds": 0},    # TTL
+    ],
+    "session_events": [
+        {"keys": [("session_id", 1), ("timestamp", 1)]},           # session history
+        {"keys": [("timestamp", 1)]},                              # retention sweep
+        {"keys": [("expires_at", 1)], "expireAfterSeconds": 0},    # TTL
+    ],
+    "event_rollups": [
+        {"keys": [("source", 1), ("hour", 1), ("user_id", 1), ("resource_id", 1)],
+         "unique": True},                                          # merge_event_rollups
+    ],
+    "retention_state": [
+        {"keys": [("source", 1)], "unique": True},                 # retention watermark
+    ],
+}
 
+# Seconds a document lives after its last write; 0 disables expiry. For
+# ml_events/session_events keep this longer than the retention window
+# (modules/event_retention.py) so raw events are rolled up before expiry.
+TTL_SECONDS: Dict[str, int] = {
+    "sessions": int(os.getenv("SESSION_TTL_SECONDS", "0")),
+    "ml_events": int(os.getenv("ML_EVENT_TTL_SECONDS", "0")),
+    "session_events": int(os.getenv("SESSION_EVENT_TTL_SECONDS", "0")),
+}
 
-def init_db():
-    """Initialize MongoDB collections and indexes (no-op for in-memory)."""
-    if _USE_MEMORY:
-        return
 
-    from pymongo import ASCENDING
-    from pymongo.errors import OperationFailure
+def _index_name(keys) -> str:
+    """Default MongoDB index name for a key spec, e.g. 'user_id_1_block_id_1'."""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
 
-    db = _get_db()
 
-    def _safe_create_index(collection_name: str, keys, **kwargs):
-        coll = db[collection_name]
-        try:
-            coll.create_index(keys, **kwargs)
-        except OperationFailure as exc:
-            if getattr(exc, "code", None) == 86 or "IndexKeySpecsConflict" in str(exc):
-                return
-            raise
-
-    _safe_create_index("users", [("user_id", ASCENDING)], unique=True)
-    _safe_create_index("resources", [("resource_id", ASCENDING)], unique=True)
-    _safe_create_index("audit_blocks", [("block_id", ASCENDING)], unique=True)
+def _with_expiry(collection_name: str, doc: dict) -> dict:
+    """Stamp expires_at on a document bound for a TTL-indexed collection."""
+    ttl = TTL_SECONDS.get(collection_name, 0)
+    if ttl <= 0:
+        return doc
+    return {**doc, "expires_at": datetime.utcnow() + timedelta(seconds=ttl)}
 
 
 # ---------------------------------------------------------------------------
-# Users
+# Internal helpers
 # ---------------------------------------------------------------------------
 
-def upsert_user(user: dict):
-    """Insert or update a user record."""
-    if _USE_MEMORY:
-        store = _memory_store["users"]
-        for i, u in enumerate(store):
-            if u.get("user_id") == user.get("user_id"):
-                store[i] = {**u, **user}
-                return
-        store.append(dict(user))
-        return
-
-    db = _get_db()
-    db.users.update_one(
-        {"user_id": user["user_id"]},
-        {"$set": user},
-        upsert=True,
-    )
+# Bookkeeping fields that are stored with a record but are not part of it
+_INTERNAL_FIELDS = ("_id", "version", "expires_at")
 
 
-def load_users() -> Dict[str, dict]:
-    """Load all users into a simple dictionary keyed by user_id."""
-    if _USE_MEMORY:
-        users: Dict[str, dict] = {}
-        for doc in _memory_store["users"]:
-            uid = doc.get("user_id")
-            if not uid:
-                continue
-            users[uid] = {
-                "role": doc.get("role"),
-                "department": doc.get("department"),
-                "device_trust_score": doc.get("device_trust_score"),
-                "location": doc.get("location"),
-            }
-        return users
+def _strip_internal(doc: dict) -> dict:
+    return {k: v for k, v in doc.items() if k not in _INTERNAL_FIELDS}
 
-    db = _get_db()
-    users_cursor = db.users.find({})
-    users = {}
-    for doc in users_cursor:
-        uid = doc.get("user_id")
-        if not uid:
-            continue
-        users[uid] = {
-            "role": doc.get("role"),
-            "department": doc.get("department"),
-            "device_trust_score": doc.get("device_trust_score"),
-            "location": doc.get("location"),
-        }
-    return users
 
+def _user_record(doc: dict) -> dict:
+    return {
+        "role": doc.get("role"),
+        "department": doc.get("department"),
+        "device_trust_score": doc.get("device_trust_score"),
+        "location": doc.get("location"),
+    }
 
-# ---------------------------------------------------------------------------
-# Resources
-# ---------------------------------------------------------------------------
 
-def upsert_resource(resource_id: str, data: dict):
-    """Insert or update a resource record."""
-    payload = {
+def _resource_payload(resource_id: str, data: dict) -> dict:
+    return {
         "resource_id": resource_id,
         "name": data.get("name"),
         "resource_type": data.get("resource_type"),
@@ -151,59 +190,1368 @@ def upsert_resource(resource_id: str, data: dict):
         "allowed_locations": data.get("allowed_locations", []),
     }
 
-    if _USE_MEMORY:
-        store = _memory_store["resources"]
-        for i, r in enumerate(store):
-            if r.get("resource_id") == resource_id:
-                store[i] = payload
-                return
-        store.append(payload)
-        return
 
-    db = _get_db()
-    db.resources.update_one(
-        {"resource_id": resource_id},
-        {"$set": payload},
-        upsert=True,
-    )
+def _resource_record(doc: dict) -> dict:
+    return {
+        "name": doc.get("name"),
+        "resource_type": doc.get("resource_type"),
+        "sensitivity_level": doc.get("sensitivity_level"),
+        "required_role": doc.get("required_role"),
+        "required_departments": doc.get("required_departments", []) or [],
+        "min_device_trust": doc.get("min_device_trust"),
+        "allowed_locations": doc.get("allowed_locations", []) or [],
+    }
 
 
-def load_resources() -> Dict[str, dict]:
-    """Load all resources into a dictionary keyed by resource_id."""
-    if _USE_MEMORY:
-        resources: Dict[str, dict] = {}
-        for doc in _memory_store["resources"]:
-            rid = doc.get("resource_id")
-            if not rid:
-                continue
-            resources[rid] = {
-                "name": doc.get("name"),
-                "resource_type": doc.get("resource_type"),
-                "sensitivity_level": doc.get("sensitivity_level"),
-                "required_role": doc.get("required_role"),
-                "required_departments": doc.get("required_departments", []) or [],
-                "min_device_trust": doc.get("min_device_trust"),
-                "allowed_locations": doc.get("allowed_locations", []) or [],
+def _project(doc: dict, fields: Optional[Sequence[str]]) -> dict:
+    """Apply a field projection to an in-memory document."""
+    if not fields:
+        return dict(doc)
+    return {f: doc[f] for f in fields if f in doc}
+
+
+def _mongo_projection(fields: Optional[Sequence[str]]) -> Optional[dict]:
+    if not fields:
+        return None
+    projection = {f: 1 for f in fields}
+    if "_id" not in projection:
+        projection["_id"] = 0
+    return projection
+
+
+def _time_range_query(start_time, end_time) -> dict:
+    """Build a timestamp filter; bounds are ISO strings or datetimes, end exclusive."""
+    cond = {}
+    if start_time is not None:
+        cond["$gte"] = _iso(start_time)
+    if end_time is not None:
+        cond["$lt"] = _iso(end_time)
+    return {"timestamp": cond} if cond else {}
+
+
+def _iso(value) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _in_time_range(doc: dict, start_time, end_time) -> bool:
+    ts = doc.get("timestamp")
+    if start_time is not None and (ts is None or ts < _iso(start_time)):
+        return False
+    if end_time is not None and (ts is None or ts >= _iso(end_time)):
+        return False
+    return True
+
+
+ROLLUP_KEY_FIELDS = ("source", "hour", "user_id", "resource_id")
+
+
+def _rollup_key(doc: dict) -> tuple:
+    return tuple(doc.get(f) or "" for f in ROLLUP_KEY_FIELDS)
+
+
+def _merge_rollup(existing: Optional[dict], delta: dict) -> dict:
+    """Combine two hourly aggregate documents with the same key."""
+    if not existing:
+        return {**delta, "decisions": dict(delta["decisions"]),
+                "risk_histogram": dict(delta["risk_histogram"])}
+    merged = dict(existing)
+    merged["count"] = existing["count"] + delta["count"]
+    merged["risk_sum"] = existing["risk_sum"] + delta["risk_sum"]
+    merged["risk_min"] = min(existing["risk_min"], delta["risk_min"])
+    merged["risk_max"] = max(existing["risk_max"], delta["risk_max"])
+    for field in ("decisions", "risk_histogram"):
+        combined = dict(existing.get(field, {}))
+        for k, v in delta[field].items():
+            combined[k] = combined.get(k, 0) + v
+        merged[field] = combined
+    return merged
+
+
+def _apply_rollup(existing: Optional[dict], delta: dict, run_id) -> Optional[dict]:
+    """
+    existing with delta added, stamped with run_id; None if a rollup from
+    the same retention run was already added (nothing to write).
+    """
+    if run_id is not None and existing and existing.get("run_id") == run_id:
+        return None
+    merged = _merge_rollup(existing, delta)
+    if run_id is not None:
+        merged["run_id"] = run_id
+    return merged
+
+
+def _in_rollup_range(doc: dict, source, start_hour, end_hour, user_id, resource_id) -> bool:
+    if source and doc.get("source") != source:
+        return False
+    if start_hour is not None and doc["hour"] < _iso(start_hour):
+        return False
+    if end_hour is not None and doc["hour"] >= _iso(end_hour):
+        return False
+    if user_id and doc.get("user_id") != user_id:
+        return False
+    if resource_id and doc.get("resource_id") != resource_id:
+        return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Storage backends
+# ---------------------------------------------------------------------------
+
+class StorageBackend:
+    """
+    Interface implemented by every storage backend.
+
+    Documents are plain dicts; see the public functions at the bottom of
+    this module for the contract of each method.
+    """
+
+    name = "abstract"
+
+    def init(self):
+        """Create tables/collections and indexes."""
+
+    def index_stats(self) -> Dict[str, List[dict]]:
+        raise NotImplementedError
+
+    def upsert_user(self, user: dict) -> int:
+        raise NotImplementedError
+
+    def get_user(self, user_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def load_users(self) -> Dict[str, dict]:
+        raise NotImplementedError
+
+    def upsert_resource(self, payload: dict) -> int:
+        raise NotImplementedError
+
+    def get_resource(self, resource_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def load_resources(self) -> Dict[str, dict]:
+        raise NotImplementedError
+
+    def insert_audit_blocks(self, blocks: List[dict]):
+        raise NotImplementedError
+
+    def iter_audit_blocks(self, start_id, end_id, start_time, end_time,
+                          fields, batch_size) -> Iterator[dict]:
+        raise NotImplementedError
+
+    def last_audit_block(self, fields) -> Optional[dict]:
+        raise NotImplementedError
+
+    def insert_ml_events(self, events: List[dict]):
+        raise NotImplementedError
+
+    def iter_ml_events(self, start_time, end_time, fields,
+                       batch_size) -> Iterator[dict]:
+        raise NotImplementedError
+
+    def upsert_session(self, session: dict):
+        raise NotImplementedError
+
+    def load_active_sessions(self) -> List[dict]:
+        raise NotImplementedError
+
+    def insert_session_events(self, events: List[dict]):
+        raise NotImplementedError
+
+    def iter_session_events(self, start_time, end_time, fields,
+                            batch_size) -> Iterator[dict]:
+        raise NotImplementedError
+
+    def delete_events_before(self, collection_name: str, cutoff) -> int:
+        """Delete ml_events/session_events with timestamp < cutoff."""
+        raise NotImplementedError
+
+    def merge_event_rollups(self, rollups: List[dict], run_id):
+        raise NotImplementedError
+
+    def iter_event_rollups(self, source, start_hour, end_hour,
+                           user_id, resource_id) -> Iterator[dict]:
+        raise NotImplementedError
+
+    def get_retention_state(self, source: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def set_retention_state(self, state: dict):
+        raise NotImplementedError
+
+
+class MemoryBackend(StorageBackend):
+    """
+    Volatile in-memory store.
+
+    Keyed collections map primary key -> document. Python dicts keep
+    insertion order, so iteration still follows the order records were
+    first written. Event collections have no primary key and stay
+    append-only lists.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self.store: Dict[str, object] = {
+            "users": {},           # user_id -> doc
+            "resources": {},       # resource_id -> doc
+            "audit_blocks": {},    # block_id -> doc
+            "ml_events": [],
+            "sessions": {},        # session_id -> doc
+            "session_events": [],
+            "event_rollups": {},   # (source, hour, user_id, resource_id) -> doc
+            "retention_state": {}, # source -> doc
+        }
+        # Secondary index: session status -> ordered set of session_ids
+        self.session_status: Dict[str, Dict[str, None]] = {}
+        # Ascending block_ids of audit_blocks, kept on insert so range reads
+        # bisect it directly (blocks normally arrive in id order: an append)
+        self.audit_ids: List[int] = []
+
+    def index_stats(self) -> Dict[str, List[dict]]:
+        return {
+            collection_name: [
+                {"name": _index_name(spec["keys"]), "present": False, "ops": None, "since": None}
+                for spec in specs
+            ]
+            for collection_name, specs in INDEX_REGISTRY.items()
+        }
+
+    def upsert_user(self, user: dict) -> int:
+        store = self.store["users"]
+        uid = user.get("user_id")
+        existing = store.get(uid, {})
+        version = existing.get("version", 0) + 1
+        store[uid] = {**existing, **_strip_internal(user), "version": version}
+        return version
+
+    def get_user(self, user_id: str) -> Optional[dict]:
+        doc = self.store["users"].get(user_id)
+        return dict(doc) if doc else None
+
+    def load_users(self) -> Dict[str, dict]:
+        return {
+            doc["user_id"]: _user_record(doc)
+            for doc in self.store["users"].values()
+            if doc.get("user_id")
+        }
+
+    def upsert_resource(self, payload: dict) -> int:
+        store = self.store["resources"]
+        version = store.get(payload["resource_id"], {}).get("version", 0) + 1
+        store[payload["resource_id"]] = {**payload, "version": version}
+        return version
+
+    def get_resource(self, resource_id: str) -> Optional[dict]:
+        doc = self.store["resources"].get(resource_id)
+        return dict(doc) if doc else None
+
+    def load_resources(self) -> Dict[str, dict]:
+        return {
+            doc["resource_id"]: _resource_record(doc)
+            for doc in self.store["resources"].values()
+            if doc.get("resource_id")
+        }
+
+    def insert_audit_blocks(self, blocks: List[dict]):
+        store, ids = self.store["audit_blocks"], self.audit_ids
+        # Checked up front so a rejected batch stores nothing
+        block_ids = [block_dict.get("block_id") or 0 for block_dict in blocks]
+        for block_id in block_ids:
+            if block_id in store:
+                raise ValueError(f"Audit block {block_id} is already stored")
+        if len(set(block_ids)) != len(block_ids):
+            raise ValueError("Duplicate block_id in audit block batch")
+        for block_id, block_dict in zip(block_ids, blocks):
+            if not ids or block_id > ids[-1]:
+                ids.append(block_id)
+            else:
+                insort(ids, block_id)
+            store[block_id] = dict(block_dict)
+
+    def iter_audit_blocks(self, start_id, end_id, start_time, end_time,
+                          fields, batch_size) -> Iterator[dict]:
+        store, ids = self.store["audit_blocks"], self.audit_ids
+        lo = bisect_left(ids, start_id) if start_id is not None else 0
+        hi = bisect_left(ids, end_id) if end_id is not None else len(ids)
+        for block_id in ids[lo:hi]:
+            doc = store[block_id]
+            if _in_time_range(doc, start_time, end_time):
+                yield _project(doc, fields)
+
+    def last_audit_block(self, fields) -> Optional[dict]:
+        if not self.audit_ids:
+            return None
+        return _project(self.store["audit_blocks"][self.audit_ids[-1]], fields)
+
+    def insert_ml_events(self, events: List[dict]):
+        self.store["ml_events"].extend(dict(e) for e in events)
+
+    def iter_ml_events(self, start_time, end_time, fields,
+                       batch_size) -> Iterator[dict]:
+        store = self.store["ml_events"]
+        end = len(store)
+        for offset in range(0, end, batch_size):
+            for doc in store[offset:min(offset + batch_size, end)]:
+                if _in_time_range(doc, start_time, end_time):
+                    yield _project(doc, fields)
+
+    def upsert_session(self, session: dict):
+        store = self.store["sessions"]
+        sid = session.get("session_id")
+        previous = store.get(sid)
+        merged = {**(previous or {}), **session}
+        store[sid] = merged
+        old_status = previous.get("status") if previous else None
+        new_status = merged.get("status")
+        if previous is None or old_status != new_status:
+            if previous is not None:
+                self.session_status.get(old_status, {}).pop(sid, None)
+            self.session_status.setdefault(new_status, {})[sid] = None
+
+    def load_active_sessions(self) -> List[dict]:
+        store = self.store["sessions"]
+        return [dict(store[sid]) for sid in self.session_status.get("ACTIVE", {})]
+
+    def insert_session_events(self, events: List[dict]):
+        self.store["session_events"].extend(dict(e) for e in events)
+
+    def iter_session_events(self, start_time, end_time, fields,
+                            batch_size) -> Iterator[dict]:
+        store = self.store["session_events"]
+        end = len(store)
+        for offset in range(0, end, batch_size):
+            for doc in store[offset:min(offset + batch_size, end)]:
+                if _in_time_range(doc, start_time, end_time):
+                    yield _project(doc, fields)
+
+    def delete_events_before(self, collection_name: str, cutoff) -> int:
+        store = self.store[collection_name]
+        kept = [e for e in store if not _in_time_range(e, None, cutoff)]
+        removed = len(store) - len(kept)
+        store[:] = kept
+        return removed
+
+    def merge_event_rollups(self, rollups: List[dict], run_id):
+        store = self.store["event_rollups"]
+        for delta in rollups:
+            key = _rollup_key(delta)
+            merged = _apply_rollup(store.get(key), delta, run_id)
+            if merged is not None:
+                store[key] = merged
+
+    def iter_event_rollups(self, source, start_hour, end_hour,
+                           user_id, resource_id) -> Iterator[dict]:
+        for key in sorted(self.store["event_rollups"]):
+            doc = self.store["event_rollups"][key]
+            if _in_rollup_range(doc, source, start_hour, end_hour, user_id, resource_id):
+                yield dict(doc)
+
+    def get_retention_state(self, source: str) -> Optional[dict]:
+        doc = self.store["retention_state"].get(source)
+        return dict(doc) if doc else None
+
+    def set_retention_state(self, state: dict):
+        self.store["retention_state"][state["source"]] = dict(state)
+
+
+class _WritePolicyCollections(dict):
+    """
+    Lazily built collection handles carrying their configured write concern.
+
+    High-volume telemetry (ml_events, session_events) can be written
+    fire-and-forget while audit blocks wait for journaled majority acks.
+    """
+
+    def __init__(self, database):
+        super().__init__()
+        self.database = database
+
+    def __missing__(self, name):
+        policy = _settings["write_policies"].get(name)
+        if policy:
+            from pymongo import WriteConcern
+            coll = self.database.get_collection(name, write_concern=WriteConcern(**policy))
+        else:
+            coll = self.database[name]
+        self[name] = coll
+        return coll
+
+
+class MongoBackend(StorageBackend):
+    """MongoDB storage over an already-connected database handle."""
+
+    name = "mongo"
+
+    def __init__(self, client, database):
+        self.client = client
+        self.db = database
+        self.collections = _WritePolicyCollections(database)
+
+    def init(self):
+        from pymongo.errors import OperationFailure
+
+        def _safe_create_index(collection_name: str, keys, **kwargs):
+            coll = self.db[collection_name]
+            try:
+                coll.create_index(keys, **kwargs)
+            except OperationFailure as exc:
+                # 85/86: an index with the same name or keys already exists
+                if getattr(exc, "code", None) in (85, 86) or "IndexKeySpecsConflict" in str(exc):
+                    return
+                raise
+
+        for collection_name, specs in INDEX_REGISTRY.items():
+            for spec in specs:
+                options = {k: v for k, v in spec.items() if k != "keys"}
+                _safe_create_index(collection_name, spec["keys"], **options)
+
+    def index_stats(self) -> Dict[str, List[dict]]:
+        report: Dict[str, List[dict]] = {}
+        for collection_name, specs in INDEX_REGISTRY.items():
+            usage = {
+                row["name"]: row.get("accesses", {})
+                for row in self.db[collection_name].aggregate([{"$indexStats": {}}])
             }
+            entries = []
+            for spec in specs:
+                name = _index_name(spec["keys"])
+                accesses = usage.get(name)
+                entries.append({
+                    "name": name,
+                    "present": accesses is not None,
+                    "ops": accesses.get("ops") if accesses else None,
+                    "since": accesses["since"].isoformat() if accesses and accesses.get("since") else None,
+                })
+            report[collection_name] = entries
+        return report
+
+    def upsert_user(self, user: dict) -> int:
+        from pymongo import ReturnDocument
+        doc = self.collections["users"].find_one_and_update(
+            {"user_id": user["user_id"]},
+            {"$set": _strip_internal(user), "$inc": {"version": 1}},
+            projection={"_id": 0, "version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["version"]
+
+    def get_user(self, user_id: str) -> Optional[dict]:
+        return self.collections["users"].find_one({"user_id": user_id}, {"_id": 0})
+
+    def load_users(self) -> Dict[str, dict]:
+        return {
+            doc["user_id"]: _user_record(doc)
+            for doc in self.collections["users"].find({})
+            if doc.get("user_id")
+        }
+
+    def upsert_resource(self, payload: dict) -> int:
+        from pymongo import ReturnDocument
+        doc = self.collections["resources"].find_one_and_update(
+            {"resource_id": payload["resource_id"]},
+            {"$set": payload, "$inc": {"version": 1}},
+            projection={"_id": 0, "version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["version"]
+
+    def get_resource(self, resource_id: str) -> Optional[dict]:
+        return self.collections["resources"].find_one({"resource_id": resource_id}, {"_id": 0})
+
+    def load_resources(self) -> Dict[str, dict]:
+        return {
+            doc["resource_id"]: _resource_record(doc)
+            for doc in self.collections["resources"].find({})
+            if doc.get("resource_id")
+        }
+
+    def insert_audit_blocks(self, blocks: List[dict]):
+        # Plain inserts: the unique block_id index rejects a block that
+        # would overwrite one already stored, instead of forking the chain.
+        # Copies, because the driver adds _id to the documents it inserts.
+        if len(blocks) == 1:
+            self.collections["audit_blocks"].insert_one(dict(blocks[0]))
+            return
+        self.collections["audit_blocks"].insert_many([dict(b) for b in blocks], ordered=True)
+
+    def iter_audit_blocks(self, start_id, end_id, start_time, end_time,
+                          fields, batch_size) -> Iterator[dict]:
+        from pymongo import ASCENDING
+        query = _time_range_query(start_time, end_time)
+        id_range = {}
+        if start_id is not None:
+            id_range["$gte"] = start_id
+        if end_id is not None:
+            id_range["$lt"] = end_id
+        if id_range:
+            query["block_id"] = id_range
+
+        cursor = (
+            self.collections["audit_blocks"].find(query, _mongo_projection(fields))
+            .sort("block_id", ASCENDING)
+            .batch_size(batch_size)
+        )
+        for doc in cursor:
+            yield dict(doc)
+
+    def last_audit_block(self, fields) -> Optional[dict]:
+        from pymongo import DESCENDING
+        doc = self.collections["audit_blocks"].find_one(
+            {}, _mongo_projection(fields), sort=[("block_id", DESCENDING)]
+        )
+        return dict(doc) if doc else None
+
+    def insert_ml_events(self, events: List[dict]):
+        if len(events) == 1:
+            self.collections["ml_events"].insert_one(_with_expiry("ml_events", events[0]))
+            return
+        self.collections["ml_events"].insert_many(
+            [_with_expiry("ml_events", e) for e in events], ordered=False
+        )
+
+    def iter_ml_events(self, start_time, end_time, fields,
+                       batch_size) -> Iterator[dict]:
+        cursor = self.collections["ml_events"].find(
+            _time_range_query(start_time, end_time),
+            _mongo_projection(fields),
+        ).batch_size(batch_size)
+        for doc in cursor:
+            yield dict(doc)
+
+    def upsert_session(self, session: dict):
+        self.collections["sessions"].update_one(
+            {"session_id": session["session_id"]},
+            {"$set": _with_expiry("sessions", session)},
+            upsert=True,
+        )
+
+    def load_active_sessions(self) -> List[dict]:
+        return [dict(doc) for doc in self.collections["sessions"].find({"status": "ACTIVE"})]
+
+    def insert_session_events(self, events: List[dict]):
+        if len(events) == 1:
+            self.collections["session_events"].insert_one(_with_expiry("session_events", events[0]))
+            return
+        self.collections["session_events"].insert_many(
+            [_with_expiry("session_events", e) for e in events], ordered=False
+        )
+
+    def iter_session_events(self, start_time, end_time, fields,
+                            batch_size) -> Iterator[dict]:
+        cursor = self.collections["session_events"].find(
+            _time_range_query(start_time, end_time),
+            _mongo_projection(fields),
+        ).batch_size(batch_size)
+        for doc in cursor:
+            yield dict(doc)
+
+    def delete_events_before(self, collection_name: str, cutoff) -> int:
+        # Deletions are acknowledged even for fire-and-forget collections so
+        # the retention run can report what it removed.
+        coll = self.db[collection_name]
+        return coll.delete_many(_time_range_query(None, cutoff)).deleted_count
+
+    def merge_event_rollups(self, rollups: List[dict], run_id):
+        from pymongo import UpdateOne
+        from pymongo.errors import BulkWriteError
+        ops = []
+        for delta in rollups:
+            inc = {"count": delta["count"], "risk_sum": delta["risk_sum"]}
+            for field in ("decisions", "risk_histogram"):
+                for k, v in delta[field].items():
+                    inc[f"{field}.{k}"] = v
+            update = {
+                "$inc": inc,
+                "$min": {"risk_min": delta["risk_min"]},
+                "$max": {"risk_max": delta["risk_max"]},
+            }
+            query = {f: delta.get(f) for f in ROLLUP_KEY_FIELDS}
+            if run_id is not None:
+                # A document this run already added to fails the filter, and
+                # the upsert's insert then hits the unique key: skipped
+                query["run_id"] = {"$ne": run_id}
+                update["$set"] = {"run_id": run_id}
+            ops.append(UpdateOne(query, update, upsert=True))
+        if not ops:
+            return
+        try:
+            self.collections["event_rollups"].bulk_write(ops, ordered=False)
+        except BulkWriteError as exc:
+            errors = exc.details.get("writeErrors", [])
+            if run_id is None or any(e.get("code") != 11000 for e in errors):
+                raise
+
+    def iter_event_rollups(self, source, start_hour, end_hour,
+                           user_id, resource_id) -> Iterator[dict]:
+        from pymongo import ASCENDING
+        query = {}
+        if source:
+            query["source"] = source
+        hour_range = {}
+        if start_hour is not None:
+            hour_range["$gte"] = _iso(start_hour)
+        if end_hour is not None:
+            hour_range["$lt"] = _iso(end_hour)
+        if hour_range:
+            query["hour"] = hour_range
+        if user_id:
+            query["user_id"] = user_id
+        if resource_id:
+            query["resource_id"] = resource_id
+        cursor = self.collections["event_rollups"].find(query, {"_id": 0}).sort(
+            [("source", ASCENDING), ("hour", ASCENDING)]
+        )
+        for doc in cursor:
+            yield dict(doc)
+
+    def get_retention_state(self, source: str) -> Optional[dict]:
+        return self.collections["retention_state"].find_one({"source": source}, {"_id": 0})
+
+    def set_retention_state(self, state: dict):
+        self.collections["retention_state"].replace_one(
+            {"source": state["source"]}, dict(state), upsert=True
+        )
+
+    def can_import_audit_chain(self, memory: MemoryBackend) -> bool:
+        """
+        Whether the audit chain written to memory can move to MongoDB:
+        only when one of the two holds no blocks, otherwise the running
+        audit log would append ids MongoDB already has and fork its chain.
+        """
+        return (not memory.store["audit_blocks"]
+                or self.collections["audit_blocks"].estimated_document_count() == 0)
+
+    def import_from_memory(self, memory: MemoryBackend):
+        """
+        Copy records written while MongoDB was unreachable.
+
+        Keyed records use $setOnInsert so anything already in MongoDB (from
+        an earlier run) wins. Audit blocks must pass can_import_audit_chain().
+        """
+        from pymongo import UpdateOne
+
+        keyed = (
+            ("users", "user_id"),
+            ("resources", "resource_id"),
+            ("sessions", "session_id"),
+            ("retention_state", "source"),
+        )
+        for name, key in keyed:
+            docs = list(memory.store[name].values())
+            if docs:
+                self.collections[name].bulk_write(
+                    [UpdateOne({key: d[key]}, {"$setOnInsert": d}, upsert=True) for d in docs],
+                    ordered=False,
+                )
+
+        blocks = [memory.store["audit_blocks"][block_id] for block_id in memory.audit_ids]
+        if blocks:
+            self.insert_audit_blocks(blocks)
+
+        if memory.store["ml_events"]:
+            self.insert_ml_events(list(memory.store["ml_events"]))
+        if memory.store["session_events"]:
+            self.insert_session_events(list(memory.store["session_events"]))
+        if memory.store["event_rollups"]:
+            self.merge_event_rollups(list(memory.store["event_rollups"].values()), None)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Durable single-node storage in a SQLite file.
+
+    The database runs in WAL mode so readers never block the writer. Each
+    thread gets its own connection; sqlite3 caches the compiled form of
+    every parameterised statement below, so repeated writes reuse prepared
+    statements. Bulk writes run as one transaction. Documents are stored
+    as JSON next to the columns used for filtering and indexing.
+    """
+
+    name = "sqlite"
+
+    # table -> (primary key, indexed columns)
+    TABLES = {
+        "users": ("user_id", ()),
+        "resources": ("resource_id", ()),
+        "audit_blocks": ("block_id", ("user_id", "resource_id", "decision", "risk_score", "timestamp")),
+        "ml_events": ("id", ("timestamp", "decision", "user_id", "resource_id")),
+        "sessions": ("session_id", ("status",)),
+        "session_events": ("id", ("session_id", "timestamp")),
+        "event_rollups": ("id", ROLLUP_KEY_FIELDS),
+        "retention_state": ("source", ()),
+    }
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            doc TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS resources (
+            resource_id TEXT PRIMARY KEY,
+            doc TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS audit_blocks (
+            block_id INTEGER PRIMARY KEY,
+            user_id TEXT,
+            resource_id TEXT,
+            decision TEXT,
+            risk_score REAL,
+            timestamp TEXT,
+            doc TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS ml_events (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT,
+            decision TEXT,
+            user_id TEXT,
+            resource_id TEXT,
+            doc TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            status TEXT,
+            doc TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS session_events (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT,
+            timestamp TEXT,
+            doc TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS event_rollups (
+            id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            hour TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            resource_id TEXT NOT NULL,
+            doc TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS retention_state (
+            source TEXT PRIMARY KEY,
+            doc TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    # -- connection handling ------------------------------------------------
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                isolation_level=None,      # explicit BEGIN/COMMIT below
+                check_same_thread=False,
+                cached_statements=256,
+                timeout=10,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    # Flag only once the schema is committed (autocommit
+                    # mode), so no thread queries tables that do not exist
+                    self._create_schema(conn)
+                    self._initialized = True
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        conn.executescript(self.SCHEMA)
+        for table, specs in INDEX_REGISTRY.items():
+            pk, columns = self.TABLES[table]
+            for spec in specs:
+                fields = [field for field, _ in spec["keys"]]
+                if "expireAfterSeconds" in spec or fields == [pk]:
+                    continue  # TTL is MongoDB-only; the PK is already indexed
+                if any(f not in columns and f != pk for f in fields):
+                    continue
+                cols = ", ".join(
+                    f"{field} {'DESC' if direction < 0 else 'ASC'}"
+                    for field, direction in spec["keys"]
+                )
+                unique = "UNIQUE " if spec.get("unique") else ""
+                conn.execute(
+                    f"CREATE {unique}INDEX IF NOT EXISTS "
+                    f"{self._index_name(table, spec['keys'])} ON {table} ({cols})"
+                )
+
+    @staticmethod
+    def _index_name(table: str, keys) -> str:
+        # SQLite identifiers cannot contain '-', so "risk_score_-1" -> "risk_score_desc"
+        return f"idx_{table}_" + "_".join(
+            f"{field}_{'desc' if direction < 0 else 'asc'}" for field, direction in keys
+        )
+
+    def init(self):
+        self._conn()
+
+    def connection_state(self) -> dict:
+        mode = self._conn().execute("PRAGMA journal_mode").fetchone()[0]
+        return {
+            "backend": self.name,
+            "status": "connected",
+            "path": self.path,
+            "journal_mode": mode,
+        }
+
+    def index_stats(self) -> Dict[str, List[dict]]:
+        conn = self._conn()
+        report: Dict[str, List[dict]] = {}
+        for table, specs in INDEX_REGISTRY.items():
+            present = {
+                row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?",
+                    (table,),
+                )
+            }
+            pk = self.TABLES[table][0]
+            entries = []
+            for spec in specs:
+                is_pk = [field for field, _ in spec["keys"]] == [pk]
+                entries.append({
+                    "name": _index_name(spec["keys"]),
+                    "present": is_pk or self._index_name(table, spec["keys"]) in present,
+                    "ops": None,
+                    "since": None,
+                })
+            report[table] = entries
+        return report
+
+    # -- documents ------------------------------------------------------------
+
+    @staticmethod
+    def _dumps(doc: dict) -> str:
+        return json.dumps({k: v for k, v in doc.items() if k != "_id"}, default=str)
+
+    def _iter_docs(self, sql: str, params: tuple, fields, batch_size) -> Iterator[dict]:
+        cursor = self._conn().execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for (doc,) in rows:
+                yield _project(json.loads(doc), fields)
+
+    def upsert_user(self, user: dict) -> int:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT doc FROM users WHERE user_id = ?", (user["user_id"],)
+            ).fetchone()
+            existing = json.loads(row[0]) if row else {}
+            version = existing.get("version", 0) + 1
+            merged = {**existing, **_strip_internal(user), "version": version}
+            conn.execute(
+                "INSERT OR REPLACE INTO users (user_id, doc) VALUES (?, ?)",
+                (user["user_id"], self._dumps(merged)),
+            )
+        return version
+
+    def get_user(self, user_id: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT doc FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_users(self) -> Dict[str, dict]:
+        users = {}
+        for (doc,) in self._conn().execute("SELECT doc FROM users ORDER BY rowid"):
+            doc = json.loads(doc)
+            if doc.get("user_id"):
+                users[doc["user_id"]] = _user_record(doc)
+        return users
+
+    def upsert_resource(self, payload: dict) -> int:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT doc FROM resources WHERE resource_id = ?", (payload["resource_id"],)
+            ).fetchone()
+            version = (json.loads(row[0]).get("version", 0) if row else 0) + 1
+            conn.execute(
+                "INSERT OR REPLACE INTO resources (resource_id, doc) VALUES (?, ?)",
+                (payload["resource_id"], self._dumps({**payload, "version": version})),
+            )
+        return version
+
+    def get_resource(self, resource_id: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT doc FROM resources WHERE resource_id = ?", (resource_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_resources(self) -> Dict[str, dict]:
+        resources = {}
+        for (doc,) in self._conn().execute("SELECT doc FROM resources ORDER BY rowid"):
+            doc = json.loads(doc)
+            if doc.get("resource_id"):
+                resources[doc["resource_id"]] = _resource_record(doc)
         return resources
 
-    db = _get_db()
-    cursor = db.resources.find({})
-    resources = {}
-    for doc in cursor:
-        rid = doc.get("resource_id")
-        if not rid:
+    def insert_audit_blocks(self, blocks: List[dict]):
+        rows = [
+            (
+                b.get("block_id"), b.get("user_id"), b.get("resource_id"),
+                b.get("decision"), b.get("risk_score"), b.get("timestamp"),
+                self._dumps(b),
+            )
+            for b in blocks
+        ]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO audit_blocks "
+                "(block_id, user_id, resource_id, decision, risk_score, timestamp, doc) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def iter_audit_blocks(self, start_id, end_id, start_time, end_time,
+                          fields, batch_size) -> Iterator[dict]:
+        clauses, params = [], []
+        if start_id is not None:
+            clauses.append("block_id >= ?")
+            params.append(start_id)
+        if end_id is not None:
+            clauses.append("block_id < ?")
+            params.append(end_id)
+        if start_time is not None:
+            clauses.append("timestamp >= ?")
+            params.append(_iso(start_time))
+        if end_time is not None:
+            clauses.append("timestamp < ?")
+            params.append(_iso(end_time))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        yield from self._iter_docs(
+            f"SELECT doc FROM audit_blocks{where} ORDER BY block_id",
+            tuple(params), fields, batch_size,
+        )
+
+    def last_audit_block(self, fields) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT doc FROM audit_blocks ORDER BY block_id DESC LIMIT 1"
+        ).fetchone()
+        return _project(json.loads(row[0]), fields) if row else None
+
+    def insert_ml_events(self, events: List[dict]):
+        rows = [
+            (
+                e.get("timestamp"), e.get("decision"), e.get("user_id"),
+                e.get("resource_id"), self._dumps(e),
+            )
+            for e in events
+        ]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO ml_events (timestamp, decision, user_id, resource_id, doc) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def iter_ml_events(self, start_time, end_time, fields,
+                       batch_size) -> Iterator[dict]:
+        clauses, params = [], []
+        if start_time is not None:
+            clauses.append("timestamp >= ?")
+            params.append(_iso(start_time))
+        if end_time is not None:
+            clauses.append("timestamp < ?")
+            params.append(_iso(end_time))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        yield from self._iter_docs(
+            f"SELECT doc FROM ml_events{where} ORDER BY id",
+            tuple(params), fields, batch_size,
+        )
+
+    def upsert_session(self, session: dict):
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT doc FROM sessions WHERE session_id = ?", (session["session_id"],)
+            ).fetchone()
+            merged = {**(json.loads(row[0]) if row else {}), **session}
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, status, doc) VALUES (?, ?, ?)",
+                (session["session_id"], merged.get("status"), self._dumps(merged)),
+            )
+
+    def load_active_sessions(self) -> List[dict]:
+        return [
+            json.loads(doc)
+            for (doc,) in self._conn().execute(
+                "SELECT doc FROM sessions WHERE status = ?", ("ACTIVE",)
+            )
+        ]
+
+    def insert_session_events(self, events: List[dict]):
+        rows = [
+            (e.get("session_id"), e.get("timestamp"), self._dumps(e))
+            for e in events
+        ]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO session_events (session_id, timestamp, doc) VALUES (?, ?, ?)",
+                rows,
+            )
+
+    def iter_session_events(self, start_time, end_time, fields,
+                            batch_size) -> Iterator[dict]:
+        clauses, params = [], []
+        if start_time is not None:
+            clauses.append("timestamp >= ?")
+            params.append(_iso(start_time))
+        if end_time is not None:
+            clauses.append("timestamp < ?")
+            params.append(_iso(end_time))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        yield from self._iter_docs(
+            f"SELECT doc FROM session_events{where} ORDER BY id",
+            tuple(params), fields, batch_size,
+        )
+
+    def delete_events_before(self, collection_name: str, cutoff) -> int:
+        if collection_name not in ("ml_events", "session_events"):
+            raise ValueError(f"Retention does not apply to '{collection_name}'")
+        with self._transaction() as conn:
+            return conn.execute(
+                f"DELETE FROM {collection_name} WHERE timestamp < ?", (_iso(cutoff),)
+            ).rowcount
+
+    def merge_event_rollups(self, rollups: List[dict], run_id):
+        with self._transaction() as conn:
+            for delta in rollups:
+                key = _rollup_key(delta)
+                row = conn.execute(
+                    "SELECT doc FROM event_rollups "
+                    "WHERE source = ? AND hour = ? AND user_id = ? AND resource_id = ?",
+                    key,
+                ).fetchone()
+                merged = _apply_rollup(json.loads(row[0]) if row else None, delta, run_id)
+                if merged is None:
+                    continue
+                conn.execute(
+                    "INSERT OR REPLACE INTO event_rollups "
+                    "(source, hour, user_id, resource_id, doc) VALUES (?, ?, ?, ?, ?)",
+                    key + (self._dumps(merged),),
+                )
+
+    def iter_event_rollups(self, source, start_hour, end_hour,
+                           user_id, resource_id) -> Iterator[dict]:
+        clauses, params = [], []
+        for column, value in (("source", source), ("user_id", user_id),
+                              ("resource_id", resource_id)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start_hour is not None:
+            clauses.append("hour >= ?")
+            params.append(_iso(start_hour))
+        if end_hour is not None:
+            clauses.append("hour < ?")
+            params.append(_iso(end_hour))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        yield from self._iter_docs(
+            f"SELECT doc FROM event_rollups{where} ORDER BY source, hour",
+            tuple(params), None, 1000,
+        )
+
+    def get_retention_state(self, source: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT doc FROM retention_state WHERE source = ?", (source,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_retention_state(self, state: dict):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO retention_state (source, doc) VALUES (?, ?)",
+                (state["source"], self._dumps(state)),
+            )
+
+
+# ---------------------------------------------------------------------------
+# Lazy MongoDB connection manager
+# ---------------------------------------------------------------------------
+# Nothing connects at import time. The first storage call starts a background
+# probe and waits at most MONGO_CONNECT_WAIT_MS for it; if MongoDB has not
+# answered by then the call is served from memory. The probe keeps retrying
+# every MONGO_RETRY_SECONDS and, once MongoDB is reachable, copies whatever
+# was written to memory into it and switches all further calls over.
+#
+# The switch is refused (status "degraded", storage stays in memory) when
+# both memory and MongoDB hold an audit chain: the audit log running in
+# this process was started on the in-memory chain and cannot continue the
+# one in MongoDB without a restart.
+
+MONGO_CONNECT_WAIT_MS = int(os.getenv("MONGO_CONNECT_WAIT_MS", "500"))
+MONGO_RETRY_SECONDS = float(os.getenv("MONGO_RETRY_SECONDS", "30"))
+
+_memory_backend = MemoryBackend()
+_mongo_backend: Optional[MongoBackend] = None
+_sqlite_backend: Optional[SQLiteBackend] = None
+
+_conn_lock = threading.Lock()
+_conn_ready = threading.Event()   # set after the first probe finishes
+_conn_thread: Optional[threading.Thread] = None
+_conn_state = {
+    "backend": "memory",      # memory | mongo
+    "status": "idle",         # idle | connecting | connected | unavailable | degraded | disabled
+    "attempts": 0,
+    "last_error": None,
+    "last_attempt_at": None,
+    "connected_at": None,
+}
+# Set once any call has been served from memory while MongoDB was pending
+_memory_served = threading.Event()
+
+
+def _try_connect():
+    """Single connection attempt. Return (client, db) or raise."""
+    from pymongo import MongoClient
+    uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    client = MongoClient(uri, **_settings["mongo_client_options"])
+    try:
+        client.admin.command("ping")
+    except Exception:
+        client.close()
+        raise
+    db_name = os.getenv("MONGO_DB_NAME", "zero_trust")
+    return client, client[db_name]
+
+
+def _probe_loop():
+    """Background worker: keep probing MongoDB until it becomes reachable."""
+    global _mongo_backend
+
+    try:
+        import pymongo  # noqa: F401
+    except ImportError:
+        _conn_state.update(status="disabled", last_error="pymongo not installed")
+        print("[db] pymongo not installed — using in-memory storage (demo mode)")
+        _conn_ready.set()
+        return
+
+    while True:
+        _conn_state["attempts"] += 1
+        _conn_state["last_attempt_at"] = datetime.now().isoformat()
+        try:
+            client, database = _try_connect()
+        except Exception as exc:
+            first_failure = _conn_state["status"] == "connecting"
+            _conn_state.update(status="unavailable", last_error=str(exc))
+            if first_failure:
+                print("[db] MongoDB not available — using in-memory storage "
+                      f"(retrying every {MONGO_RETRY_SECONDS:g}s)")
+            _conn_ready.set()
+            time.sleep(MONGO_RETRY_SECONDS)
             continue
-        resources[rid] = {
-            "name": doc.get("name"),
-            "resource_type": doc.get("resource_type"),
-            "sensitivity_level": doc.get("sensitivity_level"),
-            "required_role": doc.get("required_role"),
-            "required_departments": doc.get("required_departments", []) or [],
-            "min_device_trust": doc.get("min_device_trust"),
-            "allowed_locations": doc.get("allowed_locations", []) or [],
-        }
-    return resources
+
+        backend = MongoBackend(client, database)
+        upgraded = _memory_served.is_set()
+        if upgraded:
+            try:
+                importable = backend.can_import_audit_chain(_memory_backend)
+            except Exception as exc:
+                client.close()
+                _conn_state.update(status="unavailable", last_error=str(exc))
+                time.sleep(MONGO_RETRY_SECONDS)
+                continue
+            if not importable:
+                client.close()
+                _conn_state.update(
+                    status="degraded",
+                    last_error="MongoDB and the in-memory store both hold an audit "
+                               "chain; staying in memory until restart",
+                )
+                print("[db] MongoDB became reachable but already holds an audit chain "
+                      "— staying on in-memory storage (restart to use MongoDB)")
+                _conn_ready.set()
+                return
+
+        _mongo_backend = backend
+        _conn_state.update(
+            backend="mongo",
+            status="connected",
+            last_error=None,
+            connected_at=datetime.now().isoformat(),
+        )
+        _conn_ready.set()
+        if upgraded:
+            # Copied after the switch, so nothing written to memory is missed
+            print("[db] MongoDB became reachable — switching from in-memory storage")
+            try:
+                backend.init()
+                backend.import_from_memory(_memory_backend)
+            except Exception as exc:
+                print(f"[db] Migration of in-memory data failed: {exc}")
+        else:
+            print("[db] Connected to MongoDB successfully")
+        return
+
+
+def _ensure_connection():
+    """Start the background probe on first use (idempotent)."""
+    global _conn_thread
+    if _conn_thread is not None:
+        return
+    with _conn_lock:
+        if _conn_thread is not None:
+            return
+        _conn_state["status"] = "connecting"
+        _conn_thread = threading.Thread(
+            target=_probe_loop, name="mongo-probe", daemon=True
+        )
+        _conn_thread.start()
+    _conn_ready.wait(MONGO_CONNECT_WAIT_MS / 1000.0)
+
+
+def _backend() -> StorageBackend:
+    """Return the backend that should serve the current call."""
+    global _sqlite_backend
+    backend = _settings["backend"]
+    if backend == "sqlite":
+        if _sqlite_backend is None:
+            with _conn_lock:
+                if _sqlite_backend is None:
+                    _sqlite_backend = SQLiteBackend(_settings["sqlite_path"])
+        return _sqlite_backend
+    if backend == "memory":
+        return _memory_backend
+
+    if _mongo_backend is not None:
+        return _mongo_backend
+    _ensure_connection()
+    if _mongo_backend is not None:
+        return _mongo_backend
+    _memory_served.set()
+    return _memory_backend
+
+
+def get_connection_state() -> dict:
+    """Snapshot of the storage connection for health checks."""
+    backend = _settings["backend"]
+    if backend == "sqlite":
+        return _backend().connection_state()
+    if backend == "memory":
+        return {"backend": "memory", "status": "configured"}
+    return {
+        **_conn_state,
+        "client_options": dict(_settings["mongo_client_options"]),
+        "write_policies": {k: dict(v) for k, v in _settings["write_policies"].items()},
+    }
+
+
+# ---------------------------------------------------------------------------
+# Initialization
+# ---------------------------------------------------------------------------
+
+def init_db():
+    """
+    Initialize tables/collections and every index in INDEX_REGISTRY.
+
+    No-op while running in memory; when the background probe later
+    upgrades the connection to MongoDB it creates the indexes itself.
+    """
+    _backend().init()
+
+
+def get_index_stats() -> Dict[str, List[dict]]:
+    """
+    Report every registered index with its usage counters.
+
+    Uses MongoDB's $indexStats; SQLite reports presence only and memory
+    mode only reports the registry. Unknown usage is None.
+    """
+    return _backend().index_stats()
+
+
+# ---------------------------------------------------------------------------
+# Record invalidation
+# ---------------------------------------------------------------------------
+# Every user/resource upsert bumps a per-record version counter stored with
+# the record. Listeners (the read-through caches in modules/record_cache.py)
+# are told about each write in this process; writes made by other workers
+# are picked up when a cached entry's TTL runs out and its version is
+# re-read from storage.
+
+_invalidation_listeners: List[Callable[[str, str, int], None]] = []
+
+
+def add_invalidation_listener(listener: Callable[[str, str, int], None]):
+    """Register listener(collection_name, key, new_version), called after each upsert."""
+    _invalidation_listeners.append(listener)
+
+
+def _notify_invalidation(collection_name: str, key: str, version: int):
+    for listener in list(_invalidation_listeners):
+        listener(collection_name, key, version)
+
+
+# ---------------------------------------------------------------------------
+# Users
+# ---------------------------------------------------------------------------
+
+def upsert_user(user: dict) -> int:
+    """Insert or update a user record. Returns the record's new version."""
+    version = _backend().upsert_user(user)
+    _notify_invalidation("users", user["user_id"], version)
+    return version
+
+
+def get_user_record(user_id: str) -> Optional[Tuple[dict, int]]:
+    """Read one user as (record, version), or None if it is not stored."""
+    doc = _backend().get_user(user_id)
+    if not doc:
+        return None
+    return _strip_internal(doc), doc.get("version", 0)
+
+
+def load_users() -> Dict[str, dict]:
+    """Load all users into a simple dictionary keyed by user_id."""
+    return _backend().load_users()
+
+
+# ---------------------------------------------------------------------------
+# Resources
+# ---------------------------------------------------------------------------
+
+def upsert_resource(resource_id: str, data: dict) -> int:
+    """Insert or update a resource record. Returns the record's new version."""
+    version = _backend().upsert_resource(_resource_payload(resource_id, data))
+    _notify_invalidation("resources", resource_id, version)
+    return version
+
+
+def get_resource_record(resource_id: str) -> Optional[Tuple[dict, int]]:
+    """Read one resource as (record, version), or None if it is not stored."""
+    doc = _backend().get_resource(resource_id)
+    if not doc:
+        return None
+    return _resource_record(doc), doc.get("version", 0)
+
+
+def load_resources() -> Dict[str, dict]:
+    """Load all resources into a dictionary keyed by resource_id."""
+    return _backend().load_resources()
 
 
 # ---------------------------------------------------------------------------
@@ -212,35 +1560,55 @@ def load_resources() -> Dict[str, dict]:
 
 def insert_audit_block(block_dict: dict):
     """Persist an audit block created by BlockchainAuditLog."""
-    if _USE_MEMORY:
-        store = _memory_store["audit_blocks"]
-        for i, b in enumerate(store):
-            if b.get("block_id") == block_dict.get("block_id"):
-                store[i] = block_dict
-                return
-        store.append(dict(block_dict))
-        return
+    _backend().insert_audit_blocks([block_dict])
 
-    db = _get_db()
-    db.audit_blocks.update_one(
-        {"block_id": block_dict.get("block_id")},
-        {"$set": block_dict},
-        upsert=True,
-    )
+
+def insert_audit_blocks_bulk(block_dicts: Iterable[dict]) -> int:
+    """
+    Persist many audit blocks in one round-trip.
+
+    Blocks are inserted in order (one transaction on SQLite). A block_id
+    that is already stored is never overwritten: every backend raises its
+    duplicate-key error instead (ValueError in memory, IntegrityError on
+    SQLite, BulkWriteError/DuplicateKeyError on MongoDB). Returns the
+    number of blocks sent.
+    """
+    blocks = list(block_dicts)
+    if blocks:
+        _backend().insert_audit_blocks(blocks)
+    return len(blocks)
 
 
 def load_audit_blocks() -> List[dict]:
     """Load all audit blocks ordered by block_id."""
-    if _USE_MEMORY:
-        return sorted(
-            _memory_store["audit_blocks"],
-            key=lambda b: b.get("block_id", 0),
-        )
+    return list(iter_audit_blocks())
+
+
+def iter_audit_blocks(
+    start_id: Optional[int] = None,
+    end_id: Optional[int] = None,
+    start_time=None,
+    end_time=None,
+    fields: Optional[Sequence[str]] = None,
+    batch_size: int = 1000,
+) -> Iterator[dict]:
+    """
+    Stream audit blocks ordered by block_id without loading the collection.
+
+    Parameters:
+        start_id / end_id:     block_id range, end exclusive
+        start_time / end_time: timestamp range, end exclusive
+        fields:                optional projection (list of field names)
+        batch_size:            documents fetched per round-trip / slice
+    """
+    return _backend().iter_audit_blocks(
+        start_id, end_id, start_time, end_time, fields, batch_size
+    )
+
 
-    from pymongo import ASCENDING
-    db = _get_db()
-    cursor = db.audit_blocks.find({}).sort("block_id", ASCENDING)
-    return [dict(doc) for doc in cursor]
+def get_last_audit_block(fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+    """Return the block with the highest block_id (one indexed lookup), or None."""
+    return _backend().last_audit_block(fields)
 
 
 # ---------------------------------------------------------------------------
@@ -249,22 +1617,33 @@ def load_audit_blocks() -> List[dict]:
 
 def insert_ml_event(event: dict):
     """Persist a context/decision snapshot for ML training."""
-    if _USE_MEMORY:
-        _memory_store["ml_events"].append(dict(event))
-        return
+    _backend().insert_ml_events([event])
 
-    db = _get_db()
-    db.ml_events.insert_one(event)
+
+def insert_ml_events_bulk(events: Iterable[dict]) -> int:
+    """Persist many ML events with a single unordered insert_many."""
+    events = list(events)
+    if events:
+        _backend().insert_ml_events(events)
+    return len(events)
 
 
 def load_ml_events() -> List[dict]:
     """Load all ML events."""
-    if _USE_MEMORY:
-        return list(_memory_store["ml_events"])
+    return list(iter_ml_events())
+
 
-    db = _get_db()
-    cursor = db.ml_events.find({})
-    return [dict(doc) for doc in cursor]
+def iter_ml_events(
+    start_time=None,
+    end_time=None,
+    fields: Optional[Sequence[str]] = None,
+    batch_size: int = 1000,
+) -> Iterator[dict]:
+    """
+    Stream ML events in insertion order, optionally within a timestamp range
+    (end exclusive) and projected to the given fields.
+    """
+    return _backend().iter_ml_events(start_time, end_time, fields, batch_size)
 
 
 # ---------------------------------------------------------------------------
@@ -273,41 +1652,83 @@ def load_ml_events() -> List[dict]:
 
 def upsert_session(session: dict):
     """Insert or update a session record for continuous verification."""
-    if _USE_MEMORY:
-        store = _memory_store["sessions"]
-        for i, s in enumerate(store):
-            if s.get("session_id") == session.get("session_id"):
-                store[i] = {**s, **session}
-                return
-        store.append(dict(session))
-        return
-
-    db = _get_db()
-    db.sessions.update_one(
-        {"session_id": session["session_id"]},
-        {"$set": session},
-        upsert=True,
-    )
+    _backend().upsert_session(session)
 
 
 def load_active_sessions() -> List[dict]:
     """Load all sessions with ACTIVE status."""
-    if _USE_MEMORY:
-        return [
-            dict(s) for s in _memory_store["sessions"]
-            if s.get("status") == "ACTIVE"
-        ]
-
-    db = _get_db()
-    cursor = db.sessions.find({"status": "ACTIVE"})
-    return [dict(doc) for doc in cursor]
+    return _backend().load_active_sessions()
 
 
 def insert_session_event(event: dict):
     """Persist a re-evaluation event for audit trail."""
-    if _USE_MEMORY:
-        _memory_store["session_events"].append(dict(event))
-        return
+    _backend().insert_session_events([event])
+
+
+def insert_session_events_bulk(events: Iterable[dict]) -> int:
+    """Persist many session re-evaluation events with one insert_many."""
+    events = list(events)
+    if events:
+        _backend().insert_session_events(events)
+    return len(events)
+
+
+def iter_session_events(
+    start_time=None,
+    end_time=None,
+    fields: Optional[Sequence[str]] = None,
+    batch_size: int = 1000,
+) -> Iterator[dict]:
+    """Stream session events in insertion order (same arguments as iter_ml_events)."""
+    return _backend().iter_session_events(start_time, end_time, fields, batch_size)
+
+
+# ---------------------------------------------------------------------------
+# Retention and hourly rollups
+# ---------------------------------------------------------------------------
+
+def delete_ml_events_before(cutoff) -> int:
+    """Delete ML events with timestamp < cutoff. Returns the number removed."""
+    return _backend().delete_events_before("ml_events", cutoff)
+
+
+def delete_session_events_before(cutoff) -> int:
+    """Delete session events with timestamp < cutoff. Returns the number removed."""
+    return _backend().delete_events_before("session_events", cutoff)
+
+
+def merge_event_rollups(rollups: Iterable[dict], run_id: Optional[str] = None) -> int:
+    """
+    Add hourly aggregate documents into the event_rollups collection.
+
+    Each rollup is keyed by (source, hour, user_id, resource_id); counts,
+    decision tallies and risk histogram buckets are summed into any
+    existing document with the same key. With a run_id, a document that
+    already took a rollup from the same run is left alone, so a retention
+    run repeated after a failure does not count its events twice.
+    """
+    rollups = list(rollups)
+    if rollups:
+        _backend().merge_event_rollups(rollups, run_id)
+    return len(rollups)
+
+
+def iter_event_rollups(
+    source: Optional[str] = None,
+    start_hour=None,
+    end_hour=None,
+    user_id: Optional[str] = None,
+    resource_id: Optional[str] = None,
+) -> Iterator[dict]:
+    """Stream hourly rollups, optionally filtered by source, hour range (end exclusive), user and resource."""
+    return _backend().iter_event_rollups(source, start_hour, end_hour, user_id, resource_id)
+
+
+def get_retention_state(source: str) -> Optional[dict]:
+    """Retention watermark for an event source (see modules/event_retention.py), or None."""
+    return _backend().get_retention_state(source)
+
 
-    db = _get_db()
-    db.session_events.insert_one(event)
\ No newline at end of file
+def set_retention_state(state: dict):
+    """Store the retention watermark for state["source"], replacing the previous one."""
+    _backend().set_retention_state(state)
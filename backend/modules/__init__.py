@@ -7,8 +7,11 @@ from .rbac import RBACModule
 from .abac import ABACModule
 from .risk_scoring import RiskScoringEngine
 from .decision_engine import DecisionEngine
-from .blockchain_audit import BlockchainAuditLog, AuditBlock
+from .blockchain_audit import BlockchainAuditLog, AuditBlock, build_audit_store
+from .audit_appender import GroupCommitAppender
 from .continuous_verification import SessionManager
+from .event_retention import EventRetention
+from .record_cache import RecordCache, build_record_caches
 
 __all__ = [
     'AuthenticationModule',
@@ -18,5 +21,10 @@ __all__ = [
     'DecisionEngine',
     'BlockchainAuditLog',
     'AuditBlock',
-    'SessionManager'
+    'build_audit_store',
+    'GroupCommitAppender',
+    'SessionManager',
+    'EventRetention',
+    'RecordCache',
+    'build_record_caches'
 ]
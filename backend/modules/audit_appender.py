@@ -0,0 +1,235 @@
+"""
+Group-Commit Audit Appender
+Takes audit I/O off the request path by batching appends.
+
+Request threads enqueue their access decision and wait. A single writer
+thread drains the queue: a decision that arrives alone is committed at
+once; when others are already queued it waits up to `flush_interval_ms`
+(or until `max_batch` are queued), then chain-hashes the whole batch in
+order and persists it with one bulk write followed by one store flush.
+Every waiting caller is released with its own block (block_id, hash, ...)
+once the batch is durable, or with the error if the write failed.
+
+A caller that gives up after `commit_timeout` cancels its decision unless
+the writer has already started committing it, in which case it keeps
+waiting for the result, so a timeout never leaves a block to be written
+behind the caller's back.
+
+Batch sizes, the time between commits and the current queue depth are
+reported by get_stats() for the metrics endpoints.
+"""
+
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class _Pending:
+    __slots__ = ("decision", "enqueued_at", "done", "block", "error", "claimed", "cancelled")
+
+    def __init__(self, decision: tuple):
+        self.decision = decision
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.block = None
+        self.error = None
+        self.claimed = False     # the writer is committing it
+        self.cancelled = False   # the caller gave up before that
+
+
+class GroupCommitAppender:
+    """
+    Batching front end for BlockchainAuditLog.add_access_decision.
+
+    Parameters:
+        audit_log:         BlockchainAuditLog the batches are appended to
+        max_batch:         most decisions committed in one write
+        flush_interval_ms: longest a queued decision waits for others to join
+        max_queue:         queued decisions before callers block (backpressure)
+        commit_timeout:    seconds a caller waits for its batch to commit
+    """
+
+    def __init__(self, audit_log, max_batch: int = 256, flush_interval_ms: float = 2,
+                 max_queue: int = 10000, commit_timeout: float = 10.0):
+        self.audit_log = audit_log
+        self.max_batch = max(1, max_batch)
+        self.flush_interval_ms = max(0, flush_interval_ms)
+        self.max_queue = max(1, max_queue)
+        self.commit_timeout = commit_timeout
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+        self._thread = None
+        self._stopping = False
+        # Guards start/stop against submissions and claim against cancel
+        self._state_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._last_commit_at = None
+        self._stats = {
+            "batches": 0,
+            "blocks": 0,
+            "failed_batches": 0,
+            "cancelled": 0,
+            "last_batch_size": 0,
+            "largest_batch": 0,
+            "last_flush_interval_ms": 0.0,
+            "commit_ms_total": 0.0,
+            "wait_ms_total": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Callers
+    # ------------------------------------------------------------------
+
+    def add_access_decision(self, user_id: str, resource_id: str, decision: str,
+                            risk_score: float) -> dict:
+        """
+        Record an access decision and return its block once it is durable.
+
+        Same signature and result as BlockchainAuditLog.add_access_decision;
+        when the writer is not running the decision is appended directly.
+        Raises TimeoutError if the decision was dropped without being
+        written, and RuntimeError once stop() has begun.
+        """
+        if self._thread is None:
+            return self.audit_log.add_access_decision(user_id, resource_id, decision,
+                                                      risk_score)
+        pending = _Pending((user_id, resource_id, decision, risk_score))
+        if not self._slots.acquire(timeout=self.commit_timeout):
+            raise TimeoutError("Audit append queue is full")
+        with self._state_lock:
+            if self._stopping or self._thread is None:
+                self._slots.release()
+                raise RuntimeError("Audit appender is stopping")
+            self._queue.put(pending)
+
+        if not pending.done.wait(self.commit_timeout):
+            with self._state_lock:
+                if not pending.claimed:
+                    pending.cancelled = True
+            if pending.cancelled:
+                with self._stats_lock:
+                    self._stats["cancelled"] += 1
+                raise TimeoutError("Audit batch was not committed in time")
+            # Already being written: the outcome is only moments away
+            pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.block
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the writer thread."""
+        with self._state_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="audit-group-commit", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Reject new decisions, commit everything already queued, then stop the writer."""
+        with self._state_lock:
+            thread = self._thread
+            if thread is None or self._stopping:
+                return
+            self._stopping = True
+            self._queue.put(_STOP)
+        thread.join()
+        with self._state_lock:
+            self._thread = None
+            self._stopping = False
+
+    def _take(self, block: bool = True, timeout: float = None):
+        """Next queued item; frees its queue slot."""
+        item = self._queue.get(block, timeout)
+        if item is not _STOP:
+            self._slots.release()
+        return item
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._take()
+            if first is _STOP:
+                break
+            batch = [first]
+            # Only wait for company when others are already queued; a
+            # decision arriving alone is committed straight away
+            alone = self._queue.empty()
+            deadline = time.perf_counter() + self.flush_interval_ms / 1000.0
+            while not alone and len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = (self._take(timeout=remaining) if remaining > 0
+                            else self._take(block=False))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch: list):
+        with self._state_lock:
+            batch = [pending for pending in batch if not pending.cancelled]
+            for pending in batch:
+                pending.claimed = True
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            blocks = self.audit_log.add_access_decisions([p.decision for p in batch])
+            self.audit_log.store.flush()
+        except Exception as exc:
+            with self._stats_lock:
+                self._stats["failed_batches"] += 1
+            for pending in batch:
+                pending.error = exc
+                pending.done.set()
+            return
+
+        committed = time.perf_counter()
+        for pending, block in zip(batch, blocks):
+            pending.block = block
+            pending.done.set()
+
+        with self._stats_lock:
+            stats = self._stats
+            stats["batches"] += 1
+            stats["blocks"] += len(batch)
+            stats["last_batch_size"] = len(batch)
+            stats["largest_batch"] = max(stats["largest_batch"], len(batch))
+            stats["commit_ms_total"] += (committed - started) * 1000
+            stats["wait_ms_total"] += sum(committed - p.enqueued_at for p in batch) * 1000
+            if self._last_commit_at is not None:
+                stats["last_flush_interval_ms"] = (committed - self._last_commit_at) * 1000
+            self._last_commit_at = committed
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches, blocks = stats["batches"], stats["blocks"]
+        return {
+            "running": self._thread is not None,
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "max_batch": self.max_batch,
+            "flush_interval_ms": self.flush_interval_ms,
+            "batches": batches,
+            "blocks": blocks,
+            "failed_batches": stats["failed_batches"],
+            "cancelled": stats["cancelled"],
+            "last_batch_size": stats["last_batch_size"],
+            "largest_batch": stats["largest_batch"],
+            "average_batch_size": round(blocks / batches, 2) if batches else 0.0,
+            "last_flush_interval_ms": round(stats["last_flush_interval_ms"], 3),
+            "average_commit_ms": round(stats["commit_ms_total"] / batches, 3) if batches else 0.0,
+            "average_wait_ms": round(stats["wait_ms_total"] / blocks, 3) if blocks else 0.0,
+        }
@@ -0,0 +1,546 @@
+"""
+Columnar in-memory storage for the audit blockchain.
+
+Instead of one Python object per block, the chain is held as parallel
+typed arrays, one per field:
+
+    block_id      array('q')
+    user_id       array('I')   code into an interned string table
+    resource_id   array('I')   code into the same string table
+    decision      array('B')   code into a small enum table
+    risk_score    array('d')   plus a bytearray flag: was it an int?
+    timestamp     array('q')   microseconds since the Unix epoch
+    hash          bytearray    32 raw SHA-256 bytes per block
+    hash_version  bytearray    canonical encoding the hash was computed over
+
+previous_hash is not stored: it is always the hash of the block before,
+except where a value could not be reconstructed exactly (see below).
+
+Hashes are computed over the original field values, so every encoding
+must round-trip: risk scores remember whether they were ints (json
+renders 5 and 5.0 differently), and timestamps are only epoch-encoded
+when formatting them back gives the identical ISO string. Anything that
+does not round-trip (unusual timestamp formats, non-hex hashes, a
+previous_hash that does not match its predecessor) is kept verbatim in a
+small per-block override dict, so the chain never loses information.
+
+Blocks are materialised as lightweight objects only when indexed.
+
+PagedChain keeps only the newest blocks in columns and reads older ones
+back from the audit store in fixed-size pages, so startup and resident
+memory do not grow with the length of the history.
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, Optional
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+DIGEST_SIZE = 32
+GENESIS_PREVIOUS_HASH = "0" * 64
+
+KNOWN_DECISIONS = ("ALLOW", "CONDITIONAL", "DENY", "N/A")
+
+# Stored block fields, in fields_at() order
+ROW_FIELDS = ('block_id', 'user_id', 'resource_id', 'decision', 'risk_score',
+              'timestamp', 'previous_hash', 'hash', 'hash_version')
+
+
+def row_fields(doc: dict) -> tuple:
+    """fields_at()-style tuple for a stored block document."""
+    return (doc['block_id'], doc['user_id'], doc['resource_id'], doc['decision'],
+            doc['risk_score'], doc['timestamp'], doc['previous_hash'], doc['hash'],
+            doc.get('hash_version', 1))
+
+
+class _ChainSlice(Sequence):
+    """Lazy slice of a ColumnarChain or PagedChain; blocks are materialised on access."""
+
+    def __init__(self, chain, indices: range):
+        self._chain = chain
+        self._indices = indices
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return _ChainSlice(self._chain, self._indices[item])
+        return self._chain[self._indices[item]]
+
+
+class ColumnarChain(Sequence):
+    """
+    Audit chain as typed columns, with the list interface the routes use
+    (len, indexing, slicing, iteration, append).
+
+    Parameters:
+        block_factory: builds a block object from (block_id, user_id,
+                       resource_id, decision, risk_score, timestamp,
+                       previous_hash, hash, hash_version) without rehashing it
+    """
+
+    def __init__(self, block_factory: Callable):
+        self._block_factory = block_factory
+        self._block_ids = array('q')
+        self._users = array('I')
+        self._resources = array('I')
+        self._decisions = array('B')
+        self._risk = array('d')
+        self._risk_is_int = bytearray()
+        self._timestamps = array('q')
+        self._digests = bytearray()
+        self._hash_versions = bytearray()
+        # Interned strings for user and resource ids
+        self._strings = []
+        self._string_codes = {}
+        self._decision_names = list(KNOWN_DECISIONS)
+        self._decision_codes = {name: code for code, name in enumerate(KNOWN_DECISIONS)}
+        # index -> {field: original value} for values that do not round-trip
+        self._overrides = {}
+        # Hash the first block links to (a trimmed chain starts mid-history)
+        self.first_previous_hash = GENESIS_PREVIOUS_HASH
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def _intern(self, value: str) -> int:
+        code = self._string_codes.get(value)
+        if code is None:
+            code = self._string_codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    def _decision_code(self, decision: str) -> int:
+        code = self._decision_codes.get(decision)
+        if code is None:
+            code = self._decision_codes[decision] = len(self._decision_names)
+            self._decision_names.append(decision)
+        return code
+
+    @staticmethod
+    def _encode_timestamp(timestamp) -> Optional[int]:
+        """Microseconds since epoch, or None if the string would not round-trip."""
+        if not isinstance(timestamp, str):
+            return None
+        try:
+            parsed = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return None
+        if parsed.tzinfo is not None or parsed.isoformat() != timestamp:
+            return None
+        return (parsed - EPOCH) // MICROSECOND
+
+    @staticmethod
+    def _encode_digest(hex_digest) -> Optional[bytes]:
+        if not isinstance(hex_digest, str) or len(hex_digest) != DIGEST_SIZE * 2:
+            return None
+        try:
+            raw = bytes.fromhex(hex_digest)
+        except ValueError:
+            return None
+        return raw if raw.hex() == hex_digest else None
+
+    def _expected_previous(self, index: int) -> str:
+        if index == 0:
+            return self.first_previous_hash
+        return self.hash_at(index - 1)
+
+    def _encode(self, index: int, block_id, user_id, resource_id, decision,
+                risk_score, timestamp, previous_hash, hash_hex) -> tuple:
+        """Column values for one block; records overrides as a side effect."""
+        overrides = {}
+        if isinstance(user_id, str):
+            user_code = self._intern(user_id)
+        else:
+            user_code, overrides['user_id'] = 0, user_id
+        if isinstance(resource_id, str):
+            resource_code = self._intern(resource_id)
+        else:
+            resource_code, overrides['resource_id'] = 0, resource_id
+        if isinstance(decision, str):
+            decision_code = self._decision_code(decision)
+        else:
+            decision_code, overrides['decision'] = 0, decision
+        if isinstance(risk_score, bool) or not isinstance(risk_score, (int, float)):
+            risk, risk_is_int = 0.0, 0
+            overrides['risk_score'] = risk_score
+        else:
+            risk, risk_is_int = float(risk_score), int(isinstance(risk_score, int))
+            if risk_is_int and int(risk) != risk_score:
+                overrides['risk_score'] = risk_score   # int beyond float precision
+        ts = self._encode_timestamp(timestamp)
+        if ts is None:
+            ts, overrides['timestamp'] = 0, timestamp
+        digest = self._encode_digest(hash_hex)
+        if digest is None:
+            digest, overrides['hash'] = bytes(DIGEST_SIZE), hash_hex
+        if not isinstance(block_id, int) or isinstance(block_id, bool):
+            overrides['block_id'] = block_id
+            block_id = 0
+        if previous_hash != self._expected_previous(index):
+            overrides['previous_hash'] = previous_hash
+
+        if overrides:
+            self._overrides[index] = overrides
+        else:
+            self._overrides.pop(index, None)
+        return (block_id, user_code, resource_code, decision_code,
+                risk, risk_is_int, ts, digest)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append_fields(self, block_id, user_id, resource_id, decision, risk_score,
+                      timestamp, previous_hash, hash_hex, hash_version=1):
+        """Append one block given its field values (no object is built)."""
+        values = self._encode(len(self), block_id, user_id, resource_id, decision,
+                              risk_score, timestamp, previous_hash, hash_hex)
+        (block_id, user_code, resource_code, decision_code,
+         risk, risk_is_int, ts, digest) = values
+        self._block_ids.append(block_id)
+        self._users.append(user_code)
+        self._resources.append(resource_code)
+        self._decisions.append(decision_code)
+        self._risk.append(risk)
+        self._risk_is_int.append(risk_is_int)
+        self._timestamps.append(ts)
+        self._digests += digest
+        self._hash_versions.append(hash_version)
+
+    def append(self, block):
+        """Append a block object (e.g. a freshly created AuditBlock)."""
+        self.append_fields(block.block_id, block.user_id, block.resource_id,
+                           block.decision, block.risk_score, block.timestamp,
+                           block.previous_hash, block.hash, block.hash_version)
+
+    def __setitem__(self, index: int, block):
+        """
+        Overwrite the block at index in place (repairs, tamper simulation).
+
+        The next block's previous_hash is pinned first so it keeps its
+        stored value rather than following the new hash.
+        """
+        index = range(len(self))[index]
+        if index + 1 < len(self):
+            following = self._overrides.setdefault(index + 1, {})
+            following.setdefault('previous_hash', self.previous_hash_at(index + 1))
+        (block_id, user_code, resource_code, decision_code,
+         risk, risk_is_int, ts, digest) = self._encode(
+            index, block.block_id, block.user_id, block.resource_id, block.decision,
+            block.risk_score, block.timestamp, block.previous_hash, block.hash)
+        self._block_ids[index] = block_id
+        self._users[index] = user_code
+        self._resources[index] = resource_code
+        self._decisions[index] = decision_code
+        self._risk[index] = risk
+        self._risk_is_int[index] = risk_is_int
+        self._timestamps[index] = ts
+        self._digests[index * DIGEST_SIZE:(index + 1) * DIGEST_SIZE] = digest
+        self._hash_versions[index] = block.hash_version
+        if index + 1 < len(self) and \
+                self._overrides[index + 1]['previous_hash'] == self.hash_at(index):
+            del self._overrides[index + 1]['previous_hash']
+            if not self._overrides[index + 1]:
+                del self._overrides[index + 1]
+
+    def clear(self):
+        self.__init__(self._block_factory)
+
+    def drop_front(self, count: int):
+        """Forget the oldest count blocks; the rest keep their values and links."""
+        count = min(count, len(self))
+        if count <= 0:
+            return
+        self.first_previous_hash = self.hash_at(count - 1)
+        for column in (self._block_ids, self._users, self._resources, self._decisions,
+                       self._risk, self._risk_is_int, self._timestamps, self._hash_versions):
+            del column[:count]
+        del self._digests[:count * DIGEST_SIZE]
+        self._overrides = {index - count: values
+                           for index, values in self._overrides.items() if index >= count}
+
+    # ------------------------------------------------------------------
+    # Column accessors (no block object is built)
+    # ------------------------------------------------------------------
+
+    def _field(self, index: int, name: str, default):
+        overrides = self._overrides.get(index)
+        if overrides is not None and name in overrides:
+            return overrides[name]
+        return default
+
+    def hash_at(self, index: int) -> str:
+        overrides = self._overrides.get(index)
+        if overrides is not None and 'hash' in overrides:
+            return overrides['hash']
+        return self._digests[index * DIGEST_SIZE:(index + 1) * DIGEST_SIZE].hex()
+
+    def previous_hash_at(self, index: int) -> str:
+        overrides = self._overrides.get(index)
+        if overrides is not None and 'previous_hash' in overrides:
+            return overrides['previous_hash']
+        return self._expected_previous(index)
+
+    def risk_at(self, index: int):
+        risk = self._risk[index]
+        return self._field(index, 'risk_score', int(risk) if self._risk_is_int[index] else risk)
+
+    def timestamp_at(self, index: int) -> str:
+        overrides = self._overrides.get(index)
+        if overrides is not None and 'timestamp' in overrides:
+            return overrides['timestamp']
+        return (EPOCH + self._timestamps[index] * MICROSECOND).isoformat()
+
+    def user_at(self, index: int) -> str:
+        # A non-string id is only an override (code 0 may not be interned yet)
+        overrides = self._overrides.get(index)
+        if overrides is not None and 'user_id' in overrides:
+            return overrides['user_id']
+        return self._strings[self._users[index]]
+
+    def resource_at(self, index: int) -> str:
+        overrides = self._overrides.get(index)
+        if overrides is not None and 'resource_id' in overrides:
+            return overrides['resource_id']
+        return self._strings[self._resources[index]]
+
+    def decision_at(self, index: int) -> str:
+        return self._field(index, 'decision', self._decision_names[self._decisions[index]])
+
+    def block_id_at(self, index: int) -> int:
+        return self._field(index, 'block_id', self._block_ids[index])
+
+    def fields_at(self, index: int) -> tuple:
+        """
+        (block_id, user_id, resource_id, decision, risk_score, timestamp,
+         previous_hash, hash, hash_version)
+        """
+        return (self.block_id_at(index), self.user_at(index), self.resource_at(index),
+                self.decision_at(index), self.risk_at(index), self.timestamp_at(index),
+                self.previous_hash_at(index), self.hash_at(index),
+                self._hash_versions[index])
+
+    def iter_rows(self, start: int = 0, end: Optional[int] = None) -> Iterator[tuple]:
+        """fields_at() for indices [start, end)."""
+        end = len(self) if end is None else min(end, len(self))
+        return (self.fields_at(i) for i in range(start, end))
+
+    # ------------------------------------------------------------------
+    # Sequence interface
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        # hash_version is the last column appended, so concurrent readers
+        # never see a block whose columns are only partly written
+        return len(self._hash_versions)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return _ChainSlice(self, range(len(self))[item])
+        index = range(len(self))[item]   # normalises negatives, raises IndexError
+        return self._block_factory(*self.fields_at(index))
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the columns (excluding interned strings)."""
+        columns = (self._block_ids, self._users, self._resources, self._decisions,
+                   self._risk, self._timestamps)
+        return (sum(c.itemsize * len(c) for c in columns) + len(self._risk_is_int)
+                + len(self._digests) + len(self._hash_versions))
+
+
+class PagedChain(Sequence):
+    """
+    Chain with only the newest blocks resident.
+
+    Indices >= `base` live in a ColumnarChain (the hot window); older
+    indices are read from the audit store one page of `page_size` blocks
+    at a time, with the last `cached_pages` pages kept in an LRU. Once the
+    hot part grows to twice `hot_window` blocks its oldest half is dropped,
+    so memory stays bounded while appends remain cheap.
+
+    Cold blocks are read-only here; they can only change in storage.
+
+    Parameters:
+        block_factory: as for ColumnarChain
+        store:         audit store with iter_blocks(start_id, end_id, fields)
+        hot_window:    blocks kept resident behind the tip
+        page_size:     blocks read per storage round trip
+        cached_pages:  cold pages kept in memory
+    """
+
+    def __init__(self, block_factory: Callable, store, hot_window: int,
+                 page_size: int = 1024, cached_pages: int = 8):
+        self._block_factory = block_factory
+        self._store = store
+        self.hot_window = max(1, hot_window)
+        self.page_size = max(1, page_size)
+        self.cached_pages = max(1, cached_pages)
+        self._hot = ColumnarChain(block_factory)
+        self._base = 0
+        # Held while _trim moves blocks out of the hot columns, and by
+        # readers that turn an index into a hot offset, so no read lands
+        # on a shifted row
+        self._trim_lock = threading.Lock()
+        self._pages: "OrderedDict[int, list]" = OrderedDict()
+        self._pages_lock = threading.Lock()
+        self.page_reads = 0
+
+    @property
+    def base(self) -> int:
+        """Index of the oldest resident block."""
+        return self._base
+
+    # ------------------------------------------------------------------
+    # Loading and writes
+    # ------------------------------------------------------------------
+
+    def load_tail(self, tip_block_id: int):
+        """
+        Make the blocks up to tip_block_id the chain, reading only the hot
+        window (plus the block before it, for its hash) from storage.
+        """
+        self.clear()
+        self._base = max(0, tip_block_id + 1 - self.hot_window)
+        start_id = max(0, self._base - 1)
+        for doc in self._store.iter_blocks(start_id=start_id, end_id=tip_block_id + 1,
+                                           fields=ROW_FIELDS):
+            row = row_fields(doc)
+            if row[0] < self._base:
+                self._hot.first_previous_hash = row[7]
+            else:
+                self._hot.append_fields(*row)
+        if self._base + len(self._hot) != tip_block_id + 1:
+            raise LookupError(
+                f"Audit store is missing blocks between {self._base} and {tip_block_id}"
+            )
+
+    def append_fields(self, *fields):
+        self._hot.append_fields(*fields)
+        self._trim()
+
+    def append(self, block):
+        self._hot.append(block)
+        self._trim()
+
+    def _trim(self):
+        excess = len(self._hot) - self.hot_window
+        if excess >= self.hot_window:
+            with self._trim_lock:
+                self._hot.drop_front(excess)
+                self._base += excess
+
+    def __setitem__(self, index: int, block):
+        index = range(len(self))[index]
+        with self._trim_lock:
+            if index < self._base:
+                raise TypeError(f"Block {index} is outside the resident window and read-only")
+            self._hot[index - self._base] = block
+
+    def clear(self):
+        with self._trim_lock:
+            self._hot.clear()
+            self._base = 0
+        with self._pages_lock:
+            self._pages.clear()
+
+    # ------------------------------------------------------------------
+    # Cold pages
+    # ------------------------------------------------------------------
+
+    def _page(self, page_no: int) -> list:
+        # Request threads and the warm-up thread share the LRU; storage is
+        # read outside the lock (two threads may read the same page once)
+        with self._pages_lock:
+            page = self._pages.get(page_no)
+            if page is not None:
+                self._pages.move_to_end(page_no)
+                return page
+        start = page_no * self.page_size
+        page = [row_fields(doc) for doc in self._store.iter_blocks(
+            start_id=start, end_id=start + self.page_size, fields=ROW_FIELDS)]
+        with self._pages_lock:
+            self.page_reads += 1
+            self._pages[page_no] = page
+            while len(self._pages) > self.cached_pages:
+                self._pages.popitem(last=False)
+        return page
+
+    def _cold_row(self, index: int) -> tuple:
+        page = self._page(index // self.page_size)
+        offset = index % self.page_size
+        if offset >= len(page) or page[offset][0] != index:
+            raise LookupError(f"Audit block {index} is missing from storage")
+        return page[offset]
+
+    # ------------------------------------------------------------------
+    # Column accessors
+    # ------------------------------------------------------------------
+
+    def fields_at(self, index: int) -> tuple:
+        with self._trim_lock:
+            if index >= self._base:
+                return self._hot.fields_at(index - self._base)
+        return self._cold_row(index)
+
+    def hash_at(self, index: int) -> str:
+        with self._trim_lock:
+            if index >= self._base:
+                return self._hot.hash_at(index - self._base)
+        return self._cold_row(index)[7]
+
+    def iter_rows(self, start: int = 0, end: Optional[int] = None) -> Iterator[tuple]:
+        """
+        fields_at() for indices [start, end). Cold blocks are streamed from
+        storage without going through the page cache, so a full scan does
+        not evict the pages recent lookups are using.
+
+        Hot blocks are copied a page at a time under the trim lock, so a
+        trim waits for at most one page; blocks it moved out of the window
+        meanwhile are then streamed from storage.
+        """
+        end = len(self) if end is None else min(end, len(self))
+        index = start
+        while index < end:
+            with self._trim_lock:
+                base = self._base
+                if index >= base:
+                    page_end = min(end, index + self.page_size)
+                    rows = list(self._hot.iter_rows(index - base, page_end - base))
+            if index < base:
+                cold_end = min(end, base)
+                for doc in self._store.iter_blocks(start_id=index, end_id=cold_end,
+                                                   fields=ROW_FIELDS):
+                    row = row_fields(doc)
+                    if row[0] != index:
+                        raise LookupError(f"Audit block {index} is missing from storage")
+                    index += 1
+                    yield row
+                if index != cold_end:
+                    raise LookupError(f"Audit block {index} is missing from storage")
+                continue
+            yield from rows
+            index = page_end
+
+    # ------------------------------------------------------------------
+    # Sequence interface
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return self._base + len(self._hot)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return _ChainSlice(self, range(len(self))[item])
+        index = range(len(self))[item]
+        return self._block_factory(*self.fields_at(index))
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the hot columns (excluding cached pages)."""
+        return self._hot.memory_bytes()
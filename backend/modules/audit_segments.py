@@ -0,0 +1,379 @@
+"""
+Append-only segmented file store for the audit blockchain.
+
+Audit blocks are immutable and only ever appended, so they are written
+sequentially into fixed-size segment files instead of being upserted as
+database documents.
+
+On-disk layout (one directory):
+
+    00000000000000000000.seg   first block_id in the segment, zero padded
+    00000000000000004711.seg
+    ...
+
+Each segment starts with an 8-byte header (magic + format version)
+followed by length-prefixed records:
+
+    >I  payload length
+    >Q  block_id
+    >I  CRC32 of payload
+        payload (UTF-8 JSON of the block dict)
+
+Durability: appends go to the OS immediately but fsync is batched, either
+every `fsync_every` records or `fsync_interval` seconds after the first
+unsynced record, whichever comes first. `flush()` forces a sync.
+
+Reads go through read-only memory maps. A sparse in-memory index keeps
+one (block_id -> segment, offset) entry every `index_interval` records
+plus one per segment start, so `get_block` bisects to a nearby offset
+and walks at most `index_interval` record headers. On restart only the
+record headers are walked to rebuild that index; payloads are decoded
+lazily when a block is actually read.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Sequence
+
+SEGMENT_MAGIC = b"ZTAS"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct(">4sBxxx")
+RECORD_HEADER = struct.Struct(">IQI")
+
+
+class _Segment:
+    """One segment file plus its (lazily refreshed) read-only mapping."""
+
+    def __init__(self, path: str, first_block_id: int):
+        self.path = path
+        self.first_block_id = first_block_id
+        self.size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+
+    def view(self) -> mmap.mmap:
+        """Return a mapping covering at least `self.size` bytes."""
+        if self._map is None or self._mapped_size < self.size:
+            # The previous mapping is not closed here: iterators may still
+            # hold it, and it is released once they drop their reference.
+            with open(self.path, "rb") as fh:
+                self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_size = len(self._map)
+        return self._map
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._mapped_size = 0
+
+
+class SegmentedAuditStore:
+    """
+    Append-only audit block store backed by segment files.
+
+    Implements the same store interface as DatabaseAuditStore in
+    blockchain_audit.py: append, append_many, iter_blocks, get_block,
+    get_last_block, flush and close.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 64 * 1024 * 1024,
+                 fsync_every: int = 64, fsync_interval: float = 0.05,
+                 index_interval: int = 256):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self.index_interval = max(1, index_interval)
+
+        self._lock = threading.RLock()
+        self._segments: List[_Segment] = []
+        self._index_ids: List[int] = []          # sparse index keys (block_id)
+        self._index_pos: List[tuple] = []        # (segment number, offset)
+        self._records_since_index = 0
+        self._writer = None
+        self._unsynced = 0
+        self._sync_timer: Optional[threading.Timer] = None
+        # Set if a failed append could not be rolled back; appends then stop
+        self._broken: Optional[BaseException] = None
+        self.last_block_id: Optional[int] = None
+        self.block_count = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._open_existing()
+
+    # ------------------------------------------------------------------
+    # Startup
+    # ------------------------------------------------------------------
+
+    def _open_existing(self):
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(".seg"))
+        for name in names:
+            first_id = int(name[:-4])
+            segment = _Segment(os.path.join(self.directory, name), first_id)
+            self._segments.append(segment)
+            self._scan_segment(len(self._segments) - 1, is_last=(name == names[-1]))
+
+    def _scan_segment(self, seg_no: int, is_last: bool):
+        """Walk record headers to rebuild the sparse index."""
+        segment = self._segments[seg_no]
+        if segment.size < SEGMENT_HEADER.size:
+            self._write_segment_header(segment.path)
+            segment.size = SEGMENT_HEADER.size
+            return
+
+        view = segment.view()
+        magic, version = SEGMENT_HEADER.unpack_from(view, 0)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            raise ValueError(f"{segment.path} is not an audit segment file")
+
+        offset = SEGMENT_HEADER.size
+        valid_end = offset
+        first_in_segment = True
+        while offset + RECORD_HEADER.size <= segment.size:
+            length, block_id, crc = RECORD_HEADER.unpack_from(view, offset)
+            end = offset + RECORD_HEADER.size + length
+            if end > segment.size:
+                break
+            # Only the active (last) segment can hold a torn write, so only
+            # its payloads are checksummed at startup.
+            if is_last and zlib.crc32(view[offset + RECORD_HEADER.size:end]) != crc:
+                break
+            self._note_record(seg_no, offset, block_id, force_index=first_in_segment)
+            first_in_segment = False
+            offset = valid_end = end
+
+        if valid_end < segment.size:
+            # Drop a partially written tail left by a crash
+            segment.close()
+            with open(segment.path, "r+b") as fh:
+                fh.truncate(valid_end)
+            segment.size = valid_end
+
+    def _note_record(self, seg_no: int, offset: int, block_id: int, force_index: bool):
+        if force_index or self._records_since_index >= self.index_interval:
+            self._index_ids.append(block_id)
+            self._index_pos.append((seg_no, offset))
+            self._records_since_index = 0
+        self._records_since_index += 1
+        self.last_block_id = block_id
+        self.block_count += 1
+
+    @staticmethod
+    def _write_segment_header(path: str):
+        with open(path, "wb") as fh:
+            fh.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION))
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _roll_if_needed(self, block_id: int, record_size: int) -> bool:
+        """Open a new segment when the current one cannot take the record."""
+        current = self._segments[-1] if self._segments else None
+        if current is not None and (
+            current.size + record_size <= self.segment_size
+            or current.size == SEGMENT_HEADER.size
+        ):
+            if self._writer is None:
+                self._writer = open(current.path, "ab")
+            return current.size == SEGMENT_HEADER.size
+
+        self._close_writer()
+        path = os.path.join(self.directory, f"{block_id:020d}.seg")
+        self._write_segment_header(path)
+        self._segments.append(_Segment(path, block_id))
+        self._writer = open(path, "ab")
+        return True
+
+    @staticmethod
+    def _encode(block_dict: dict, last_block_id: Optional[int]) -> bytes:
+        block_id = block_dict["block_id"]
+        if last_block_id is not None and block_id <= last_block_id:
+            raise ValueError(
+                f"Audit store is append-only: block {block_id} <= last block {last_block_id}"
+            )
+        payload = json.dumps(
+            {k: v for k, v in block_dict.items() if k != "_id"},
+            sort_keys=True, separators=(",", ":"),
+        ).encode("utf-8")
+        return RECORD_HEADER.pack(len(payload), block_id, zlib.crc32(payload)) + payload
+
+    def append(self, block_dict: dict):
+        """Append one block; blocks must arrive in increasing block_id order."""
+        self.append_many([block_dict])
+
+    def append_many(self, block_dicts: Sequence[dict]):
+        """
+        Append several blocks sequentially and sync them as one batch.
+
+        The index only learns about the blocks once every record has been
+        written and flushed; if a write fails, the files are truncated back
+        to where the batch started, so the same ids can be appended again.
+        """
+        with self._lock:
+            if self._broken is not None:
+                raise RuntimeError("Audit store needs a restart: a failed append "
+                                   "could not be rolled back") from self._broken
+            records, last_id = [], self.last_block_id
+            for block_dict in block_dicts:
+                records.append((block_dict["block_id"], self._encode(block_dict, last_id)))
+                last_id = block_dict["block_id"]
+            if not records:
+                return
+
+            segment_count = len(self._segments)
+            resume_size = self._segments[-1].size if self._segments else 0
+            written = []
+            try:
+                for block_id, record in records:
+                    new_segment = self._roll_if_needed(block_id, len(record))
+                    segment = self._segments[-1]
+                    self._writer.write(record)
+                    written.append((len(self._segments) - 1, segment.size, block_id, new_segment))
+                    segment.size += len(record)
+                self._writer.flush()  # hand to the OS so mmap readers see it
+            except BaseException:
+                self._rollback(segment_count, resume_size)
+                raise
+
+            for seg_no, offset, block_id, new_segment in written:
+                self._note_record(seg_no, offset, block_id, force_index=new_segment)
+            self._unsynced += len(records)
+            self._after_write()
+
+    def _rollback(self, segment_count: int, resume_size: int):
+        """Drop whatever a failed append wrote: later segments and the tail."""
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            try:
+                writer.close()   # the file is closed even if the final flush fails
+            except OSError:
+                pass
+        try:
+            for segment in self._segments[segment_count:]:
+                segment.close()
+                os.remove(segment.path)
+            del self._segments[segment_count:]
+            if self._segments:
+                segment = self._segments[-1]
+                with open(segment.path, "r+b") as fh:
+                    fh.truncate(resume_size)
+                segment.size = resume_size
+        except OSError as exc:
+            # The files may now end in bytes the index does not know about
+            self._broken = exc
+
+    def _after_write(self):
+        if self._unsynced >= self.fsync_every:
+            self._sync()
+        elif self._unsynced and self._sync_timer is None and self.fsync_interval > 0:
+            self._sync_timer = threading.Timer(self.fsync_interval, self.flush)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+    def _sync(self):
+        if self._writer is not None:
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+        self._unsynced = 0
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+
+    def flush(self):
+        """Force all appended blocks to stable storage."""
+        with self._lock:
+            self._sync()
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._sync()
+            self._writer.close()
+            self._writer = None
+
+    def close(self):
+        with self._lock:
+            self._close_writer()
+            for segment in self._segments:
+                segment.close()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _locate(self, block_id: int) -> Optional[tuple]:
+        """Nearest indexed (segment number, offset) at or before block_id."""
+        i = bisect_right(self._index_ids, block_id) - 1
+        if i < 0:
+            return None
+        return self._index_pos[i]
+
+    def _records_from(self, seg_no: int, offset: int) -> Iterator[tuple]:
+        """Yield (block_id, payload bytes) from a position onwards."""
+        while True:
+            # Size and mapping are taken together, between appends
+            with self._lock:
+                if seg_no >= len(self._segments):
+                    return
+                segment = self._segments[seg_no]
+                end_of_segment = segment.size
+                view = segment.view()
+            while offset + RECORD_HEADER.size <= end_of_segment:
+                length, block_id, _crc = RECORD_HEADER.unpack_from(view, offset)
+                start = offset + RECORD_HEADER.size
+                yield block_id, view[start:start + length]
+                offset = start + length
+            seg_no += 1
+            offset = SEGMENT_HEADER.size
+
+    def get_block(self, block_id: int) -> Optional[dict]:
+        """Read a single block by id, or None if it was never appended."""
+        with self._lock:
+            position = self._locate(block_id)
+            if position is None:
+                return None
+            for found_id, payload in self._records_from(*position):
+                if found_id == block_id:
+                    return json.loads(payload)
+                if found_id > block_id:
+                    return None
+            return None
+
+    def get_last_block(self, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """The most recently appended block, located from the in-memory index."""
+        if self.last_block_id is None:
+            return None
+        doc = self.get_block(self.last_block_id)
+        if doc is not None and fields:
+            doc = {f: doc[f] for f in fields if f in doc}
+        return doc
+
+    def iter_blocks(self, start_id: Optional[int] = None, end_id: Optional[int] = None,
+                    fields: Optional[Sequence[str]] = None,
+                    batch_size: int = 1000) -> Iterator[dict]:
+        """
+        Stream blocks in block_id order within [start_id, end_id).
+
+        `batch_size` is accepted for interface parity; records are read
+        straight from the memory map so no batching is needed.
+        """
+        with self._lock:
+            if not self._index_pos:
+                return
+            position = self._locate(start_id) if start_id is not None else None
+            position = position or self._index_pos[0]
+        for block_id, payload in self._records_from(*position):
+            if start_id is not None and block_id < start_id:
+                continue
+            if end_id is not None and block_id >= end_id:
+                return
+            doc = json.loads(payload)
+            if fields:
+                doc = {f: doc[f] for f in fields if f in doc}
+            yield doc
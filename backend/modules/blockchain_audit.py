@@ -5,18 +5,199 @@ Implements immutable audit trail with hash chaining
 
 import hashlib
 import json
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import datetime
 
-from db import insert_audit_block, load_audit_blocks
+from db import (
+    get_last_audit_block,
+    insert_audit_block,
+    insert_audit_blocks_bulk,
+    iter_audit_blocks,
+)
+from .process_pools import pool_context
+from .audit_columns import ROW_FIELDS, ColumnarChain, PagedChain, row_fields
+from .zkp_schnorr import BinaryMerkleTree, IncrementalMerkleTree, MERKLE_TREE_VERSIONS
+
+
+# Canonical encodings hashed by block_hash(), selected per block by its
+# hash_version. Blocks persisted without a hash_version are version 1.
+#   1: JSON of the hashed fields with sorted keys (original format)
+#   2: fixed-layout binary, see _canonical_bytes_v2
+HASH_VERSION_JSON = 1
+HASH_VERSION_BINARY = 2
+HASH_VERSIONS = (HASH_VERSION_JSON, HASH_VERSION_BINARY)
+
+_V2_HEADER = struct.Struct('>Bq')       # format version, block_id
+_V2_TEXT = struct.Struct('>BI')         # text tag, byte length
+_V2_INT = struct.Struct('>Bq')          # number tag, value
+_V2_FLOAT = struct.Struct('>Bd')        # number tag, value
+
+# Tags keep every field self-describing so no two blocks share an encoding
+_TAG_NONE, _TAG_STR, _TAG_JSON = 0, 1, 2
+_TAG_INT, _TAG_FLOAT = 3, 4
+
+
+def _pack_text(value) -> bytes:
+    if value is None:
+        return _V2_TEXT.pack(_TAG_NONE, 0)
+    if isinstance(value, str):
+        tag, data = _TAG_STR, value.encode('utf-8')
+    else:
+        tag, data = _TAG_JSON, json.dumps(value, sort_keys=True).encode('utf-8')
+    return _V2_TEXT.pack(tag, len(data)) + data
+
+
+def _pack_number(value) -> bytes:
+    if isinstance(value, int) and not isinstance(value, bool) and -2**63 <= value < 2**63:
+        return _V2_INT.pack(_TAG_INT, value)
+    if isinstance(value, float):
+        return _V2_FLOAT.pack(_TAG_FLOAT, value)
+    return _pack_text(value)
+
+
+def _canonical_prefix_v2(block_id, user_id, resource_id, decision, risk_score,
+                         timestamp) -> bytes:
+    """Every field of the v2 encoding except the trailing previous_hash."""
+    return b''.join((
+        _V2_HEADER.pack(HASH_VERSION_BINARY, block_id),
+        _pack_text(user_id),
+        _pack_text(resource_id),
+        _pack_text(decision),
+        _pack_number(risk_score),
+        _pack_text(timestamp),
+    ))
+
+
+def _canonical_bytes_v2(block_id, user_id, resource_id, decision, risk_score,
+                        timestamp, previous_hash) -> bytes:
+    """
+    Binary layout: version byte and big-endian block_id, then each field
+    in a fixed order as a tagged value; text is length-prefixed UTF-8,
+    risk_score keeps int vs float as separate tags.
+    """
+    return _canonical_prefix_v2(
+        block_id, user_id, resource_id, decision, risk_score, timestamp
+    ) + _pack_text(previous_hash)
+
+
+def block_hash(block_id, user_id, resource_id, decision, risk_score,
+               timestamp, previous_hash, version: int = HASH_VERSION_JSON) -> str:
+    """SHA-256 over the canonical encoding of a block's hashed fields."""
+    if version == HASH_VERSION_BINARY:
+        return hashlib.sha256(_canonical_bytes_v2(
+            block_id, user_id, resource_id, decision, risk_score, timestamp, previous_hash
+        )).hexdigest()
+    if version != HASH_VERSION_JSON:
+        raise ValueError(f"Unknown block hash version {version}")
+    block_string = json.dumps({
+        'block_id': block_id,
+        'user_id': user_id,
+        'resource_id': resource_id,
+        'decision': decision,
+        'risk_score': risk_score,
+        'timestamp': timestamp,
+        'previous_hash': previous_hash
+    }, sort_keys=True)
+    return hashlib.sha256(block_string.encode()).hexdigest()
+
+
+def _link_hasher(block_id, user_id, resource_id, decision, risk_score, timestamp,
+                 version: int = HASH_VERSION_JSON):
+    """
+    Return previous_hash -> block hash for a block whose other fields are
+    known. For v2 everything but the trailing link is hashed up front, so
+    only a short update remains once the predecessor's hash is known.
+    """
+    if version != HASH_VERSION_BINARY:
+        return lambda previous_hash: block_hash(
+            block_id, user_id, resource_id, decision, risk_score, timestamp,
+            previous_hash, version=version
+        )
+    prefix = hashlib.sha256(_canonical_prefix_v2(
+        block_id, user_id, resource_id, decision, risk_score, timestamp
+    ))
+
+    def finish(previous_hash):
+        digest = prefix.copy()
+        digest.update(_pack_text(previous_hash))
+        return digest.hexdigest()
+    return finish
+
+
+def _verify_chunk(start: int, previous_hash: str, rows):
+    """
+    Verify rows for chain indices start, start+1, ... (also run in the
+    process pool by the parallel verifier).
+
+    Each row is (block_id, user_id, resource_id, decision, risk_score,
+    timestamp, previous_hash, hash, hash_version); `previous_hash` is the stored hash of
+    the block just before the chunk. Returns (index, message) for the first
+    bad block in the chunk, or None.
+    """
+    for offset, row in enumerate(rows):
+        i = start + offset
+        if block_hash(*row[:7], version=row[8]) != row[7]:
+            return i, f"Block {i} hash mismatch (block tampering detected)"
+        if row[6] != previous_hash:
+            return i, f"Block {i} previous hash mismatch (chain tampering detected)"
+        previous_hash = row[7]
+    return None
+
+
+def _intersect_postings(postings: list) -> list:
+    """
+    Intersect ascending lists of chain indices.
+
+    Walks the shortest list and binary-searches the others, so the cost is
+    O(k log n) for a shortest list of length k.
+    """
+    postings = sorted(postings, key=len)
+    shortest, others = postings[0], postings[1:]
+    result = []
+    for index in shortest:
+        for other in others:
+            pos = bisect_left(other, index)
+            if pos == len(other) or other[pos] != index:
+                break
+        else:
+            result.append(index)
+    return result
+
+
+def _new_aggregate() -> dict:
+    return {'count': 0, 'risk_sum': 0.0, 'decisions': defaultdict(int)}
+
+
+def _aggregate_summary(aggregate: dict) -> dict:
+    count = aggregate['count']
+    return {
+        'total_blocks': count,
+        'allow_count': aggregate['decisions'].get('ALLOW', 0),
+        'conditional_count': aggregate['decisions'].get('CONDITIONAL', 0),
+        'deny_count': aggregate['decisions'].get('DENY', 0),
+        'average_risk_score': round(aggregate['risk_sum'] / count, 2) if count else 0,
+    }
+
 
 class AuditBlock:
     """
     Represents a block in the audit blockchain.
     Each block contains access decision and is linked to previous block via hash.
     """
+
+    __slots__ = ('block_id', 'user_id', 'resource_id', 'decision', 'risk_score',
+                 'timestamp', 'previous_hash', 'hash', 'hash_version')
     
     def __init__(self, block_id: int, user_id: str, resource_id: str, decision: str, 
-                 risk_score: float, previous_hash: str = None, timestamp: str = None):
+                 risk_score: float, previous_hash: str = None, timestamp: str = None,
+                 hash_version: int = HASH_VERSION_JSON):
         self.block_id = block_id
         self.user_id = user_id
         self.resource_id = resource_id
@@ -24,31 +205,47 @@ class AuditBlock:
         self.risk_score = risk_score
         self.timestamp = timestamp or datetime.now().isoformat()
         self.previous_hash = previous_hash or "0" * 64  # Genesis block
+        self.hash_version = hash_version  # canonical encoding used for self.hash
         self.hash = None
         self.compute_hash()
     
+    @classmethod
+    def restore(cls, block_id, user_id, resource_id, decision, risk_score,
+                timestamp, previous_hash, hash, hash_version=HASH_VERSION_JSON):
+        """
+        Rebuild a stored block without recomputing its hash, so tampered
+        blocks stay detectable by verify().
+        """
+        block = cls.__new__(cls)
+        block.block_id = block_id
+        block.user_id = user_id
+        block.resource_id = resource_id
+        block.decision = decision
+        block.risk_score = risk_score
+        block.timestamp = timestamp
+        block.previous_hash = previous_hash
+        block.hash = hash
+        block.hash_version = hash_version
+        return block
+
     def compute_hash(self):
         """
         Compute SHA-256 hash of block data.
         Used for integrity verification.
         """
-        block_string = json.dumps({
-            'block_id': self.block_id,
-            'user_id': self.user_id,
-            'resource_id': self.resource_id,
-            'decision': self.decision,
-            'risk_score': self.risk_score,
-            'timestamp': self.timestamp,
-            'previous_hash': self.previous_hash
-        }, sort_keys=True)
-        
-        self.hash = hashlib.sha256(block_string.encode()).hexdigest()
+        self.hash = block_hash(*self.hashed_fields(), version=self.hash_version)
+
+    def hashed_fields(self) -> tuple:
+        """Fields covered by the block hash, in block_hash() argument order."""
+        return (self.block_id, self.user_id, self.resource_id, self.decision,
+                self.risk_score, self.timestamp, self.previous_hash)
     
     def to_dict(self):
         """
         Convert block to dictionary for serialization.
+        hash_version is omitted for JSON-hashed blocks, which predate it.
         """
-        return {
+        block_dict = {
             'block_id': self.block_id,
             'user_id': self.user_id,
             'resource_id': self.resource_id,
@@ -58,24 +255,69 @@ class AuditBlock:
             'previous_hash': self.previous_hash,
             'hash': self.hash
         }
+        if self.hash_version != HASH_VERSION_JSON:
+            block_dict['hash_version'] = self.hash_version
+        return block_dict
     
     def verify(self) -> bool:
         """
         Verify block integrity by recomputing hash.
         Non-destructive: does not modify self.hash.
         """
-        block_string = json.dumps({
-            'block_id': self.block_id,
-            'user_id': self.user_id,
-            'resource_id': self.resource_id,
-            'decision': self.decision,
-            'risk_score': self.risk_score,
-            'timestamp': self.timestamp,
-            'previous_hash': self.previous_hash
-        }, sort_keys=True)
-        
-        recomputed = hashlib.sha256(block_string.encode()).hexdigest()
-        return self.hash == recomputed
+        return self.hash == block_hash(*self.hashed_fields(), version=self.hash_version)
+
+
+class DatabaseAuditStore:
+    """
+    Audit block persistence through the configured storage backend (db.py).
+
+    Any object with the same methods can be passed to BlockchainAuditLog,
+    e.g. SegmentedAuditStore for append-only segment files.
+    """
+
+    def append(self, block_dict: dict):
+        insert_audit_block(block_dict)
+
+    def append_many(self, block_dicts):
+        insert_audit_blocks_bulk(block_dicts)
+
+    def iter_blocks(self, start_id=None, end_id=None, fields=None, batch_size=1000):
+        return iter_audit_blocks(
+            start_id=start_id, end_id=end_id, fields=fields, batch_size=batch_size
+        )
+
+    def get_block(self, block_id: int):
+        for row in iter_audit_blocks(start_id=block_id, end_id=block_id + 1):
+            return row
+        return None
+
+    def get_last_block(self, fields=None):
+        return get_last_audit_block(fields)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def build_audit_store(app_config=None):
+    """
+    Create the audit block store selected by AUDIT_STORE ('db' | 'segments').
+    """
+    app_config = app_config or {}
+    kind = str(app_config.get('AUDIT_STORE', 'db')).lower()
+    if kind == 'db':
+        return DatabaseAuditStore()
+    if kind == 'segments':
+        from .audit_segments import SegmentedAuditStore
+        return SegmentedAuditStore(
+            app_config['AUDIT_SEGMENT_DIR'],
+            segment_size=app_config.get('AUDIT_SEGMENT_BYTES', 64 * 1024 * 1024),
+            fsync_every=app_config.get('AUDIT_FSYNC_EVERY', 64),
+            fsync_interval=app_config.get('AUDIT_FSYNC_INTERVAL_MS', 50) / 1000.0,
+        )
+    raise ValueError(f"Unknown AUDIT_STORE '{kind}'")
 
 
 class BlockchainAuditLog:
@@ -84,40 +326,190 @@ class BlockchainAuditLog:
     Ensures immutability and integrity of access decision logs.
     """
     
-    def __init__(self):
-        self.chain = []
+    # Fields read back from storage when rebuilding the chain
+    PERSISTED_FIELDS = ROW_FIELDS
+
+    # Block attributes with a posting list (value -> ascending chain indices)
+    INDEXED_FIELDS = ('user_id', 'resource_id', 'decision')
+
+    # Result orders accepted by get_high_risk_accesses
+    HIGH_RISK_ORDERS = ('chain', 'risk')
+
+    # Below this many blocks a full check is faster without a process pool
+    PARALLEL_VERIFY_MIN_BLOCKS = 20000
+
+    # Incrementally maintained Merkle tree class per tree version
+    MERKLE_TREES = {
+        IncrementalMerkleTree.VERSION: IncrementalMerkleTree,
+        BinaryMerkleTree.VERSION: BinaryMerkleTree,
+    }
+
+    def __init__(self, store=None, verify_workers: int = 0,
+                 hash_version: int = HASH_VERSION_BINARY, hot_window: int = 0,
+                 merkle_version: int = BinaryMerkleTree.VERSION):
+        if hash_version not in HASH_VERSIONS:
+            raise ValueError(f"Unknown block hash version {hash_version}")
+        if merkle_version not in self.MERKLE_TREES:
+            raise ValueError(f"Unknown Merkle tree version {merkle_version}")
+        # Canonical encoding for new blocks; loaded blocks keep their own
+        self.hash_version = hash_version
+        # Layout of the Merkle tree kept over the chain (see zkp_schnorr)
+        self.merkle_version = merkle_version
+        # Where blocks are persisted (defaults to the storage backend)
+        self.store = store or DatabaseAuditStore()
+        # Blocks are stored column-wise; indexing returns AuditBlock views.
+        # With a hot window only the newest blocks stay resident and older
+        # ones are paged in from the store on demand.
+        self.hot_window = hot_window
+        if hot_window > 0:
+            self.chain = PagedChain(AuditBlock.restore, self.store, hot_window)
+        else:
+            self.chain = ColumnarChain(AuditBlock.restore)
         self.block_counter = 0
+        # Index of the last block known to verify; routine checks resume here
+        self.verified_through = 0
+        self.last_verification = None
+        # Processes used for full verification (0 = one per CPU, 1 = serial)
+        self.verify_workers = verify_workers or os.cpu_count() or 1
+        self._verify_pool = None
+        self._verify_pool_size = 0
+        # Append sequencing: ids are reserved under _sequence_lock, then
+        # appends link and persist in id order, one turn at a time
+        self._sequence_lock = threading.Lock()
+        self._turn_lock = threading.Lock()
+        self._turn_waiters = {}   # first reserved id -> Event set on its turn
+        self._sequence_epoch = 0
+        self._next_commit_id = 0
+        # Appends index their blocks under _index_lock; one rebuild at a time
+        self._index_lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        # Held while the maintained Merkle tree grows or is being read
+        self._merkle_lock = threading.Lock()
+        self._reset_indexes()
         # Attempt to rebuild chain from persisted audit_blocks table;
         # if none exist, create a fresh genesis block.
         self._load_or_initialize_chain()
 
     def _load_or_initialize_chain(self):
-        persisted = load_audit_blocks()
-        if not persisted:
-            self.create_genesis_block()
+        if isinstance(self.chain, PagedChain):
+            # Tail-only: the tip comes from one indexed lookup, then only the
+            # hot window is read. Query indexes and the first integrity check
+            # run in the background, so requests can be served right away.
+            tip = self.store.get_last_block(fields=('block_id',))
+            if tip is None:
+                self.chain.clear()
+                self.create_genesis_block()
+            else:
+                self.chain.load_tail(tip['block_id'])
+                self.block_counter = tip['block_id'] + 1
+            self._reset_sequencer()
+            threading.Thread(target=self._warm_up, name='audit-index-warmup',
+                             daemon=True).start()
             return
 
-        # Reconstruct chain from persisted blocks
-        self.chain = []
-        for row in persisted:
-            block = AuditBlock(
-                block_id=row["block_id"],
-                user_id=row["user_id"],
-                resource_id=row["resource_id"],
-                decision=row["decision"],
-                risk_score=row["risk_score"],
-                previous_hash=row["previous_hash"],
-                timestamp=row["timestamp"],
-            )
-            # Trust the stored hash for integrity verification; overwrite with stored value.
-            block.hash = row["hash"]
-            self.chain.append(block)
+        # Reconstruct chain from persisted blocks, streamed in batches so
+        # the raw documents never sit in memory all at once.
+        self.chain.clear()
+        for row in self.store.iter_blocks(fields=self.PERSISTED_FIELDS):
+            # Trust the stored hash for integrity verification; it is kept as stored.
+            self.chain.append_fields(*row_fields(row))
 
         # Ensure there is at least a genesis block
         if not self.chain:
             self.create_genesis_block()
         # Set block_counter for the next block
         self.block_counter = self.chain[-1].block_id + 1
+        self._rebuild_indexes()
+        self._reset_sequencer()
+
+    def _reset_sequencer(self):
+        """Start append sequencing at block_counter (after loading the chain)."""
+        with self._sequence_lock, self._turn_lock:
+            self._next_commit_id = self.block_counter
+
+    def _reset_indexes(self):
+        # Posting lists: field -> value -> ascending chain indices
+        self._postings = {field: defaultdict(list) for field in self.INDEXED_FIELDS}
+        # Risk scores in ascending order, with the chain index of each score
+        self._risk_scores = []
+        self._risk_indices = []
+        # Running counts and risk sums for the chain, per user and per resource
+        self._totals = _new_aggregate()
+        self._user_totals = defaultdict(_new_aggregate)
+        self._resource_totals = defaultdict(_new_aggregate)
+        # Merkle tree over the blocks' to_dict() (genesis excluded)
+        self._merkle = self.MERKLE_TREES[self.merkle_version]()
+        # Appends only index their blocks once a rebuild has completed
+        self._indexes_ready = False
+
+    def _rebuild_indexes(self, if_missing: bool = False):
+        """
+        Rebuild the query indexes and aggregates from the chain (genesis
+        excluded). Safe while appends run: they leave the indexes alone
+        until the rebuild has caught up with the tip, which it checks under
+        the same lock the appends index under.
+        """
+        with self._rebuild_lock:
+            if if_missing and self._indexes_ready:
+                return
+            with self._index_lock:
+                self._reset_indexes()
+            scores = []
+            done = 1
+            while True:
+                # One streaming pass, so paged-out blocks are read once in order
+                end = len(self.chain)
+                for index, row in enumerate(self.chain.iter_rows(done, end), start=done):
+                    self._accumulate(index, row[1], row[2], row[3], row[4])
+                    scores.append(row[4])
+                    self._merkle.append(AuditBlock.restore(*row).to_dict())
+                done = end
+                with self._index_lock:
+                    if len(self.chain) != done:
+                        continue   # blocks were appended meanwhile
+                    # Stable sort keeps equal scores in chain order
+                    ranked = sorted(range(len(scores)), key=scores.__getitem__)
+                    self._risk_scores = [scores[i] for i in ranked]
+                    self._risk_indices = [i + 1 for i in ranked]
+                    self._indexes_ready = True
+                    return
+
+    def _ensure_indexes(self):
+        """Wait for the query indexes (tail-only loading builds them in the background)."""
+        if not self._indexes_ready:
+            self._rebuild_indexes(if_missing=True)
+
+    def _warm_up(self):
+        """Build the indexes and verify the paged-out chain once, off the request path."""
+        try:
+            self._ensure_indexes()
+            self.verify_chain()
+        except Exception as exc:
+            print(f"[audit] Background index build failed: {exc}")
+
+    def _accumulate(self, index: int, user_id: str, resource_id: str,
+                    decision: str, risk_score: float):
+        """Add a block to the posting lists and running aggregates."""
+        values = {'user_id': user_id, 'resource_id': resource_id, 'decision': decision}
+        for field, postings in self._postings.items():
+            postings[values[field]].append(index)
+        for aggregate in (self._totals, self._user_totals[user_id],
+                          self._resource_totals[resource_id]):
+            aggregate['count'] += 1
+            aggregate['risk_sum'] += risk_score
+            aggregate['decisions'][decision] += 1
+
+    def _index_block(self, index: int, block: AuditBlock):
+        """Add an appended block to the query indexes and aggregates."""
+        self._accumulate(index, block.user_id, block.resource_id,
+                         block.decision, block.risk_score)
+        # bisect_right keeps equal scores in chain order
+        pos = bisect_right(self._risk_scores, block.risk_score)
+        self._risk_scores.insert(pos, block.risk_score)
+        self._risk_indices.insert(pos, index)
+        leaf = block.to_dict()
+        with self._merkle_lock:
+            self._merkle.append(leaf)
     
     def create_genesis_block(self):
         """
@@ -129,13 +521,14 @@ class BlockchainAuditLog:
             resource_id="GENESIS",
             decision="N/A",
             risk_score=0,
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            hash_version=self.hash_version
         )
         self.chain.append(genesis_block)
         self.block_counter = 1
 
         # Persist genesis block
-        insert_audit_block(genesis_block.to_dict())
+        self.store.append(genesis_block.to_dict())
     
     def add_access_decision(self, user_id: str, resource_id: str, decision: str, 
                            risk_score: float) -> dict:
@@ -144,46 +537,241 @@ class BlockchainAuditLog:
         
         Returns: New block data
         """
-        # Get previous block
-        previous_block = self.chain[-1]
-        
-        # Create new block
-        new_block = AuditBlock(
-            block_id=self.block_counter,
-            user_id=user_id,
-            resource_id=resource_id,
-            decision=decision,
-            risk_score=risk_score,
-            previous_hash=previous_block.hash,
-            timestamp=datetime.now().isoformat()
-        )
-        
-        # Add to chain and persist
-        self.chain.append(new_block)
-        self.block_counter += 1
+        return self.add_access_decisions([(user_id, resource_id, decision, risk_score)])[0]
 
-        block_dict = new_block.to_dict()
-        insert_audit_block(block_dict)
-        return block_dict
+    def add_access_decisions(self, decisions) -> list:
+        """
+        Add several access decisions as one batch.
+
+        decisions: iterable of (user_id, resource_id, decision, risk_score).
+        Safe to call from many threads at once:
+
+        1. Block ids are reserved under a short lock, so no two appends
+           share an id.
+        2. Everything in the block hash except the link to the predecessor
+           is hashed without any lock held.
+        3. Appends then take turns in reservation order: each links to the
+           current tip, persists its blocks with one bulk write and joins
+           the in-memory chain before passing the turn on, so the chain can
+           never fork and storage receives blocks in id order.
+
+        If the write fails the chain is unchanged, and appends that had
+        reserved later ids fail too; the ids are handed out again.
+
+        Returns: New block data, in chain order
+        """
+        decisions = list(decisions)
+        if not decisions:
+            return []
+        timestamp = datetime.now().isoformat()
+        with self._sequence_lock:
+            epoch = self._sequence_epoch
+            first_id = self.block_counter
+            self.block_counter += len(decisions)
+
+        failure = None
+        try:
+            hashers = [
+                _link_hasher(first_id + offset, user_id, resource_id, decision, risk_score,
+                             timestamp, version=self.hash_version)
+                for offset, (user_id, resource_id, decision, risk_score) in enumerate(decisions)
+            ]
+        except Exception as exc:
+            # Raised once this append holds the turn, so the ids can be released
+            failure = exc
+
+        self._wait_for_turn(first_id, epoch)
+
+        # This append holds the turn: the tip cannot move until it is passed on
+        try:
+            if failure is not None:
+                raise failure
+            previous_hash = self.chain.hash_at(len(self.chain) - 1)
+            blocks = []
+            for offset, ((user_id, resource_id, decision, risk_score), hasher) in \
+                    enumerate(zip(decisions, hashers)):
+                block_hash_hex = hasher(previous_hash)
+                blocks.append(AuditBlock.restore(
+                    first_id + offset, user_id, resource_id, decision, risk_score,
+                    timestamp, previous_hash, block_hash_hex, self.hash_version
+                ))
+                previous_hash = block_hash_hex
+
+            block_dicts = [block.to_dict() for block in blocks]
+            if len(block_dicts) == 1:
+                self.store.append(block_dicts[0])
+            else:
+                self.store.append_many(block_dicts)
+        except BaseException:
+            self._abort_sequence(first_id)
+            raise
+
+        # Joining the chain and indexing are one step for _rebuild_indexes
+        with self._index_lock:
+            for block in blocks:
+                self.chain.append(block)
+            if self._indexes_ready:
+                for index, block in enumerate(blocks, start=len(self.chain) - len(blocks)):
+                    self._index_block(index, block)
+        self._pass_turn(first_id + len(blocks))
+        return block_dicts
+
+    def _wait_for_turn(self, first_id: int, epoch: int):
+        """Block until every append with lower reserved ids has committed."""
+        while True:
+            with self._turn_lock:
+                if self._sequence_epoch != epoch:
+                    raise RuntimeError("Audit append aborted: an earlier append failed to persist")
+                if self._next_commit_id == first_id:
+                    return
+                # Only the append that ends right before first_id wakes us
+                waiter = self._turn_waiters.setdefault(first_id, threading.Event())
+            waiter.wait()
+
+    def _abort_sequence(self, first_id: int):
+        """
+        Called by the turn holder when its append fails: give its ids back
+        and wake every waiting append so those that reserved later ids
+        (in the old sequence epoch) fail instead of linking to nothing.
+        """
+        with self._sequence_lock, self._turn_lock:
+            self._sequence_epoch += 1
+            self.block_counter = first_id
+            for waiter in self._turn_waiters.values():
+                waiter.set()
+            self._turn_waiters.clear()
+
+    def _pass_turn(self, next_id: int):
+        with self._turn_lock:
+            self._next_commit_id = next_id
+            waiter = self._turn_waiters.pop(next_id, None)
+        if waiter is not None:
+            waiter.set()
     
-    def verify_chain_integrity(self) -> tuple:
+    def _verify_range(self, start: int, end: int) -> tuple:
         """
-        Verify the entire blockchain for tampering.
-        Returns (is_valid, tampering_details)
+        Check blocks [start, end) against their own hash and their predecessor.
+        Returns (first_bad_index or None, message).
         """
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
-            
-            # Verify current block hash
-            if not current_block.verify():
-                return False, f"Block {i} hash mismatch (block tampering detected)"
-            
-            # Verify hash chain
-            if current_block.previous_hash != previous_block.hash:
-                return False, f"Block {i} previous hash mismatch (chain tampering detected)"
+        start = max(start, 1)
+        if start < end:
+            # Read straight from the columns (or storage pages); no block
+            # objects are built
+            rows = self.chain.iter_rows(start, end)
+            failure = _verify_chunk(start, self.chain.hash_at(start - 1), rows)
+            if failure is not None:
+                return failure
         
-        return True, "Blockchain integrity verified"
+        return None, "Blockchain integrity verified"
+
+    def _verify_range_parallel(self, start: int, end: int, workers: int) -> tuple:
+        """
+        Same result as _verify_range, split into contiguous chunks checked
+        on a process pool. Every chunk carries the hash of the block before
+        it, so link checks across chunk boundaries are not lost, and the
+        lowest failing index over all chunks is the first tampered block.
+
+        Chunks are read and submitted as earlier ones finish, at most two
+        per worker in flight, so memory stays bounded by the chunk size
+        rather than the chain. Chunks past a known failure are skipped.
+        """
+        start = max(start, 1)
+        if self._verify_pool is None or self._verify_pool_size != workers:
+            self.close_verifier()
+            self._verify_pool = ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=pool_context())
+            self._verify_pool_size = workers
+
+        # A few chunks per worker keeps the pool busy when chunks finish unevenly
+        chunk_size = max(1000, -(-(end - start) // (workers * 4)))
+        chunk_starts = iter(range(start, end, chunk_size))
+        pending, failures = set(), []
+
+        def submit_next():
+            for chunk_start in chunk_starts:
+                if failures and chunk_start > min(failures)[0]:
+                    return
+                rows = list(self.chain.iter_rows(chunk_start, min(chunk_start + chunk_size, end)))
+                pending.add(self._verify_pool.submit(
+                    _verify_chunk, chunk_start, self.chain.hash_at(chunk_start - 1), rows
+                ))
+                return
+
+        for _ in range(2 * workers):
+            submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                result = future.result()
+                if result is not None:
+                    failures.append(result)
+                submit_next()
+
+        if failures:
+            return min(failures)
+        return None, "Blockchain integrity verified"
+
+    def close_verifier(self):
+        """Shut down the verification process pool, if one was started."""
+        if self._verify_pool is not None:
+            self._verify_pool.shutdown(cancel_futures=True)
+            self._verify_pool = None
+
+    def verify_chain(self, full: bool = False, workers: int = None) -> dict:
+        """
+        Verify the blockchain and report what was checked.
+
+        By default only blocks appended since the last successful check are
+        verified (starting after the `verified_through` watermark, linked to
+        the last verified block). `full=True` rehashes the whole chain from
+        block 1 and resets the watermark; use it for on-demand audits, since
+        the incremental mode trusts blocks it has already verified.
+
+        Ranges of at least PARALLEL_VERIFY_MIN_BLOCKS are checked on a
+        process pool of `workers` (default verify_workers) processes.
+        """
+        started = time.perf_counter()
+        end = len(self.chain)
+        start = 1 if full else self.verified_through + 1
+        workers = workers or self.verify_workers
+        if workers > 1 and end - start >= self.PARALLEL_VERIFY_MIN_BLOCKS:
+            bad_index, message = self._verify_range_parallel(start, end, workers)
+        else:
+            workers = 1
+            bad_index, message = self._verify_range(start, end)
+
+        if bad_index is None:
+            self.verified_through = end - 1
+        elif full:
+            self.verified_through = bad_index - 1
+        elif bad_index - 1 > self.verified_through:
+            self.verified_through = bad_index - 1
+
+        report = {
+            'valid': bad_index is None,
+            'message': message,
+            'mode': 'full' if full else 'incremental',
+            'verified_from': start,
+            'verified_to': (bad_index if bad_index is not None else end) - 1,
+            'blocks_checked': max(0, (bad_index + 1 if bad_index is not None else end) - start),
+            'first_invalid_block': bad_index,
+            'verified_through': self.verified_through,
+            'total_blocks': end,
+            'workers': workers,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+            'checked_at': datetime.now().isoformat(),
+        }
+        self.last_verification = report
+        return report
+
+    def verify_chain_integrity(self, full: bool = False) -> tuple:
+        """
+        Verify the blockchain for tampering (incremental unless full=True).
+        Returns (is_valid, tampering_details)
+        """
+        report = self.verify_chain(full=full)
+        return report['valid'], report['message']
     
     def get_audit_trail(self, user_id: str = None, resource_id: str = None, 
                        decision_filter: str = None) -> list:
@@ -196,21 +784,24 @@ class BlockchainAuditLog:
         - decision_filter: Optional filter by decision type
         
         Returns: List of audit blocks (excluding genesis)
+
+        Filters are answered from per-field posting lists; with several
+        filters the lists are intersected, so the cost follows the size of
+        the result rather than the length of the chain.
         """
-        trail = []
-        
-        for block in self.chain[1:]:  # Skip genesis block
-            # Apply filters
-            if user_id and block.user_id != user_id:
-                continue
-            if resource_id and block.resource_id != resource_id:
-                continue
-            if decision_filter and block.decision != decision_filter:
-                continue
-            
-            trail.append(block.to_dict())
-        
-        return trail
+        filters = (
+            ('user_id', user_id),
+            ('resource_id', resource_id),
+            ('decision', decision_filter),
+        )
+        if not any(value for _, value in filters):
+            return [block.to_dict() for block in self.chain[1:]]  # Skip genesis block
+
+        self._ensure_indexes()
+        postings = [self._postings[field].get(value, []) for field, value in filters if value]
+
+        indices = postings[0] if len(postings) == 1 else _intersect_postings(postings)
+        return [self.chain[i].to_dict() for i in indices]
     
     def get_user_access_history(self, user_id: str) -> list:
         """
@@ -230,44 +821,106 @@ class BlockchainAuditLog:
         """
         return self.get_audit_trail(decision_filter='DENY')
     
-    def get_high_risk_accesses(self, threshold: float = 70) -> list:
+    def count_high_risk_accesses(self, threshold: float = 70) -> int:
+        """
+        Number of accesses with risk score at or above threshold, O(log n).
         """
-        Get all accesses with risk score above threshold.
+        self._ensure_indexes()
+        return len(self._risk_scores) - bisect_left(self._risk_scores, threshold)
+
+    def get_high_risk_accesses(self, threshold: float = 70, limit: int = None,
+                               offset: int = 0, order: str = 'chain') -> list:
         """
-        high_risk = []
-        for block in self.chain[1:]:
-            if block.risk_score >= threshold:
-                high_risk.append(block.to_dict())
-        return high_risk
+        Get accesses with risk score at or above threshold.
+
+        Parameters:
+        - limit/offset: Optional page of the result
+        - order: 'chain' (oldest first) or 'risk' (riskiest first, ties newest first)
+
+        Uses the sorted risk index: 'risk' order costs O(log n + page),
+        'chain' order additionally sorts the matching indices.
+
+        Raises ValueError for an unknown order or a negative limit/offset.
+        """
+        if order not in self.HIGH_RISK_ORDERS:
+            raise ValueError(f"order must be one of {', '.join(self.HIGH_RISK_ORDERS)}")
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("limit and offset must not be negative")
+        self._ensure_indexes()
+        start = bisect_left(self._risk_scores, threshold)
+        stop = len(self._risk_scores)
+        if order == 'risk':
+            first = max(start, stop - offset)
+            last = max(start, first - limit) if limit is not None else start
+            indices = self._risk_indices[last:first][::-1]
+        else:
+            indices = sorted(self._risk_indices[start:stop])
+            end = offset + limit if limit is not None else None
+            indices = indices[offset:end]
+        return [self.chain[i].to_dict() for i in indices]
+
+    def get_top_risk_accesses(self, n: int = 10, offset: int = 0) -> list:
+        """
+        Get the n riskiest accesses, highest risk score first.
+        """
+        return self.get_high_risk_accesses(float('-inf'), limit=n, offset=offset, order='risk')
     
     def get_chain_statistics(self) -> dict:
         """
         Get statistics about the audit chain.
+
+        Counts and averages come from running aggregates kept on append;
+        the integrity flag comes from an incremental check that only covers
+        blocks appended since the previous check.
         """
-        if len(self.chain) <= 1:
-            return {
-                'total_blocks': 0,
-                'allow_count': 0,
-                'conditional_count': 0,
-                'deny_count': 0,
-                'average_risk_score': 0
-            }
-        
-        access_blocks = self.chain[1:]  # Exclude genesis
-        allow_count = sum(1 for b in access_blocks if b.decision == 'ALLOW')
-        conditional_count = sum(1 for b in access_blocks if b.decision == 'CONDITIONAL')
-        deny_count = sum(1 for b in access_blocks if b.decision == 'DENY')
-        avg_risk = sum(b.risk_score for b in access_blocks) / len(access_blocks)
-        
-        return {
-            'total_blocks': len(access_blocks),
-            'allow_count': allow_count,
-            'conditional_count': conditional_count,
-            'deny_count': deny_count,
-            'average_risk_score': round(avg_risk, 2),
-            'integrity_verified': self.verify_chain_integrity()[0]
-        }
+        self._ensure_indexes()
+        stats = _aggregate_summary(self._totals)
+        if stats['total_blocks'] == 0:
+            return stats
+        stats['integrity_verified'] = self.verify_chain_integrity()[0]
+        return stats
+
+    def get_user_statistics(self, user_id: str) -> dict:
+        """
+        Decision counts and average risk for one user, O(1).
+        """
+        self._ensure_indexes()
+        aggregate = self._user_totals.get(user_id) or _new_aggregate()
+        return {'user_id': user_id, **_aggregate_summary(aggregate)}
+
+    def get_resource_statistics(self, resource_id: str) -> dict:
+        """
+        Decision counts and average risk for one resource, O(1).
+        """
+        self._ensure_indexes()
+        aggregate = self._resource_totals.get(resource_id) or _new_aggregate()
+        return {'resource_id': resource_id, **_aggregate_summary(aggregate)}
     
+    @contextmanager
+    def merkle_tree(self, version: int = None):
+        """
+        Merkle tree over every block after genesis (leaf i is block i + 1),
+        for use in a with block:
+
+            with audit_log.merkle_tree() as tree:
+                root, proof = tree.root, tree.get_proof(i)
+
+        The tree of the log's merkle_version is kept up to date on append,
+        so roots and proofs need no rebuild. Appends wait while the with
+        block runs, so everything read from the tree there belongs to one
+        tree size; keep the block short. Any other version in
+        MERKLE_TREE_VERSIONS is built on request from the current chain,
+        e.g. to check a root published before the layout changed.
+        """
+        if version is not None and version != self.merkle_version:
+            if version not in MERKLE_TREE_VERSIONS:
+                raise ValueError(f"Unknown Merkle tree version {version}")
+            yield MERKLE_TREE_VERSIONS[version]([block.to_dict() for block in self.chain[1:]])
+            return
+        self._ensure_indexes()
+        with self._merkle_lock:
+            yield self._merkle
+
     def export_chain(self) -> list:
         """
         Export entire blockchain for backup or external verification.
@@ -158,7 +158,7 @@ class SessionManager:
             decision_engine: App's DecisionEngine
             users_db:        App's users_db for user data
             resources_db:    App's resources_db for resource data
-            audit_log:       App's BlockchainAuditLog for recording
+            audit_log:       App's audit appender (or BlockchainAuditLog) for recording
 
         Returns:
             Dict with re-evaluation result:
@@ -283,6 +283,8 @@ class SessionManager:
         # Record re-evaluation event
         event = {
             'session_id': session_id,
+            'user_id': user_id,
+            'resource_id': resource_id,
             'timestamp': datetime.now().isoformat(),
             'previous_decision': previous_decision,
             'new_decision': new_decision['decision'],
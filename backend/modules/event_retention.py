@@ -0,0 +1,215 @@
+"""
+Event Retention Module
+Bounds the growth of ml_events and session_events.
+
+Raw events older than the retention window are compacted into hourly
+aggregate documents (per user and resource: event count, decision
+counts, risk score histogram and min/max/sum) in the event_rollups
+collection, and then deleted. Long-term trends stay queryable through
+the rollups while storage and ML training-load time stay bounded by the
+window.
+
+Rollups are added into any existing document for the same hour, so an
+event arriving late for an hour that was already compacted is counted
+on top of it. Each run stamps its rollups with a run id and records a
+per-source watermark (the retention_state collection) before it writes
+them: if the run stops before its delete finishes, the next run first
+repeats it under the same id, which skips every document the first
+attempt already added to, so nothing is counted twice.
+"""
+
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from db import (
+    delete_ml_events_before,
+    delete_session_events_before,
+    get_retention_state,
+    iter_ml_events,
+    iter_session_events,
+    merge_event_rollups,
+    set_retention_state,
+)
+
+# Same buckets as the analytics risk distribution
+RISK_BUCKETS = (
+    (20, "0-20"),
+    (40, "20-40"),
+    (60, "40-60"),
+    (80, "60-80"),
+    (float("inf"), "80-100"),
+)
+
+# source collection -> (reader, deleter, field holding the decision)
+SOURCES = {
+    "ml_events": (iter_ml_events, delete_ml_events_before, "decision"),
+    "session_events": (iter_session_events, delete_session_events_before, "new_decision"),
+}
+
+ROLLUP_FIELDS = ("timestamp", "user_id", "resource_id", "decision",
+                 "new_decision", "risk_score")
+
+
+def _risk_bucket(score: float) -> str:
+    for upper, label in RISK_BUCKETS:
+        if score < upper:
+            return label
+    return RISK_BUCKETS[-1][1]
+
+
+def build_hourly_rollups(source: str, events, decision_field: str) -> list:
+    """
+    Aggregate raw events into one document per (hour, user_id, resource_id).
+    """
+    groups = {}
+    for ev in events:
+        timestamp = ev.get("timestamp")
+        if not timestamp:
+            continue
+        hour = f"{timestamp[:13]}:00:00"
+        key = (hour, ev.get("user_id"), ev.get("resource_id"))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                "source": source,
+                "hour": hour,
+                "user_id": key[1],
+                "resource_id": key[2],
+                "count": 0,
+                "decisions": defaultdict(int),
+                "risk_histogram": defaultdict(int),
+                "risk_sum": 0.0,
+                "risk_min": None,
+                "risk_max": None,
+            }
+        group["count"] += 1
+        group["decisions"][ev.get(decision_field) or "UNKNOWN"] += 1
+        score = ev.get("risk_score")
+        if isinstance(score, (int, float)):
+            group["risk_histogram"][_risk_bucket(score)] += 1
+            group["risk_sum"] += score
+            group["risk_min"] = score if group["risk_min"] is None else min(group["risk_min"], score)
+            group["risk_max"] = score if group["risk_max"] is None else max(group["risk_max"], score)
+
+    rollups = []
+    for group in groups.values():
+        group["decisions"] = dict(group["decisions"])
+        group["risk_histogram"] = dict(group["risk_histogram"])
+        if group["risk_min"] is None:
+            group["risk_min"] = group["risk_max"] = 0
+        rollups.append(group)
+    return rollups
+
+
+class EventRetention:
+    """
+    Periodic compaction of raw events into hourly rollups.
+
+    Parameters:
+        retention_hours:  raw events older than this are rolled up and deleted
+        interval_seconds: how often the background worker runs
+    """
+
+    def __init__(self, retention_hours: float = 720, interval_seconds: float = 3600):
+        self.retention_hours = retention_hours
+        self.interval_seconds = interval_seconds
+        self.last_run = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def cutoff(self, now: datetime = None) -> datetime:
+        """Events strictly older than this are compacted, aligned to a full hour."""
+        now = now or datetime.now()
+        cutoff = now - timedelta(hours=self.retention_hours)
+        return cutoff.replace(minute=0, second=0, microsecond=0)
+
+    def run_once(self, now: datetime = None) -> dict:
+        """
+        Roll up and delete every raw event older than the retention window.
+
+        The cutoff is aligned to an hour boundary so an hour is never split
+        across two runs. A source whose previous run stopped between its
+        rollup and its delete has that run finished first. Returns a
+        summary per source collection.
+        """
+        with self._lock:
+            cutoff = self.cutoff(now).isoformat()
+            summary = {"cutoff": cutoff, "sources": {}}
+            for source, (reader, deleter, decision_field) in SOURCES.items():
+                state = get_retention_state(source) or {
+                    "source": source, "folded_before": None, "pending": None,
+                }
+                written = deleted = 0
+                pending = state.get("pending")
+                if pending:
+                    written, deleted = self._fold(state, reader, deleter, decision_field,
+                                                  pending["run_id"], pending["cutoff"])
+                run_written, run_deleted = self._fold(state, reader, deleter, decision_field,
+                                                      uuid.uuid4().hex, cutoff)
+                summary["sources"][source] = {
+                    "rollups_written": written + run_written,
+                    "events_deleted": deleted + run_deleted,
+                    "folded_before": state["folded_before"],
+                }
+            summary["completed_at"] = datetime.now().isoformat()
+            self.last_run = summary
+            return summary
+
+    @staticmethod
+    def _fold(state: dict, reader, deleter, decision_field: str, run_id: str, cutoff: str) -> tuple:
+        """
+        One retention run for one source: add rollups of the events before
+        cutoff under run_id, delete those events and advance the watermark.
+        The run is recorded as pending until its delete has finished.
+        Returns (rollups written, events deleted).
+        """
+        source = state["source"]
+        events = reader(end_time=cutoff, fields=ROLLUP_FIELDS)
+        rollups = build_hourly_rollups(source, events, decision_field)
+        deleted = 0
+        if rollups:
+            state["pending"] = {"run_id": run_id, "cutoff": cutoff}
+            set_retention_state(state)
+            merge_event_rollups(rollups, run_id)
+            deleted = deleter(cutoff)
+        if rollups or state.get("pending"):
+            state["pending"] = None
+            state["folded_before"] = max(cutoff, state.get("folded_before") or cutoff)
+            set_retention_state(state)
+        return len(rollups), deleted
+
+    # ------------------------------------------------------------------
+    # Background worker
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Run retention now and then every interval_seconds on a daemon thread."""
+        if self._thread is not None or self.retention_hours <= 0:
+            return
+        self._thread = threading.Thread(
+            target=self._run_forever, name="event-retention", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run_forever(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as exc:
+                print(f"[retention] Run failed: {exc}")
+            if self._stop.wait(self.interval_seconds):
+                return
+
+    def get_status(self) -> dict:
+        return {
+            "retention_hours": self.retention_hours,
+            "interval_seconds": self.interval_seconds,
+            "running": self._thread is not None and not self._stop.is_set(),
+            "last_run": self.last_run,
+        }
@@ -0,0 +1,15 @@
+"""
+Process pool helpers shared by the audit modules.
+"""
+
+import multiprocessing
+
+
+def pool_context():
+    """
+    Start method for worker pools. Never fork: the app runs background
+    threads (group-commit writer, MongoDB probe, retention, fsync timer)
+    and a forked child could inherit one of their locks held.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
@@ -0,0 +1,203 @@
+"""
+Read-Through Record Cache
+Versioned in-process cache in front of the users and resources collections.
+
+Access decisions read user and resource attributes on every request.
+Instead of loading both collections once at startup and never refreshing
+them, `app.users_db` and `app.resources_db` are RecordCache instances:
+
+- Reads go to the cache first and fall through to a single-record read
+  from storage on a miss.
+- Every stored record carries a version that is bumped on each upsert.
+  Entries expire after `ttl_seconds`; an expired entry is re-read and
+  replaced only if storage holds a newer version, so attributes changed
+  by another worker are served for at most one TTL.
+- Writes in this process (`cache[key] = record`, or any call to
+  db.upsert_user / db.upsert_resource) go through to storage and
+  invalidate the cached entry immediately; `cache[key] = record` then
+  caches the record as storage returns it, so hits and misses have the
+  same shape.
+- Reads return a copy, so callers never share or mutate a cached record.
+- At most `max_entries` records are kept; the least recently used entry
+  is evicted first.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from db import (
+    add_invalidation_listener,
+    get_resource_record,
+    get_user_record,
+    upsert_resource,
+    upsert_user,
+)
+
+_MISSING = object()
+
+
+class _Entry:
+    __slots__ = ("value", "version", "expires_at")
+
+    def __init__(self, value: dict, version: int, expires_at: float):
+        self.value = value
+        self.version = version
+        self.expires_at = expires_at
+
+
+class RecordCache:
+    """
+    Dict-like read-through cache for one keyed collection.
+
+    Parameters:
+        collection_name: storage collection, used to match invalidations
+        loader:          key -> (record, version) or None
+        writer:          (key, record) -> new version; None for read-only
+        ttl_seconds:     how long an entry is served before revalidation
+        max_entries:     LRU capacity
+    """
+
+    def __init__(self, collection_name: str,
+                 loader: Callable[[str], Optional[Tuple[dict, int]]],
+                 writer: Optional[Callable[[str, dict], int]] = None,
+                 ttl_seconds: float = 30, max_entries: int = 10000):
+        self.collection_name = collection_name
+        self.loader = loader
+        self.writer = writer
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "revalidations": 0,
+            "refreshed": 0,
+            "invalidations": 0,
+            "evictions": 0,
+        }
+        add_invalidation_listener(self._on_upsert)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, key: str, default=None):
+        """Return the record for key, reading through to storage if needed."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return dict(entry.value)
+            if entry is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["revalidations"] += 1
+
+        loaded = self.loader(key)
+        if loaded is None:
+            with self._lock:
+                if self._entries.get(key) is entry and entry is not None:
+                    del self._entries[key]
+            return default
+
+        value, version = loaded
+        with self._lock:
+            return dict(self._store(key, value, version).value)
+
+    def __getitem__(self, key: str) -> dict:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    # ------------------------------------------------------------------
+    # Writes and invalidation
+    # ------------------------------------------------------------------
+
+    def __setitem__(self, key: str, value: dict):
+        """Write the record through to storage and cache what was stored."""
+        if self.writer is None:
+            raise TypeError(f"{self.collection_name} cache is read-only")
+        self.writer(key, value)
+        loaded = self.loader(key)
+        with self._lock:
+            if loaded is None:
+                self._entries.pop(key, None)
+            else:
+                self._store(key, *loaded)
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one entry, or every entry when key is None."""
+        with self._lock:
+            if key is None:
+                self._stats["invalidations"] += len(self._entries)
+                self._entries.clear()
+            elif self._entries.pop(key, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def _on_upsert(self, collection_name: str, key: str, version: int):
+        if collection_name != self.collection_name:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version < version:
+                del self._entries[key]
+                self._stats["invalidations"] += 1
+
+    def _store(self, key: str, value: dict, version: int) -> _Entry:
+        """Insert or refresh an entry; never replace a newer version. Caller holds the lock."""
+        expires_at = time.monotonic() + self.ttl_seconds
+        entry = self._entries.get(key)
+        if entry is not None and entry.version > version:
+            return entry
+        if entry is not None and entry.version == version:
+            entry.expires_at = expires_at
+        else:
+            if entry is not None:
+                self._stats["refreshed"] += 1
+            entry = self._entries[key] = _Entry(value, version, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+        return entry
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"] + self._stats["revalidations"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+
+def build_record_caches(app_config) -> Tuple[RecordCache, RecordCache]:
+    """Create the (users, resources) caches from CACHE_* settings."""
+    ttl = app_config.get("CACHE_TTL_SECONDS", 30)
+    max_entries = app_config.get("CACHE_MAX_ENTRIES", 10000)
+    users = RecordCache(
+        "users",
+        loader=get_user_record,
+        writer=lambda user_id, record: upsert_user({**record, "user_id": user_id}),
+        ttl_seconds=ttl,
+        max_entries=max_entries,
+    )
+    resources = RecordCache(
+        "resources",
+        loader=get_resource_record,
+        writer=upsert_resource,
+        ttl_seconds=ttl,
+        max_entries=max_entries,
+    )
+    return users, resources
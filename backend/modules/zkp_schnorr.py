@@ -17,6 +17,11 @@ Zero-Knowledge: Verifier learns nothing about x beyond the fact that prover know
 import secrets
 import hashlib
 import json
+import os
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+
+from .process_pools import pool_context
 
 
 class SchnorrZKP:
@@ -145,6 +150,120 @@ class SchnorrZKP:
         return {"p": self.P, "q": self.Q, "g": self.G}
 
 
+def _multiproof_siblings(leaf_count, indices):
+    """
+    Yield (level, index) of every node a multiproof for the given leaf
+    indices must carry, in the order the verifier consumes them: level by
+    level from the leaves up, left to right. A node is needed only when
+    its sibling is on a proven path and it is not itself derivable, so
+    paths that meet share everything above the meeting point.
+    """
+    known, count, level = sorted(set(indices)), leaf_count, 0
+    while count > 1:
+        known_set = set(known)
+        for index in known:
+            sibling = index ^ 1
+            if sibling < count and sibling not in known_set:
+                yield level, sibling
+        known = sorted({index // 2 for index in known})
+        count, level = -(-count // 2), level + 1
+
+
+def _fold_multiproof(leaf_count, leaves: dict, hashes, hash_pair, promote_odd: bool):
+    """
+    Recompute the root from proven leaves {index: node} and the proof's
+    sibling hashes (in _multiproof_siblings order). An odd last node is
+    promoted (version 2) or paired with itself (version 1).
+    Returns (root, hashes computed), or (None, 0) if the proof is malformed.
+    """
+    hashes = iter(hashes)
+    nodes, count, computed = dict(leaves), leaf_count, 0
+    try:
+        while count > 1:
+            parents = {}
+            for index in sorted(nodes):
+                parent = index // 2
+                if parent in parents:
+                    continue
+                left_index = index & ~1
+                left = nodes[left_index] if left_index in nodes else next(hashes)
+                if left_index + 1 >= count:
+                    if promote_odd:
+                        parents[parent] = left
+                        continue
+                    right = left
+                else:
+                    right = nodes[left_index + 1] if left_index + 1 in nodes else next(hashes)
+                parents[parent] = hash_pair(left, right)
+                computed += 1
+            nodes, count = parents, -(-count // 2)
+    except StopIteration:
+        return None, 0
+    if next(hashes, None) is not None or set(nodes) != {0}:
+        return None, 0
+    return nodes[0], computed
+
+
+# Below this many items leaf hashing stays in-process
+PARALLEL_LEAF_HASH_MIN_ITEMS = 20000
+
+
+def _hash_leaf_chunk(version: int, items) -> list:
+    """Leaf hashes of items for a tree version (also run in worker processes)."""
+    hash_leaf = MERKLE_TREE_VERSIONS[version]._hash_leaf
+    return [hash_leaf(item) for item in items]
+
+
+def hash_leaves(version: int, data_list, workers: int = 1) -> list:
+    """
+    Leaf hashes of data_list for a tree version, in order. With workers > 1
+    large lists are split into contiguous chunks hashed on a process pool.
+    """
+    data_list = list(data_list)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(data_list) < PARALLEL_LEAF_HASH_MIN_ITEMS:
+        return _hash_leaf_chunk(version, data_list)
+    chunk_size = -(-len(data_list) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as pool:
+        chunks = pool.map(_hash_leaf_chunk, [version] * (workers * 4),
+                          [data_list[i:i + chunk_size]
+                           for i in range(0, len(data_list), chunk_size)])
+        return [leaf for chunk in chunks for leaf in chunk]
+
+
+def _diff_subtrees(stored, candidate, count: int) -> tuple:
+    """
+    Leaf indices below `count` where two trees of the same version differ,
+    found top-down: a subtree whose root matches is skipped entirely, so
+    k differing leaves cost O(k log n) node comparisons.
+
+    Only nodes covering the same leaves in both trees are compared; if the
+    candidate is shorter than the stored tree its right-edge nodes are
+    descended into without comparing (one per level).
+    Returns (sorted indices, comparisons).
+    """
+    if count == 0:
+        return [], 0
+    same_size = count == stored.data_count
+    tampered, comparisons = [], 0
+    stack = [((count - 1).bit_length(), 0)]
+    while stack:
+        level, index = stack.pop()
+        start = index << level
+        if start >= count:
+            continue
+        if same_size or start + (1 << level) <= count:
+            comparisons += 1
+            if stored.node(level, index) == candidate.node(level, index):
+                continue
+            if level == 0:
+                tampered.append(index)
+                continue
+        stack.append((level - 1, 2 * index + 1))
+        stack.append((level - 1, 2 * index))
+    return sorted(tampered), comparisons
+
+
 class MerkleTree:
     """
     Merkle Tree implementation for efficient integrity verification.
@@ -152,8 +271,13 @@ class MerkleTree:
     Allows O(log n) verification of individual blocks without
     checking the entire chain. Provides tamper-detection that
     pinpoints exactly which block was modified.
+
+    Version 1 layout: hex digests, an odd last node is paired with itself.
+    See BinaryMerkleTree for version 2.
     """
 
+    VERSION = 1
+
     def __init__(self, data_list):
         """
         Build a Merkle tree from a list of data items.
@@ -164,6 +288,29 @@ class MerkleTree:
         self.tree = self._build_tree()
         self.root = self.tree[-1][0] if self.tree and self.tree[-1] else None
 
+    @classmethod
+    def from_leaf_hashes(cls, leaf_hashes):
+        """Build from already hashed leaves (hex), e.g. read from storage."""
+        tree = cls.__new__(cls)
+        tree.leaves = list(leaf_hashes)
+        tree.data_count = len(tree.leaves)
+        tree.tree = tree._build_tree()
+        tree.leaves = tree.tree[0]
+        tree.root = tree.tree[-1][0] if tree.tree[-1] else None
+        return tree
+
+    def node(self, level, index):
+        """Hex hash of the node at (level, index); level 0 is the leaves."""
+        return self.tree[level][index]
+
+    def copy(self):
+        """Detached copy at the current size, e.g. to read outside a lock."""
+        tree = self.__class__.__new__(self.__class__)
+        tree.tree = [list(level) for level in self.tree]
+        tree.leaves = tree.tree[0] if tree.tree else []
+        tree.data_count, tree.root = self.data_count, self.root
+        return tree
+
     @staticmethod
     def _hash_leaf(data):
         """Hash a single data item (leaf node)."""
@@ -248,6 +395,43 @@ class MerkleTree:
         
         return current == self.root
 
+    def get_multiproof(self, indices):
+        """
+        One proof for several leaves, with shared path nodes sent once.
+
+        Returns {"version", "leaf_count", "indices", "hashes"} where
+        indices are sorted and de-duplicated and hashes are the sibling
+        nodes in verification order, or None if an index is out of range.
+        """
+        indices = sorted(set(indices))
+        if not indices or indices[0] < 0 or indices[-1] >= len(self.leaves):
+            return None
+        return {
+            "version": self.VERSION,
+            "leaf_count": len(self.leaves),
+            "indices": indices,
+            "hashes": [self.tree[level][index]
+                       for level, index in _multiproof_siblings(len(self.leaves), indices)],
+        }
+
+    @classmethod
+    def verify_multiproof(cls, root, leaf_hashes, proof):
+        """
+        Check a multiproof against a root without the tree.
+        leaf_hashes are the hex leaf hashes for proof["indices"], in order.
+        Returns (is_valid, hashes computed).
+        """
+        if proof.get("version", cls.VERSION) != cls.VERSION or \
+                len(leaf_hashes) != len(proof["indices"]):
+            return False, 0
+        if any(i < 0 or i >= proof["leaf_count"] for i in proof["indices"]):
+            return False, 0
+        computed_root, computed = _fold_multiproof(
+            proof["leaf_count"], dict(zip(proof["indices"], leaf_hashes)),
+            proof["hashes"], cls._hash_pair, promote_odd=False,
+        )
+        return computed_root is not None and computed_root == root, computed
+
     def get_tree_visualization(self):
         """Return tree structure for frontend visualization."""
         return {
@@ -260,16 +444,479 @@ class MerkleTree:
             ],
         }
 
-    def detect_tampering(self, data_list):
+    def detect_tampering(self, data_list=None, leaf_hashes=None, workers: int = 1):
         """
         Compare current data against the tree to detect which items changed.
         Returns list of indices that were tampered with.
+
+        Pass either data_list (hashed here, on `workers` processes) or
+        leaf_hashes already computed from storage. Items beyond the tree's
+        leaves are ignored.
+        """
+        return self.locate_tampering(data_list, leaf_hashes, workers)["tampered"]
+
+    def locate_tampering(self, data_list=None, leaf_hashes=None, workers: int = 1) -> dict:
+        """
+        Tree-diff tamper localisation: the candidate leaves are built into a
+        tree of the same version and compared against this one from the
+        root down, descending only into subtrees whose hashes differ.
+
+        Returns {"tampered", "leaves_checked", "comparisons"}.
+        """
+        if leaf_hashes is None:
+            data_list = list(data_list or ())[:self.data_count]
+            leaf_hashes = hash_leaves(self.VERSION, data_list, workers)
+        else:
+            leaf_hashes = list(leaf_hashes)[:self.data_count]
+        candidate = type(self).from_leaf_hashes(leaf_hashes)
+        tampered, comparisons = _diff_subtrees(self, candidate, candidate.data_count)
+        return {
+            "tampered": tampered,
+            "leaves_checked": candidate.data_count,
+            "comparisons": comparisons,
+        }
+
+
+class IncrementalMerkleTree(MerkleTree):
+    """
+    Append-only MerkleTree, updated in place as leaves arrive.
+
+    Same levels, root and proofs as MerkleTree built over the same data
+    (an odd last node is paired with itself), but appending a leaf only
+    rehashes the right edge of the tree: one parent per level, O(log n).
+    Every level is kept, so proofs and the root are served without a
+    rebuild.
+    """
+
+    def __init__(self, data_list=()):
+        self.tree = [[]]
+        self.leaves = self.tree[0]
+        self.data_count = 0
+        self.root = None
+        for item in data_list:
+            self.append(item)
+
+    def append(self, data):
+        """Hash a data item and add it as the next leaf."""
+        self.append_leaf(self._hash_leaf(data))
+
+    def append_leaf(self, leaf_hash):
+        """Add an already hashed leaf and refresh its ancestors."""
+        tree = self.tree
+        tree[0].append(leaf_hash)
+        self.data_count += 1
+        level, index = 0, len(tree[0]) - 1
+        while len(tree[level]) > 1:
+            if level + 1 == len(tree):
+                tree.append([])
+            nodes = tree[level]
+            left_index = index - index % 2
+            left = nodes[left_index]
+            right = nodes[left_index + 1] if left_index + 1 < len(nodes) else left
+            parent, index = self._hash_pair(left, right), index // 2
+            parents = tree[level + 1]
+            if index < len(parents):
+                parents[index] = parent
+            else:
+                parents.append(parent)
+            level += 1
+        self.root = tree[level][0]
+
+
+# Same output as json.dumps(data, sort_keys=True), without per-call setup
+_LEAF_ENCODER = json.JSONEncoder(sort_keys=True)
+
+
+class _HexNodes(Sequence):
+    """Read-only hex view of one level of a BinaryMerkleTree."""
+
+    def __init__(self, tree: "BinaryMerkleTree", level: int):
+        self._tree = tree
+        self._level = level
+
+    def __len__(self):
+        return self._tree._count(self._level)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        index = range(len(self))[index]
+        return self._tree.node(self._level, index).hex()
+
+
+class BinaryMerkleTree:
+    """
+    Version 2 Merkle tree: raw 32-byte digests in one contiguous buffer.
+
+    Differences from MerkleTree (version 1):
+    - Leaves are SHA-256(0x00 || data) and parents SHA-256(0x01 || left ||
+      right) over raw digests, as in RFC 6962, so a leaf can never be
+      passed off as an internal node and half as many bytes are hashed.
+    - An odd last node is promoted to the next level unchanged rather than
+      paired with itself; the root equals the RFC 6962 Merkle Tree Hash.
+    - Nodes are stored level by level in a single bytearray with room for
+      `capacity` leaves (a power of two, doubled when full), so appending
+      a leaf rehashes only the right edge, O(log n).
+
+    Hex strings appear only at the API boundary (root, leaves, proofs);
+    proofs have the same shape as MerkleTree.get_proof().
+
+    Appends rewrite right-edge nodes in place, so a tree shared between
+    threads needs a lock around appends and reads alike; the audit log's
+    tree is read through BlockchainAuditLog.merkle_tree(), which holds it.
+    """
+
+    VERSION = 2
+    DIGEST_SIZE = 32
+    LEAF_PREFIX = b"\x00"
+    NODE_PREFIX = b"\x01"
+
+    def __init__(self, data_list=()):
+        self._reset(0)
+        data_list = list(data_list)
+        if data_list:
+            self._build(b"".join(self._hash_leaf(item) for item in data_list))
+
+    @classmethod
+    def from_leaf_digests(cls, digests: bytes) -> "BinaryMerkleTree":
+        """Build from concatenated 32-byte leaf digests (already hashed)."""
+        if len(digests) % cls.DIGEST_SIZE:
+            raise ValueError("Leaf digests must be a multiple of 32 bytes")
+        tree = cls()
+        if digests:
+            tree._build(bytes(digests))
+        return tree
+
+    # ------------------------------------------------------------------
+    # Hashing
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _hash_leaf(cls, data) -> bytes:
+        """Digest of a data item, encoded as in MerkleTree."""
+        if isinstance(data, dict):
+            data_str = _LEAF_ENCODER.encode(data)
+        else:
+            data_str = str(data)
+        return hashlib.sha256(cls.LEAF_PREFIX + data_str.encode()).digest()
+
+    @classmethod
+    def _hash_pair(cls, left: bytes, right: bytes) -> bytes:
+        return hashlib.sha256(cls.NODE_PREFIX + left + right).digest()
+
+    # ------------------------------------------------------------------
+    # Layout: for capacity C, level L holds ceil(n / 2^L) nodes starting
+    # at node 2C - 2C / 2^L of the buffer
+    # ------------------------------------------------------------------
+
+    def _reset(self, capacity: int):
+        self._capacity = capacity
+        self._buffer = bytearray(max(0, 2 * capacity - 1) * self.DIGEST_SIZE)
+        self.data_count = 0
+
+    def _offset(self, level: int, capacity: int = None) -> int:
+        nodes = 2 * (self._capacity if capacity is None else capacity)
+        return (nodes - (nodes >> level)) * self.DIGEST_SIZE
+
+    def _count(self, level: int, data_count: int = None) -> int:
+        return -(-(self.data_count if data_count is None else data_count) >> level)
+
+    @property
+    def depth(self) -> int:
+        """Number of levels, leaves included (0 for an empty tree)."""
+        return (self.data_count - 1).bit_length() + 1 if self.data_count else 0
+
+    def copy(self) -> "BinaryMerkleTree":
+        """Detached copy at the current size, e.g. to read outside a lock."""
+        tree = self.__class__.__new__(self.__class__)
+        tree._capacity, tree.data_count = self._capacity, self.data_count
+        tree._buffer = bytearray(self._buffer)
+        return tree
+
+    def node(self, level: int, index: int) -> bytes:
+        start = self._offset(level) + index * self.DIGEST_SIZE
+        return bytes(self._buffer[start:start + self.DIGEST_SIZE])
+
+    def _set_node(self, level: int, index: int, digest: bytes):
+        start = self._offset(level) + index * self.DIGEST_SIZE
+        self._buffer[start:start + self.DIGEST_SIZE] = digest
+
+    def _build(self, leaf_digests: bytes):
+        """Lay out the leaves and hash each level above them in one pass."""
+        size = self.DIGEST_SIZE
+        count = len(leaf_digests) // size
+        self._reset(1 << (count - 1).bit_length())
+        self.data_count = count
+        self._buffer[0:len(leaf_digests)] = leaf_digests
+        level, nodes = 0, leaf_digests
+        sha256, prefix = hashlib.sha256, self.NODE_PREFIX
+        while count > 1:
+            parents = b"".join(
+                sha256(prefix + nodes[i:i + 2 * size]).digest()
+                for i in range(0, (count // 2) * 2 * size, 2 * size)
+            )
+            if count % 2:
+                parents += nodes[-size:]   # promoted unchanged
+            level, nodes, count = level + 1, parents, -(-count // 2)
+            start = self._offset(level)
+            self._buffer[start:start + len(nodes)] = nodes
+
+    def _grow(self):
+        """
+        Double the capacity, moving every level to its new offset. The new
+        buffer is filled before it replaces the old one together with the
+        capacity, so the tree never pairs a buffer with the wrong layout.
+        """
+        capacity = max(1, 2 * self._capacity)
+        buffer = bytearray((2 * capacity - 1) * self.DIGEST_SIZE)
+        for level in range(self.depth):
+            length = self._count(level) * self.DIGEST_SIZE
+            old_start, new_start = self._offset(level), self._offset(level, capacity)
+            buffer[new_start:new_start + length] = self._buffer[old_start:old_start + length]
+        self._buffer, self._capacity = buffer, capacity
+
+    # ------------------------------------------------------------------
+    # Appends
+    # ------------------------------------------------------------------
+
+    def append(self, data):
+        """Hash a data item and add it as the next leaf."""
+        self.append_leaf(self._hash_leaf(data))
+
+    def append_leaf(self, leaf_digest: bytes):
+        """
+        Add a 32-byte leaf digest and refresh its ancestors. data_count is
+        raised only once every ancestor is hashed, so a failed append
+        leaves the tree at its old size.
+        """
+        if len(leaf_digest) != self.DIGEST_SIZE:
+            raise ValueError("Leaf digest must be 32 bytes")
+        if self.data_count == self._capacity:
+            self._grow()
+        index = self.data_count
+        count = index + 1
+        self._set_node(0, index, leaf_digest)
+        level = 0
+        while self._count(level, count) > 1:
+            left_index = index - index % 2
+            left = self.node(level, left_index)
+            if left_index + 1 < self._count(level, count):
+                parent = self._hash_pair(left, self.node(level, left_index + 1))
+            else:
+                parent = left   # promoted
+            index //= 2
+            level += 1
+            self._set_node(level, index, parent)
+        self.data_count = count
+
+    # ------------------------------------------------------------------
+    # MerkleTree-compatible API (hex at the boundary)
+    # ------------------------------------------------------------------
+
+    @property
+    def root(self):
+        if not self.data_count:
+            return None
+        return self.node(self.depth - 1, 0).hex()
+
+    @property
+    def leaves(self) -> _HexNodes:
+        return _HexNodes(self, 0)
+
+    @property
+    def tree(self) -> list:
+        return [_HexNodes(self, level) for level in range(self.depth)] or [[]]
+
+    def get_proof(self, index):
+        """
+        Authentication path for the leaf at index, as in MerkleTree. Levels
+        where the node was promoted have no sibling and add no step.
+        """
+        if index < 0 or index >= self.data_count:
+            return None
+        proof = []
+        for level in range(self.depth - 1):
+            is_right = index % 2 == 1
+            sibling_index = index - 1 if is_right else index + 1
+            if sibling_index < self._count(level):
+                proof.append({
+                    "hash": self.node(level, sibling_index).hex(),
+                    "direction": "left" if is_right else "right",
+                    "level": level,
+                })
+            index //= 2
+        return proof
+
+    def verify_proof(self, leaf_hash, proof):
+        """Verify a hex leaf digest against the root using its proof path."""
+        current = bytes.fromhex(leaf_hash)
+        for step in proof:
+            sibling = bytes.fromhex(step["hash"])
+            if step["direction"] == "right":
+                current = self._hash_pair(current, sibling)
+            else:
+                current = self._hash_pair(sibling, current)
+        return current.hex() == self.root
+
+    def get_multiproof(self, indices):
+        """
+        One proof for several leaves, with shared path nodes sent once.
+        Same format as MerkleTree.get_multiproof().
+        """
+        indices = sorted(set(indices))
+        if not indices or indices[0] < 0 or indices[-1] >= self.data_count:
+            return None
+        return {
+            "version": self.VERSION,
+            "leaf_count": self.data_count,
+            "indices": indices,
+            "hashes": [self.node(level, index).hex()
+                       for level, index in _multiproof_siblings(self.data_count, indices)],
+        }
+
+    @classmethod
+    def verify_multiproof(cls, root, leaf_hashes, proof):
+        """
+        Check a multiproof against a hex root without the tree.
+        leaf_hashes are the hex leaf hashes for proof["indices"], in order.
+        Returns (is_valid, hashes computed).
+        """
+        if proof.get("version") != cls.VERSION or len(leaf_hashes) != len(proof["indices"]):
+            return False, 0
+        if any(i < 0 or i >= proof["leaf_count"] for i in proof["indices"]):
+            return False, 0
+        try:
+            leaves = {i: bytes.fromhex(h) for i, h in zip(proof["indices"], leaf_hashes)}
+            hashes = [bytes.fromhex(h) for h in proof["hashes"]]
+        except (TypeError, ValueError):
+            return False, 0
+        computed_root, computed = _fold_multiproof(
+            proof["leaf_count"], leaves, hashes, cls._hash_pair, promote_odd=True,
+        )
+        return computed_root is not None and computed_root.hex() == root, computed
+
+    # ------------------------------------------------------------------
+    # Consistency proofs (RFC 6962 section 2.1.2)
+    # ------------------------------------------------------------------
+
+    def _subtree_hash(self, start: int, end: int) -> bytes:
+        """
+        Merkle Tree Hash of leaves [start, end). Stored nodes cover aligned
+        power-of-two ranges and the right edge of the tree; any other range
+        is split at the largest power of two below its size.
+        """
+        size = end - start
+        level = (size - 1).bit_length()
+        if start % (1 << level) == 0 and (size == 1 << level or end == self.data_count):
+            return self.node(level, start >> level)
+        split = 1 << (level - 1)
+        return self._hash_pair(self._subtree_hash(start, start + split),
+                               self._subtree_hash(start + split, end))
+
+    def root_at(self, size: int):
+        """Hex root the tree had when it held its first `size` leaves."""
+        if size < 1 or size > self.data_count:
+            return None
+        return self._subtree_hash(0, size).hex()
+
+    def get_consistency_proof(self, first: int, second: int = None):
+        """
+        Proof that the tree of the first `first` leaves is a prefix of the
+        tree of the first `second` leaves (default: all of them): O(log n)
+        hex node hashes, or None if not 0 < first <= second <= leaf count.
+        """
+        second = self.data_count if second is None else second
+        if not 0 < first <= second <= self.data_count:
+            return None
+        return [digest.hex() for digest in self._subproof(first, 0, second, True)]
+
+    def _subproof(self, m: int, start: int, end: int, complete: bool) -> list:
+        """SUBPROOF(m, D[start:end], b) from RFC 6962."""
+        if m == end - start:
+            return [] if complete else [self._subtree_hash(start, end)]
+        split = 1 << ((end - start - 1).bit_length() - 1)
+        if m <= split:
+            return (self._subproof(m, start, start + split, complete)
+                    + [self._subtree_hash(start + split, end)])
+        return (self._subproof(m - split, start + split, end, False)
+                + [self._subtree_hash(start, start + split)])
+
+    @classmethod
+    def verify_consistency(cls, first: int, second: int, first_root: str,
+                           second_root: str, proof) -> bool:
+        """
+        Check a consistency proof between two hex roots without the tree
+        (the verification algorithm of RFC 9162 section 2.1.4.2).
         """
-        tampered = []
-        for i, item in enumerate(data_list):
-            if i >= len(self.leaves):
-                break
-            current_hash = self._hash_leaf(item)
-            if current_hash != self.leaves[i]:
-                tampered.append(i)
-        return tampered
\ No newline at end of file
+        if not 0 < first <= second:
+            return False
+        if first == second:
+            return not proof and first_root == second_root
+        try:
+            path = [bytes.fromhex(h) for h in proof]
+            first_hash, second_hash = bytes.fromhex(first_root), bytes.fromhex(second_root)
+        except (TypeError, ValueError):
+            return False
+        if first & (first - 1) == 0:
+            path.insert(0, first_hash)
+        if not path:
+            return False
+        fn, sn = first - 1, second - 1
+        while fn & 1:
+            fn, sn = fn >> 1, sn >> 1
+        fr = sr = path[0]
+        for node in path[1:]:
+            if sn == 0:
+                return False
+            if fn & 1 or fn == sn:
+                fr = cls._hash_pair(node, fr)
+                sr = cls._hash_pair(node, sr)
+                while not fn & 1 and fn != 0:
+                    fn, sn = fn >> 1, sn >> 1
+            else:
+                sr = cls._hash_pair(sr, node)
+            fn, sn = fn >> 1, sn >> 1
+        return fr == first_hash and sr == second_hash and sn == 0
+
+    def get_tree_visualization(self):
+        """Return tree structure for frontend visualization."""
+        return {
+            "root": self.root,
+            "levels": self.depth,
+            "leaf_count": self.data_count,
+            "tree_layers": [
+                [h[:12] + "..." for h in level]
+                for level in self.tree
+            ],
+        }
+
+    @classmethod
+    def from_leaf_hashes(cls, leaf_hashes):
+        """Build from already hashed leaves (raw digests or hex)."""
+        return cls.from_leaf_digests(b"".join(
+            bytes.fromhex(leaf) if isinstance(leaf, str) else leaf for leaf in leaf_hashes
+        ))
+
+    detect_tampering = MerkleTree.detect_tampering
+    locate_tampering = MerkleTree.locate_tampering
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the digest buffer."""
+        return len(self._buffer)
+
+
+# Tree classes by version, so roots published under an older version can
+# still be rebuilt and checked
+MERKLE_TREE_VERSIONS = {
+    MerkleTree.VERSION: MerkleTree,
+    BinaryMerkleTree.VERSION: BinaryMerkleTree,
+}
+
+
+def build_merkle_tree(data_list, version: int = BinaryMerkleTree.VERSION):
+    """Build a Merkle tree of the given version over data_list."""
+    try:
+        tree_class = MERKLE_TREE_VERSIONS[version]
+    except KeyError:
+        raise ValueError(f"Unknown Merkle tree version {version}") from None
+    return tree_class(data_list)
@@ -70,7 +70,7 @@ def build_context(user_id: str, resource_id: str, request_data: dict) -> dict:
         request_data: Dict from request.get_json() with optional overrides
     """
     user_data = current_app.users_db.get(user_id, {})
-    resource_data = MOCK_RESOURCES.get(resource_id, {})
+    resource_data = current_app.resources_db.get(resource_id, {})
     
     context = {
         'user_id': user_id,
@@ -110,24 +110,22 @@ def request_access(token_payload=None):
     if not resource_id:
         return {'error': 'resource_id is required'}, 400
     
-    if resource_id not in MOCK_RESOURCES:
+    resource_data = current_app.resources_db.get(resource_id)
+    if resource_data is None:
         return {'error': 'Resource not found'}, 404
     
     # Ensure user exists in users_db
-    if user_id not in current_app.users_db:
+    user_data = current_app.users_db.get(user_id)
+    if user_data is None:
         return {'error': 'User not found. Please log in again.'}, 401
     
-    # Update user context if provided in the request
+    # Build evaluation context. Device trust and location sent with the
+    # request apply to this evaluation only and are never stored.
+    context = build_context(user_id, resource_id, data)
     if 'device_trust_score' in data:
-        current_app.users_db[user_id]['device_trust_score'] = data['device_trust_score']
+        context['device_trust_score'] = data['device_trust_score']
     if 'current_location' in data:
-        current_app.users_db[user_id]['location'] = data['current_location']
-    
-    user_data = current_app.users_db[user_id]
-    resource_data = MOCK_RESOURCES[resource_id]
-    
-    # Build evaluation context
-    context = build_context(user_id, resource_id, data)
+        context['location'] = data['current_location']
     
     # 1. RBAC Evaluation — use role hierarchy comparison
     #    Compare user's role level against the resource's required role level.
@@ -171,7 +169,7 @@ def request_access(token_payload=None):
     decision_response['resource_id'] = resource_id
     
     # Record in blockchain audit log
-    audit_block = current_app.audit_log.add_access_decision(
+    audit_block = current_app.audit_appender.add_access_decision(
         user_id,
         resource_id,
         decision_response['decision'],
@@ -333,12 +331,30 @@ def get_denied_accesses(token_payload=None):
 def get_high_risk(token_payload=None):
     """
     Get all high-risk access attempts.
+    
+    Query parameters:
+    - threshold: Risk score threshold (default: 70)
+    - order: chain (oldest first, default) | risk (riskiest first, for top-N)
+    - limit, offset: Optional pagination
     """
     threshold = request.args.get('threshold', 70, type=float)
-    high_risk = current_app.audit_log.get_high_risk_accesses(threshold)
+    order = request.args.get('order', 'chain')
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', 0, type=int)
+    audit_log = current_app.audit_log
+    try:
+        high_risk = audit_log.get_high_risk_accesses(
+            threshold, limit=limit, offset=offset, order=order
+        )
+    except ValueError as exc:
+        return {'error': str(exc)}, 400
     
     return {
         'high_risk_accesses': high_risk,
         'threshold': threshold,
-        'count': len(high_risk)
+        'order': order,
+        'offset': offset,
+        'limit': limit,
+        'count': len(high_risk),
+        'total': audit_log.count_high_risk_accesses(threshold)
     }, 200
@@ -118,14 +118,29 @@ def get_high_risk_accesses(token_payload=None):
     
     Query parameters:
     - threshold: Risk score threshold (default: 70)
+    - order: chain (oldest first, default) | risk (riskiest first, for top-N)
+    - limit, offset: Optional pagination
     """
     threshold = request.args.get('threshold', 70, type=float)
-    high_risk = current_app.audit_log.get_high_risk_accesses(threshold)
+    order = request.args.get('order', 'chain')
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', 0, type=int)
+    audit_log = current_app.audit_log
+    try:
+        high_risk = audit_log.get_high_risk_accesses(
+            threshold, limit=limit, offset=offset, order=order
+        )
+    except ValueError as exc:
+        return {'error': str(exc)}, 400
     
     return {
         'high_risk_accesses': high_risk,
         'threshold': threshold,
-        'count': len(high_risk)
+        'order': order,
+        'offset': offset,
+        'limit': limit,
+        'count': len(high_risk),
+        'total': audit_log.count_high_risk_accesses(threshold)
     }, 200
 
 
@@ -135,13 +150,18 @@ def check_chain_integrity(token_payload=None):
     """
     Verify the integrity of the audit blockchain.
     Returns whether the chain has been tampered with.
+
+    Only blocks appended since the last check are verified unless
+    ?mode=full is given.
     """
-    is_valid, message = current_app.audit_log.verify_chain_integrity()
+    full = request.args.get('mode') == 'full'
+    report = current_app.audit_log.verify_chain(full=full)
     
     return {
-        'integrity_verified': is_valid,
-        'message': message,
-        'total_blocks': len(current_app.audit_log.chain)
+        'integrity_verified': report['valid'],
+        'message': report['message'],
+        'total_blocks': len(current_app.audit_log.chain),
+        'verification': report
     }, 200
 
 
@@ -150,12 +170,24 @@ def check_chain_integrity(token_payload=None):
 def get_audit_statistics(token_payload=None):
     """
     Get comprehensive statistics about the audit log.
-    """
-    stats = current_app.audit_log.get_chain_statistics()
     
-    return {
-        'audit_statistics': stats
-    }, 200
+    Query parameters:
+    - user_id: Also return statistics for this user
+    - resource_id: Also return statistics for this resource
+    """
+    audit_log = current_app.audit_log
+    response = {
+        'audit_statistics': audit_log.get_chain_statistics()
+    }
+    
+    user_id = request.args.get('user_id')
+    if user_id:
+        response['user_statistics'] = audit_log.get_user_statistics(user_id)
+    resource_id = request.args.get('resource_id')
+    if resource_id:
+        response['resource_statistics'] = audit_log.get_resource_statistics(resource_id)
+    
+    return response, 200
 
 
 @audit_bp.route('/export', methods=['GET'])
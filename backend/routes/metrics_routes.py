@@ -6,8 +6,9 @@ and blockchain integrity so the frontend can visualize
 system behavior over time.
 """
 
-from flask import Blueprint, current_app, jsonify
-from middleware.auth import require_auth
+from flask import Blueprint, current_app, jsonify, request
+from db import get_connection_state, get_index_stats, iter_event_rollups
+from middleware.auth import require_auth, require_admin
 
 metrics_bp = Blueprint("metrics", __name__)
 
@@ -28,6 +29,11 @@ def summary_metrics(token_payload=None):
                 "decision_stats": decision_stats,
                 "blockchain_stats": chain_stats,
                 "risk_profile": current_app.active_risk_profile,
+                "cache_stats": {
+                    "users": current_app.users_db.get_stats(),
+                    "resources": current_app.resources_db.get_stats(),
+                },
+                "audit_appender": current_app.audit_appender.get_stats(),
             }
         ),
         200,
@@ -39,10 +45,79 @@ def summary_metrics(token_payload=None):
 def integrity_check(token_payload=None):
     """
     Explicit endpoint to verify blockchain integrity.
+    Incremental by default; ?mode=full rehashes the whole chain.
+    Requires authentication; full mode requires an admin.
+    """
+    full = request.args.get("mode") == "full"
+    if full:
+        user_data = current_app.users_db.get(token_payload.get("user_id"), {})
+        if user_data.get("role") != "admin":
+            return {"error": "Admin privileges required"}, 403
+    report = current_app.audit_log.verify_chain(full=full)
+    return jsonify({
+        "valid": report["valid"],
+        "details": report["message"],
+        "verification": report,
+    }), 200
+
+
+@metrics_bp.route("/audit-appender", methods=["GET"])
+@require_auth
+def audit_appender_stats(token_payload=None):
+    """
+    Group-commit writer metrics: batch sizes, time between commits and
+    current queue depth.
+    Requires authentication.
+    """
+    return jsonify(current_app.audit_appender.get_stats()), 200
+
+
+@metrics_bp.route("/indexes", methods=["GET"])
+@require_admin
+def index_stats(token_payload=None):
+    """
+    Report registered database indexes and how often each has been used.
+    Admin only.
+    """
+    return jsonify({
+        "backend": get_connection_state()["backend"],
+        "indexes": get_index_stats(),
+    }), 200
+
+
+@metrics_bp.route("/retention/run", methods=["POST"])
+@require_admin
+def run_retention(token_payload=None):
+    """
+    Roll up and delete raw events older than the retention window now.
+    Admin only.
+    """
+    summary = current_app.event_retention.run_once()
+    return jsonify(summary), 200
+
+
+@metrics_bp.route("/rollups", methods=["GET"])
+@require_auth
+def event_rollups(token_payload=None):
+    """
+    Return hourly event rollups (long-term trends beyond the retention window).
+
+    Query params: source (ml_events|session_events), start, end (ISO hours,
+    end exclusive), user_id, resource_id.
     Requires authentication.
     """
-    is_valid, details = current_app.audit_log.verify_chain_integrity()
-    return jsonify({"valid": is_valid, "details": details}), 200
+    rollups = list(iter_event_rollups(
+        source=request.args.get("source"),
+        start_hour=request.args.get("start"),
+        end_hour=request.args.get("end"),
+        user_id=request.args.get("user_id"),
+        resource_id=request.args.get("resource_id"),
+    ))
+    return jsonify({
+        "retention": current_app.event_retention.get_status(),
+        "total": len(rollups),
+        "rollups": rollups,
+    }), 200
 
 
 @metrics_bp.route("/analytics", methods=["GET"])
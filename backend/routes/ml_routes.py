@@ -18,9 +18,9 @@ from modules.ml_model import (
     _load_model,
     MODEL_PATH,
 )
-from db import load_ml_events
+from db import iter_ml_events
 from middleware.auth import require_auth, require_admin
-from routes.access_routes import build_context, MOCK_RESOURCES
+from routes.access_routes import build_context
 
 ml_bp = Blueprint("ml", __name__)
 
@@ -56,7 +56,7 @@ def predict(token_payload=None):
     if not resource_id:
         return {"error": "resource_id is required"}, 400
 
-    if resource_id not in MOCK_RESOURCES:
+    if resource_id not in current_app.resources_db:
         return {"error": "Resource not found"}, 404
 
     if user_id not in current_app.users_db:
@@ -78,15 +78,15 @@ def model_status(token_payload=None):
     Returns whether model is trained, sample count, and cached metrics.
     """
     model_exists = os.path.exists(MODEL_PATH)
-    events = load_ml_events()
-    event_count = len(events)
 
-    # Decision distribution in training data
+    # Decision distribution in training data, streamed with only the
+    # field we need so memory stays flat as history grows
+    event_count = 0
     decision_distribution = {}
-    if events:
-        for ev in events:
-            d = ev.get("decision", "UNKNOWN")
-            decision_distribution[d] = decision_distribution.get(d, 0) + 1
+    for ev in iter_ml_events(fields=["decision"]):
+        event_count += 1
+        d = ev.get("decision", "UNKNOWN")
+        decision_distribution[d] = decision_distribution.get(d, 0) + 1
 
     # Try to get feature importance from the trained model
     feature_importance = {}
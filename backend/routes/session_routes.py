@@ -52,10 +52,6 @@ def heartbeat(token_payload=None):
     if 'location' in data:
         updated_context['current_location'] = data['location']
 
-    # Use the MOCK_RESOURCES from access_routes as the resources_db
-    from routes.access_routes import MOCK_RESOURCES
-    resources_db = {**MOCK_RESOURCES, **current_app.resources_db}
-
     # Process heartbeat through continuous verification
     result = current_app.session_manager.process_heartbeat(
         session_id=session_id,
@@ -65,8 +61,8 @@ def heartbeat(token_payload=None):
         risk_engine=current_app.risk_engine,
         decision_engine=current_app.decision_engine,
         users_db=current_app.users_db,
-        resources_db=resources_db,
-        audit_log=current_app.audit_log
+        resources_db=current_app.resources_db,
+        audit_log=current_app.audit_appender
     )
 
     # Persist re-evaluation event
@@ -140,7 +136,7 @@ def revoke_session(session_id, token_payload=None):
         return {'error': 'Session not found'}, 404
 
     # Record revocation in audit log
-    current_app.audit_log.add_access_decision(
+    current_app.audit_appender.add_access_decision(
         session['user_id'],
         session['resource_id'],
         'SESSION_REVOKED',
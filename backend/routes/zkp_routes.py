@@ -8,7 +8,7 @@ Provides:
 """
 
 from flask import Blueprint, request, jsonify, current_app
-from modules.zkp_schnorr import SchnorrZKP, MerkleTree
+from modules.zkp_schnorr import MERKLE_TREE_VERSIONS, SchnorrZKP
 from middleware.auth import require_auth
 import json
 
@@ -183,25 +183,40 @@ def non_interactive_verify():
     }), 200
 
 
+def _requested_merkle_version():
+    """
+    ?version=1|2 selects a tree layout other than the maintained one (built
+    on request). Returns (version or None, error).
+    """
+    version = request.args.get("version", type=int)
+    if version is not None and version not in MERKLE_TREE_VERSIONS:
+        return None, (jsonify({"error": f"Unknown Merkle tree version {version}"}), 400)
+    return version, None
+
+
 @zkp_bp.route("/merkle/tree", methods=["GET"])
 @require_auth
 def get_merkle_tree(token_payload=None):
     """
-    Build and return the Merkle tree for the current audit chain.
+    Return the Merkle tree for the current audit chain.
     Shows tree structure and root hash.
     """
-    blocks = current_app.audit_log.chain[1:]  # Skip genesis
-    
-    if not blocks:
+    version, error = _requested_merkle_version()
+    if error:
+        return error
+
+    # Appends wait while the tree is held: copy it and render the copy
+    with current_app.audit_log.merkle_tree(version) as tree:
+        tree = tree.copy()
+
+    if not tree.data_count:
         return jsonify({"message": "No audit blocks to build tree from", "tree": None}), 200
-    
-    block_data = [b.to_dict() for b in blocks]
-    tree = MerkleTree(block_data)
-    
+
     viz = tree.get_tree_visualization()
-    
+
     return jsonify({
         "merkle_root": tree.root,
+        "merkle_version": tree.VERSION,
         "total_leaves": tree.data_count,
         "tree_depth": viz["levels"],
         "tree_layers": viz["tree_layers"],
@@ -216,34 +231,166 @@ def get_merkle_proof(block_index, token_payload=None):
     Get the Merkle proof for a specific audit block.
     Allows O(log n) verification of a single block's inclusion.
     """
-    blocks = current_app.audit_log.chain[1:]
-    
-    if not blocks:
-        return jsonify({"error": "No audit blocks"}), 400
-    
-    if block_index < 0 or block_index >= len(blocks):
-        return jsonify({"error": f"Block index must be 0-{len(blocks)-1}"}), 400
-    
-    block_data = [b.to_dict() for b in blocks]
-    tree = MerkleTree(block_data)
-    
-    proof = tree.get_proof(block_index)
-    leaf_hash = tree.leaves[block_index]
-    is_valid = tree.verify_proof(leaf_hash, proof)
-    
+    version, error = _requested_merkle_version()
+    if error:
+        return error
+
+    # Appends wait while the tree is held: copy out the proof only
+    with current_app.audit_log.merkle_tree(version) as tree:
+        leaf_count = tree.data_count
+        if not leaf_count:
+            return jsonify({"error": "No audit blocks"}), 400
+        if block_index < 0 or block_index >= leaf_count:
+            return jsonify({"error": f"Block index must be 0-{leaf_count-1}"}), 400
+        proof = tree.get_proof(block_index)
+        leaf_hash = tree.leaves[block_index]
+        is_valid = tree.verify_proof(leaf_hash, proof)
+        root, tree_version = tree.root, tree.VERSION
+
     return jsonify({
         "block_index": block_index,
-        "block_data": block_data[block_index],
+        "block_data": current_app.audit_log.chain[block_index + 1].to_dict(),
         "leaf_hash": leaf_hash,
-        "merkle_root": tree.root,
+        "merkle_root": root,
+        "merkle_version": tree_version,
         "proof_path": proof,
         "proof_length": len(proof),
         "verified": is_valid,
-        "complexity": f"O(log2({tree.data_count})) = O({len(proof)}) hash computations",
+        "complexity": f"O(log2({leaf_count})) = O({len(proof)}) hash computations",
         "description": "This proof allows verifying this single block belongs to the tree without checking all blocks.",
     }), 200
 
 
+@zkp_bp.route("/merkle/consistency", methods=["GET"])
+@require_auth
+def get_merkle_consistency(token_payload=None):
+    """
+    Prove the audit chain only grew between two tree sizes.
+
+    Query params: from=<m>, to=<n> (default: current size), counted in
+    blocks after genesis; ?version as for /merkle/tree (version 2 only).
+
+    A mirror holding the root for its first m blocks fetches blocks
+    m..n-1, checks the O(log n) proof against its old root and the new
+    one, and never needs to re-download or re-hash history.
+    """
+    version, error = _requested_merkle_version()
+    if error:
+        return error
+
+    with current_app.audit_log.merkle_tree(version) as tree:
+        if not hasattr(tree, "get_consistency_proof"):
+            return jsonify({"error": "Consistency proofs need Merkle tree version 2"}), 400
+
+        first = request.args.get("from", type=int)
+        second = request.args.get("to", default=tree.data_count, type=int)
+        if first is None:
+            return jsonify({"error": "from is required"}), 400
+        if not 0 < first <= second <= tree.data_count:
+            return jsonify({"error": f"Sizes must satisfy 0 < from <= to <= {tree.data_count}"}), 400
+
+        proof = tree.get_consistency_proof(first, second)
+        first_root, second_root = tree.root_at(first), tree.root_at(second)
+
+        return jsonify({
+            "from": first,
+            "to": second,
+            "first_root": first_root,
+            "second_root": second_root,
+            "merkle_version": tree.VERSION,
+            "consistency_proof": proof,
+            "proof_length": len(proof),
+            "verified": type(tree).verify_consistency(first, second, first_root, second_root, proof),
+            "description": "RFC 6962 consistency proof: the tree of the first `from` blocks is a prefix of the tree of the first `to` blocks.",
+        }), 200
+
+
+# Most leaves one multiproof request may cover
+MAX_MULTIPROOF_LEAVES = 10000
+
+
+def _is_block_index(value) -> bool:
+    """True for a JSON integer (not a bool, float or numeric string)."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+@zkp_bp.route("/merkle/multiproof", methods=["POST"])
+@require_auth
+def get_merkle_multiproof(token_payload=None):
+    """
+    One Merkle multiproof for many audit blocks.
+    
+    Request JSON (one of):
+    {
+        "indices": [<int>, ...],             block indices as in /merkle/proof
+        "start": <int>, "end": <int>         a range, end exclusive
+    }
+    Query param ?version=1|2 as for /merkle/tree.
+
+    Sibling nodes shared by several paths are sent once, so verifying k
+    blocks needs far fewer hashes than k separate proofs.
+    """
+    data = request.get_json() or {}
+    version, error = _requested_merkle_version()
+    if error:
+        return error
+
+    # Check types and sizes before building anything from the request
+    start = end = indices = None
+    if "indices" in data:
+        if not isinstance(data["indices"], list):
+            return jsonify({"error": "indices must be a list"}), 400
+        if len(data["indices"]) > MAX_MULTIPROOF_LEAVES:
+            return jsonify({"error": f"At most {MAX_MULTIPROOF_LEAVES} blocks per multiproof"}), 400
+        if not all(_is_block_index(i) for i in data["indices"]):
+            return jsonify({"error": "indices must be integers"}), 400
+        indices = sorted(set(data["indices"]))
+        if not indices:
+            return jsonify({"error": "No block indices requested"}), 400
+    elif "start" in data and "end" in data:
+        start, end = data["start"], data["end"]
+        if not (_is_block_index(start) and _is_block_index(end)):
+            return jsonify({"error": "start and end must be integers"}), 400
+        if not 0 <= start < end:
+            return jsonify({"error": "start and end must satisfy 0 <= start < end"}), 400
+        if end - start > MAX_MULTIPROOF_LEAVES:
+            return jsonify({"error": f"At most {MAX_MULTIPROOF_LEAVES} blocks per multiproof"}), 400
+    else:
+        return jsonify({"error": "indices or start/end is required"}), 400
+
+    # Appends wait while the tree is held, so copy out the proof and
+    # read the blocks and build the response after releasing it
+    with current_app.audit_log.merkle_tree(version) as tree:
+        leaf_count = tree.data_count
+        if not leaf_count:
+            return jsonify({"error": "No audit blocks"}), 400
+        if indices is None:
+            if end > leaf_count:
+                return jsonify({"error": f"end must be at most {leaf_count}"}), 400
+            indices = list(range(start, end))
+        elif indices[0] < 0 or indices[-1] >= leaf_count:
+            return jsonify({"error": f"Block indices must be 0-{leaf_count-1}"}), 400
+        proof = tree.get_multiproof(indices)
+        leaf_hashes = [tree.leaves[i] for i in indices]
+        root, tree_class = tree.root, type(tree)
+
+    is_valid, hash_count = tree_class.verify_multiproof(root, leaf_hashes, proof)
+    chain = current_app.audit_log.chain
+
+    return jsonify({
+        "block_indices": indices,
+        "blocks": [chain[i + 1].to_dict() for i in indices],
+        "leaf_hashes": leaf_hashes,
+        "merkle_root": root,
+        "merkle_version": tree_class.VERSION,
+        "multiproof": proof,
+        "proof_size": len(proof["hashes"]),
+        "hash_count": hash_count,
+        "verified": is_valid,
+        "description": "Recompute each block's leaf hash, then fold leaves and proof hashes level by level (left to right) up to the root.",
+    }), 200
+
+
 # Keep backwards-compatible old endpoints
 @zkp_bp.route("/challenge", methods=["POST"])
 def generate_challenge():
@@ -7,7 +7,7 @@ from datetime import datetime
 # Add the backend directory to the path so we can import modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from db import insert_ml_event
+from db import insert_ml_events_bulk
 
 def seed_data():
     users = ["admin", "alice", "bob", "charlie", "hacker"]
@@ -15,7 +15,7 @@ def seed_data():
     locations = ["Office", "Remote", "Mobile", "Foreign"]
     resources = ["financial_db", "public_site", "employee_portal", "source_code"]
     
-    events_generated = 0
+    events = []
     for _ in range(150):
         user = random.choice(users)
         dept = random.choice(departments)
@@ -66,9 +66,11 @@ def seed_data():
             "decision": decision
         }
         
-        insert_ml_event(context)
-        events_generated += 1
-        
+        events.append(context)
+
+    # One bulk write instead of 150 single-document round-trips
+    events_generated = insert_ml_events_bulk(events)
+
     print(f"Successfully seeded {events_generated} ML events into the database.")
     
     # Trigger training automatically via local API
@@ -0,0 +1,88 @@
+"""
+Concurrency tests for BlockchainAuditLog append sequencing.
+
+Run from the backend directory:
+    python -m pytest test_audit_sequencer.py
+"""
+
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# benchmark selects the in-memory storage backend on import
+from benchmark import ListAuditStore, check_no_forks
+from modules.blockchain_audit import BlockchainAuditLog
+
+
+def _append_concurrently(audit_log, n_threads, rounds):
+    """Every thread appends batches of 1-4 decisions; returns (blocks, errors)."""
+    blocks, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(n_threads)
+
+    def worker(thread_no):
+        start.wait()
+        for round_no in range(rounds):
+            size = 1 + (thread_no + round_no) % 4
+            decisions = [(f"user{thread_no}", "resource", "ALLOW", float(round_no))] * size
+            try:
+                result = audit_log.add_access_decisions(decisions)
+            except (IOError, RuntimeError) as exc:
+                with lock:
+                    errors.append(exc)
+                continue
+            with lock:
+                blocks.extend(result)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return blocks, errors
+
+
+def test_concurrent_appends_never_fork():
+    store = ListAuditStore()
+    audit_log = BlockchainAuditLog(store=store)
+    blocks, errors = _append_concurrently(audit_log, n_threads=16, rounds=50)
+
+    assert errors == []
+    assert sorted(b["block_id"] for b in blocks) == list(range(1, len(blocks) + 1))
+    check_no_forks(audit_log, store)
+
+
+def test_store_failure_aborts_later_appends_and_recovers():
+    # A few writes fail mid-run; appends queued behind them fail too
+    store = ListAuditStore(fail_on_call={10, 40, 41, 120})
+    audit_log = BlockchainAuditLog(store=store)
+    blocks, errors = _append_concurrently(audit_log, n_threads=8, rounds=40)
+
+    assert errors
+    assert any(isinstance(exc, IOError) for exc in errors)
+    # Only persisted blocks are in the chain, with no gaps in the ids
+    assert sorted(b["block_id"] for b in blocks) == list(range(1, len(audit_log.chain)))
+    check_no_forks(audit_log, store)
+
+    # The log keeps working after the failures
+    audit_log.add_access_decisions([("after", "resource", "DENY", 90.0)] * 3)
+    check_no_forks(audit_log, store)
+
+
+def test_hashing_failure_releases_reserved_ids():
+    store = ListAuditStore()
+    audit_log = BlockchainAuditLog(store=store)
+    audit_log.add_access_decision("alice", "resource", "ALLOW", 10.0)
+
+    try:
+        audit_log.add_access_decision("alice", "resource", "ALLOW", object())
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("an unhashable risk score was accepted")
+
+    block = audit_log.add_access_decision("bob", "resource", "DENY", 80.0)
+    assert block["block_id"] == 2
+    check_no_forks(audit_log, store)